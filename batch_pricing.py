@@ -0,0 +1,242 @@
+import numpy as np
+
+import cents_pricing
+from money import RATE_SCALE
+
+
+# --- Batch Pricing (NumPy) ---
+# Prices many carts at once from columnar input: three parallel arrays where row i
+# says "cart cart_ids[i] holds quantities[i] of product product_ids[i]".
+# Every per-line rule from calculate_total() is applied as an array operation,
+# and per-cart sums use np.bincount, which accumulates rows in input order.
+# Rows listed in the same order as a cart dict's items() therefore produce
+# bit-for-bit the same floats as the scalar path.
+
+FLASH_NONE = 0
+FLASH_PERCENT = 1
+FLASH_FIXED = 2
+
+BREAKDOWN_FIELDS = (
+    'subtotal_before_discounts',
+    'total_item_discount',
+    'tiered_discount_percentage',
+    'tiered_discount_amount',
+    'total_discount_applied',
+    'final_total',
+)
+
+
+def build_price_table(lookup):
+    """
+    Turns product_lookup into (sorted_ids, prices) arrays for vectorized lookups.
+    Build it once and pass it to price_carts_batch() when pricing many batches.
+    """
+    columns = getattr(lookup, 'columns', None)
+    if columns is not None:
+        # CatalogStore already holds int64 ids and float64 prices in typed arrays
+        id_column, price_column = columns()
+        ids = np.frombuffer(id_column, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        return ids[order], np.frombuffer(price_column, dtype=np.float64)[order]
+    ids = np.fromiter(lookup.keys(), dtype=np.int64, count=len(lookup))
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    prices = np.fromiter((lookup[product_id]['price'] for product_id in sorted_ids.tolist()),
+                         dtype=np.float64, count=len(sorted_ids))
+    return sorted_ids, prices
+
+
+def _price_rows(sorted_ids, product_ids):
+    """Maps product ids to price table rows (LeetCode: Binary Search, vectorized)."""
+    if len(product_ids) and not len(sorted_ids):
+        raise KeyError(f"Product ID {int(product_ids[0])} not found.")
+    rows = np.minimum(np.searchsorted(sorted_ids, product_ids), max(len(sorted_ids) - 1, 0))
+    missing = sorted_ids[rows] != product_ids
+    if np.any(missing):
+        raise KeyError(f"Product ID {int(product_ids[missing][0])} not found.")
+    return rows
+
+
+def _flash_columns(rules, product_ids, current_time):
+    """Resolves the active flash sale once per distinct product in the batch."""
+    unique_ids, inverse = np.unique(product_ids, return_inverse=True)
+    kinds = np.zeros(len(unique_ids), dtype=np.int8)
+    values = np.zeros(len(unique_ids), dtype=np.float64)
+    for index, product_id in enumerate(unique_ids.tolist()):
+        sale = rules.active_flash_sale(product_id, current_time)
+        if sale:
+            if sale['discount_type'] == 'percent':
+                kinds[index] = FLASH_PERCENT
+                values[index] = sale['value']
+            elif sale['discount_type'] == 'fixed':
+                kinds[index] = FLASH_FIXED
+                values[index] = sale['value']
+    return kinds[inverse], values[inverse]
+
+
+def price_carts_batch(cart_ids, product_ids, quantities, lookup, rules, current_time, price_table=None):
+    """
+    Prices every cart in a columnar batch.
+    rules is a CompiledPricingRules (e.g. pricing_engine.rules). Each
+    (cart id, product id) pair should appear at most once, like keys of a cart dict.
+    Returns a dict with 'cart_ids' (sorted unique cart ids) and one float64
+    array per calculate_total() breakdown field, aligned with 'cart_ids'.
+    Per-item discount notes are not produced; use calculate_total() for display.
+    """
+    cart_ids = np.asarray(cart_ids)
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    if not (len(cart_ids) == len(product_ids) == len(quantities)):
+        raise ValueError("cart_ids, product_ids and quantities must have the same length.")
+
+    sorted_ids, prices = price_table if price_table is not None else build_price_table(lookup)
+    price = prices[_price_rows(sorted_ids, product_ids)]
+    quantity = quantities.astype(np.float64)
+    line_item_total = price * quantity
+
+    # BOGO: one free item per pair
+    free_items = quantities // 2
+    bogo_eligible = np.isin(product_ids, np.fromiter(rules.bogo_ids, dtype=np.int64, count=len(rules.bogo_ids)))
+    bogo_discount = np.where(bogo_eligible & (free_items > 0), free_items.astype(np.float64) * price, 0.0)
+
+    # Flash sales: percent of the line, or fixed per unit capped at the line total
+    flash_kind, flash_value = _flash_columns(rules, product_ids, current_time)
+    flash_discount = np.zeros(len(product_ids), dtype=np.float64)
+    percent = flash_kind == FLASH_PERCENT
+    fixed = flash_kind == FLASH_FIXED
+    flash_discount[percent] = line_item_total[percent] * flash_value[percent]
+    flash_discount[fixed] = np.minimum(line_item_total[fixed], flash_value[fixed] * quantity[fixed])
+
+    # Best item discount: BOGO wins ties, Flash must be strictly better
+    use_bogo = (bogo_discount > 0) & (bogo_discount >= flash_discount)
+    use_flash = ~use_bogo & (flash_discount > 0) & (flash_discount > bogo_discount)
+    best_item_discount = np.where(use_bogo, bogo_discount, np.where(use_flash, flash_discount, 0.0))
+
+    # Per-cart sums (LeetCode: Hashing, via bincount over dense cart indexes)
+    unique_carts, cart_index = np.unique(cart_ids, return_inverse=True)
+    num_carts = len(unique_carts)
+    subtotal_before_discounts = np.bincount(cart_index, weights=line_item_total, minlength=num_carts)
+    total_item_discount = np.bincount(cart_index, weights=best_item_discount, minlength=num_carts)
+    subtotal_after_item_discounts = subtotal_before_discounts - total_item_discount
+
+    # Tiered discount from the compiled, ascending tier table
+    tiered_discount_amount = np.zeros(num_carts, dtype=np.float64)
+    tiered_discount_percentage = np.zeros(num_carts, dtype=np.float64)
+    if rules.tier_thresholds:
+        thresholds = np.asarray(rules.tier_thresholds, dtype=np.float64)
+        percentages = np.asarray([tier[1] for tier in rules.tier_table], dtype=np.float64)
+        tier_index = np.searchsorted(thresholds, subtotal_after_item_discounts, side='right') - 1
+        has_tier = tier_index >= 0
+        applied = percentages[tier_index[has_tier]]
+        tiered_discount_amount[has_tier] = subtotal_after_item_discounts[has_tier] * applied
+        tiered_discount_percentage[has_tier] = applied * 100
+
+    final_total = subtotal_after_item_discounts - tiered_discount_amount
+    total_discount_applied = total_item_discount + tiered_discount_amount
+
+    return {
+        'cart_ids': unique_carts,
+        'subtotal_before_discounts': subtotal_before_discounts,
+        'total_item_discount': total_item_discount,
+        'tiered_discount_percentage': tiered_discount_percentage,
+        'tiered_discount_amount': tiered_discount_amount,
+        'total_discount_applied': total_discount_applied,
+        'final_total': final_total,
+    }
+
+
+def _flash_columns_cents(cents_rules, product_ids, current_time):
+    """Integer flash terms (rate in parts per million or cents per unit) per row."""
+    unique_ids, inverse = np.unique(product_ids, return_inverse=True)
+    kinds = np.zeros(len(unique_ids), dtype=np.int8)
+    amounts = np.zeros(len(unique_ids), dtype=np.int64)
+    for index, product_id in enumerate(unique_ids.tolist()):
+        terms = cents_rules.flash_terms_for(product_id, current_time)
+        if terms:
+            kinds[index] = FLASH_PERCENT if terms[0] == cents_pricing.FLASH_PERCENT else FLASH_FIXED
+            amounts[index] = terms[1]
+    return kinds[inverse], amounts[inverse]
+
+
+def price_carts_batch_cents(cart_ids, product_ids, quantities, lookup, cents_rules, current_time, price_table=None):
+    """
+    Integer-cents version of price_carts_batch() with the rounding rules of
+    cents_pricing.py; cents_rules is pricing_engine.cents_rules.
+    Returns 'cart_ids', one int64 array per CENTS_FIELDS entry and a float64
+    'tiered_discount_percentage' array. Totals equal price_cart_cents() per cart.
+    """
+    cart_ids = np.asarray(cart_ids)
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    if not (len(cart_ids) == len(product_ids) == len(quantities)):
+        raise ValueError("cart_ids, product_ids and quantities must have the same length.")
+
+    sorted_ids, prices = price_table if price_table is not None else build_price_table(lookup)
+    unique_prices, price_index = np.unique(prices, return_inverse=True)
+    price_cents_table = np.fromiter((cents_rules.price_cents(price) for price in unique_prices.tolist()),
+                                    dtype=np.int64, count=len(unique_prices))[price_index]
+    price = price_cents_table[_price_rows(sorted_ids, product_ids)]
+    line_cents = price * quantities
+
+    free_items = quantities // 2
+    bogo_eligible = np.isin(product_ids, np.fromiter(cents_rules.bogo_ids, dtype=np.int64, count=len(cents_rules.bogo_ids)))
+    bogo_cents = np.where(bogo_eligible & (free_items > 0), free_items * price, 0)
+
+    flash_kind, flash_amount = _flash_columns_cents(cents_rules, product_ids, current_time)
+    flash_cents = np.zeros(len(product_ids), dtype=np.int64)
+    percent = flash_kind == FLASH_PERCENT
+    fixed = flash_kind == FLASH_FIXED
+    flash_cents[percent] = (line_cents[percent] * flash_amount[percent] + RATE_SCALE // 2) // RATE_SCALE
+    flash_cents[fixed] = np.minimum(line_cents[fixed], flash_amount[fixed] * quantities[fixed])
+
+    use_bogo = (bogo_cents > 0) & (bogo_cents >= flash_cents)
+    use_flash = ~use_bogo & (flash_cents > 0) & (flash_cents > bogo_cents)
+    item_discount_cents = np.where(use_bogo, bogo_cents, np.where(use_flash, flash_cents, 0))
+
+    # Integer sums are exact, so np.add.at order does not matter here
+    unique_carts, cart_index = np.unique(cart_ids, return_inverse=True)
+    num_carts = len(unique_carts)
+    subtotal_cents = np.zeros(num_carts, dtype=np.int64)
+    total_item_discount_cents = np.zeros(num_carts, dtype=np.int64)
+    np.add.at(subtotal_cents, cart_index, line_cents)
+    np.add.at(total_item_discount_cents, cart_index, item_discount_cents)
+    subtotal_after_item_discounts = subtotal_cents - total_item_discount_cents
+
+    tiered_discount_cents = np.zeros(num_carts, dtype=np.int64)
+    tiered_discount_percentage = np.zeros(num_carts, dtype=np.float64)
+    if cents_rules.tier_thresholds:
+        thresholds = np.asarray(cents_rules.tier_thresholds, dtype=np.int64)
+        rates = np.asarray([tier[0] for tier in cents_rules.tier_table], dtype=np.int64)
+        percentages = np.asarray([tier[1] for tier in cents_rules.tier_table], dtype=np.float64)
+        tier_index = np.searchsorted(thresholds, subtotal_after_item_discounts, side='right') - 1
+        has_tier = tier_index >= 0
+        applied = tier_index[has_tier]
+        tiered_discount_cents[has_tier] = (subtotal_after_item_discounts[has_tier] * rates[applied]
+                                           + RATE_SCALE // 2) // RATE_SCALE
+        tiered_discount_percentage[has_tier] = percentages[applied]
+
+    return {
+        'cart_ids': unique_carts,
+        'subtotal_before_discounts_cents': subtotal_cents,
+        'total_item_discount_cents': total_item_discount_cents,
+        'tiered_discount_percentage': tiered_discount_percentage,
+        'tiered_discount_amount_cents': tiered_discount_cents,
+        'total_discount_applied_cents': total_item_discount_cents + tiered_discount_cents,
+        'final_total_cents': subtotal_after_item_discounts - tiered_discount_cents,
+    }
+
+
+def carts_to_columns(carts):
+    """
+    Converts {cart_id: {product_id: quantity}} into (cart_ids, product_ids, quantities)
+    arrays, keeping each cart's item order.
+    """
+    cart_ids = []
+    product_ids = []
+    quantities = []
+    for cart_id, cart in carts.items():
+        for product_id, quantity in cart.items():
+            cart_ids.append(cart_id)
+            product_ids.append(product_id)
+            quantities.append(quantity)
+    return np.asarray(cart_ids), np.asarray(product_ids, dtype=np.int64), np.asarray(quantities, dtype=np.int64)
@@ -0,0 +1,74 @@
+"""
+Compares scalar pricing (one cart dict at a time) with price_carts_batch().
+Usage: python benchmarks/bench_batch_pricing.py [num_carts] [num_products]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_pricing import BREAKDOWN_FIELDS, build_price_table, carts_to_columns, price_carts_batch
+from pricing_engine import PricingEngine
+
+import synthetic
+
+import main
+
+
+def build_workload(num_carts, num_products, seed=42):
+    products = synthetic.make_catalog(num_products, seed)
+    lookup = {product['id']: product for product in products}
+    now = main.app.simulated_now
+    engine = PricingEngine(*synthetic.make_promotions(lookup, now, seed=seed))
+    carts = dict(enumerate(synthetic.make_carts(lookup, num_carts, cart_size=8, max_quantity=5, skew=0.0, seed=seed)))
+    return lookup, engine, carts, now
+
+
+def run(num_carts=200_000, num_products=10_000):
+    lookup, engine, carts, now = build_workload(num_carts, num_products)
+    rules = engine.rules
+
+    start = time.perf_counter()
+    scalar = [engine.price_cart(cart, lookup, now) for cart in carts.values()]
+    scalar_seconds = time.perf_counter() - start
+
+    # calculate_total() reads the pricing engine from main.app
+    saved_engine = main.app.pricing_engine
+    main.app.pricing_engine = engine
+    try:
+        start = time.perf_counter()
+        legacy = [main.calculate_total(cart, lookup, now) for cart in carts.values()]
+        legacy_seconds = time.perf_counter() - start
+    finally:
+        main.app.pricing_engine = saved_engine
+
+    start = time.perf_counter()
+    columns = carts_to_columns(carts)
+    convert_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = price_carts_batch(*columns, lookup, rules, now, price_table=build_price_table(lookup))
+    batch_seconds = time.perf_counter() - start
+
+    # Consistency: every breakdown field must match the scalar result exactly
+    for position, cart_id in enumerate(batch['cart_ids'].tolist()):
+        for field in BREAKDOWN_FIELDS:
+            if batch[field][position] != scalar[cart_id][field]:
+                raise AssertionError(f"Cart {cart_id}: {field} batch={batch[field][position]!r} scalar={scalar[cart_id][field]!r}")
+    for position, breakdown in enumerate(legacy):
+        for field in BREAKDOWN_FIELDS:
+            if breakdown[field] != scalar[position][field]:
+                raise AssertionError(f"Cart {position}: {field} differs from calculate_total()")
+
+    print(f"Carts: {num_carts:,}  Products: {num_products:,}  Lines: {len(columns[0]):,}")
+    print(f"calculate_total:                {legacy_seconds:8.3f}s  {num_carts / legacy_seconds:12,.0f} carts/s")
+    print(f"PricingEngine.price_cart:       {scalar_seconds:8.3f}s  {num_carts / scalar_seconds:12,.0f} carts/s")
+    print(f"price_carts_batch:              {batch_seconds:8.3f}s  {num_carts / batch_seconds:12,.0f} carts/s"
+          f"  (+{convert_seconds:.3f}s dict-to-column conversion)")
+    print("All breakdown fields match.")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
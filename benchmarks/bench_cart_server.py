@@ -0,0 +1,137 @@
+"""
+Load generator for cart_server.py: many concurrent sessions, each on its own
+connection, running add/add/view/total/checkout cycles.
+Reports throughput and latency percentiles. Every product starts with --stock
+units; adds past that are refused, and at the end the units checked out plus
+the units left on hand must equal the starting stock (nothing oversold).
+Usage: python benchmarks/bench_cart_server.py [--sessions 1000] [--cycles 20] [--stock 2000]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+PRODUCT_IDS = list(range(1, 7))
+REFUSALS = ("Not enough stock", "Your cart is empty")  # Expected once stock runs out
+
+
+def start_server(shards, stock):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "cart_server.py"), "--port", "0", "--shards", str(shards),
+         "--stock", str(stock)],
+        stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    for line in process.stdout:
+        if line.startswith("Listening on "):
+            host, port = line.split()[-1].rsplit(":", 1)
+            return process, host, int(port)
+    process.kill()
+    raise RuntimeError("Cart server did not start.")
+
+
+async def run_session(host, port, session_id, cycles, product_ids, latencies, errors, sold):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random(session_id)
+    request_id = 0
+
+    async def call(request):
+        nonlocal request_id
+        request_id += 1
+        request['id'] = request_id
+        request['session'] = f"session-{session_id}"
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if not response.get('ok'):
+            errors.append(response.get('error'))
+        return response
+
+    try:
+        for _ in range(cycles):
+            await call({'op': 'add', 'product_id': rng.choice(product_ids), 'quantity': rng.randint(1, 3)})
+            await call({'op': 'add', 'product_id': rng.choice(product_ids), 'quantity': 1})
+            await call({'op': 'view'})
+            await call({'op': 'total'})
+            response = await call({'op': 'checkout'})
+            for product_id, quantity in response.get('cart', ()):
+                sold[product_id] = sold.get(product_id, 0) + quantity
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host, port, sessions, cycles):
+    latencies = []
+    errors = []
+    sold = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(host, port, session_id, cycles, PRODUCT_IDS, latencies, errors, sold)
+                           for session_id in range(sessions)))
+    return time.perf_counter() - start, latencies, errors, sold
+
+
+async def read_stock(host, port):
+    """Returns {product_id: (on_hand, available)} from the server's stock op."""
+    reader, writer = await asyncio.open_connection(host, port)
+    stock = {}
+    try:
+        for product_id in PRODUCT_IDS:
+            writer.write(json.dumps({'op': 'stock', 'product_id': product_id}).encode("utf-8") + b"\n")
+            response = json.loads(await reader.readline())
+            stock[product_id] = (response['on_hand'], response['available'])
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return stock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000, help="Concurrent sessions (one connection each).")
+    parser.add_argument("--cycles", type=int, default=20, help="add/add/view/total/checkout cycles per session.")
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--stock", type=int, default=2_000, help="Starting units of every product.")
+    args = parser.parse_args()
+
+    process, host, port = start_server(args.shards, args.stock)
+    try:
+        elapsed, latencies, errors, sold = asyncio.run(run_load(host, port, args.sessions, args.cycles))
+        stock = asyncio.run(read_stock(host, port))
+    finally:
+        process.terminate()
+        process.wait()
+
+    for product_id, (on_hand, available) in stock.items():
+        assert sold.get(product_id, 0) + on_hand == args.stock, f"product {product_id} oversold"
+        assert available == on_hand, f"product {product_id}: reservations left behind"
+    refused = sum(1 for error in errors if str(error).startswith(REFUSALS))
+    errors = [error for error in errors if not str(error).startswith(REFUSALS)]
+
+    latencies.sort()
+    print(f"Sessions: {args.sessions:,}  Requests: {len(latencies):,}  Errors: {len(errors)}  "
+          f"Refused (out of stock): {refused:,}")
+    print(f"Units sold: {sum(sold.values()):,} of {args.stock * len(PRODUCT_IDS):,} in stock, none oversold")
+    print(f"Throughput: {len(latencies) / elapsed:,.0f} requests/s over {elapsed:.2f}s")
+    print(f"Latency p50: {percentile(latencies, 0.50) * 1000:.2f} ms  "
+          f"p99: {percentile(latencies, 0.99) * 1000:.2f} ms  max: {latencies[-1] * 1000:.2f} ms")
+    if errors:
+        print(f"First error: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
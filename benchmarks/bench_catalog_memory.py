@@ -0,0 +1,93 @@
+"""
+Compares the memory and lookup speed of the dict-of-dicts catalog
+(products + product_lookup) with CatalogStore.
+Usage: python benchmarks/bench_catalog_memory.py [num_products]
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_store import CatalogStore
+
+import main
+
+
+def product_rows(num_products, seed=42):
+    """Yields (id, name, price) without keeping them, so only the catalog under test is measured."""
+    rng = random.Random(seed)
+    for product_id in range(1, num_products + 1):
+        yield product_id, f"Product {product_id} {rng.choice(['Cable', 'Laptop', 'Mouse', 'Webcam'])}", round(rng.uniform(1, 500), 2)
+
+
+def build_dicts(num_products):
+    products = [{"id": product_id, "name": name, "price": price} for product_id, name, price in product_rows(num_products)]
+    return products, {product['id']: product for product in products}
+
+
+def build_store(num_products):
+    return CatalogStore({"id": product_id, "name": name, "price": price} for product_id, name, price in product_rows(num_products))
+
+
+def measure(build, num_products):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    catalog = build(num_products)
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return catalog, current, peak, seconds
+
+
+def time_pricing(lookup, carts, now):
+    start = time.perf_counter()
+    for cart in carts:
+        main.app.pricing_engine.price_cart(cart, lookup, now)
+    return time.perf_counter() - start
+
+
+def run(num_products=1_000_000):
+    print(f"{num_products} products")
+    (products, lookup), dict_bytes, dict_peak, dict_seconds = measure(build_dicts, num_products)
+    store, store_bytes, store_peak, store_seconds = measure(build_store, num_products)
+    assert store.to_dicts() == products
+
+    print(f"dict-of-dicts: {dict_bytes / 1e6:8.1f} MB ({dict_bytes / num_products:6.1f} B/product), "
+          f"peak {dict_peak / 1e6:.1f} MB, built in {dict_seconds:.2f}s")
+    print(f"CatalogStore:  {store_bytes / 1e6:8.1f} MB ({store_bytes / num_products:6.1f} B/product), "
+          f"peak {store_peak / 1e6:.1f} MB, built in {store_seconds:.2f}s")
+    print(f"memory saved:  {1 - store_bytes / dict_bytes:.0%}")
+
+    rng = random.Random(7)
+    carts = [{rng.randint(1, num_products): rng.randint(1, 5) for _ in range(rng.randint(1, 8))} for _ in range(50_000)]
+    now = main.app.simulated_now
+    for cart in carts[:100]:
+        assert main.app.pricing_engine.price_cart(cart, store, now) == main.app.pricing_engine.price_cart(cart, lookup, now)
+    print(f"price_cart x{len(carts)}: dict lookup {time_pricing(lookup, carts, now):.2f}s, "
+          f"CatalogStore {time_pricing(store, carts, now):.2f}s")
+
+    start = time.perf_counter()
+    for product_id in range(1, num_products + 1):
+        lookup[product_id]['price']
+    dict_lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    for product_id in range(1, num_products + 1):
+        store[product_id]['price']
+    view_lookup = time.perf_counter() - start
+    price_of = store.price_of
+    start = time.perf_counter()
+    for product_id in range(1, num_products + 1):
+        price_of(product_id)
+    fast_lookup = time.perf_counter() - start
+    print(f"id -> price x{num_products}: dict {dict_lookup:.2f}s, ProductView {view_lookup:.2f}s, "
+          f"price_of {fast_lookup:.2f}s")
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:2]]
+    run(*arguments)
@@ -0,0 +1,87 @@
+"""
+Compares float pricing with integer-cents pricing on large carts, and checks
+that the two agree within the documented rounding rules.
+Usage: python benchmarks/bench_cents_pricing.py [num_carts] [lines_per_cart] [num_products]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_pricing import build_price_table, carts_to_columns, price_carts_batch, price_carts_batch_cents
+from cents_pricing import CENTS_FIELDS, FLASH_PERCENT
+from money import to_cents
+
+from bench_batch_pricing import build_workload
+
+
+def rounding_slack_cents(cart, cents_rules, now):
+    """
+    Largest difference the rounding rules allow between the two paths for a cart
+    with whole-cent prices: half a cent per percent-rounded flash line and half a
+    cent for the tier, plus a little room for float error in the float path.
+    """
+    percent_lines = 0
+    for product_id in cart:
+        terms = cents_rules.flash_terms_for(product_id, now)
+        if terms and terms[0] == FLASH_PERCENT:
+            percent_lines += 1
+    return 0.5 * (percent_lines + 1) + 0.01
+
+
+def run(num_carts=2_000, lines_per_cart=200, num_products=10_000):
+    lookup, engine, small_carts, now = build_workload(num_carts, num_products)
+    # Large carts: lines_per_cart distinct products each
+    carts = {}
+    for cart_id, seed_cart in small_carts.items():
+        first = next(iter(seed_cart))
+        carts[cart_id] = {(first + step * 37) % num_products + 1: step % 5 + 1 for step in range(lines_per_cart)}
+    lines = sum(len(cart) for cart in carts.values())
+    print(f"{num_carts} carts x {lines_per_cart} lines ({lines} lines), {num_products} products")
+    cents_rules = engine.cents_rules
+
+    start = time.perf_counter()
+    float_totals = [engine.price_cart(cart, lookup, now) for cart in carts.values()]
+    float_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cents_totals = [engine.price_cart_cents(cart, lookup, now) for cart in carts.values()]
+    cents_seconds = time.perf_counter() - start
+
+    columns = carts_to_columns(carts)
+    table = build_price_table(lookup)
+    start = time.perf_counter()
+    batch_float = price_carts_batch(*columns, lookup, engine.rules, now, price_table=table)
+    batch_float_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    batch_cents = price_carts_batch_cents(*columns, lookup, cents_rules, now, price_table=table)
+    batch_cents_seconds = time.perf_counter() - start
+
+    # Consistency: the cents path is reproducible (scalar == batch, exactly) ...
+    for index, totals in enumerate(cents_totals):
+        for field in CENTS_FIELDS:
+            assert batch_cents[field][index] == totals[field], (index, field)
+    # ... and within the rounding rules of the float path
+    worst = 0.0
+    for cart, float_breakdown, cents_breakdown in zip(carts.values(), float_totals, cents_totals):
+        slack = rounding_slack_cents(cart, cents_rules, now)
+        # Item discounts round per line; compare in cents against the float amounts
+        difference = abs(cents_breakdown['final_total_cents'] - float_breakdown['final_total'] * 100)
+        assert difference <= slack, (cart, float_breakdown, cents_breakdown)
+        assert cents_breakdown['subtotal_before_discounts_cents'] == to_cents(float_breakdown['subtotal_before_discounts'])
+        worst = max(worst, difference)
+
+    print(f"price_cart (float):        {float_seconds:8.3f}s  {lines / float_seconds:12,.0f} lines/sec")
+    print(f"price_cart_cents:          {cents_seconds:8.3f}s  {lines / cents_seconds:12,.0f} lines/sec")
+    print(f"price_carts_batch (float): {batch_float_seconds:8.3f}s  {lines / batch_float_seconds:12,.0f} lines/sec")
+    print(f"price_carts_batch_cents:   {batch_cents_seconds:8.3f}s  {lines / batch_cents_seconds:12,.0f} lines/sec")
+    print(f"largest float vs cents final total difference: {worst:.4f} cents (within rounding rules)")
+    float_sum = sum(totals['final_total'] for totals in float_totals)
+    cents_sum = int(batch_cents['final_total_cents'].sum())
+    print(f"grand total: float ${float_sum:,.6f} vs cents ${cents_sum // 100:,}.{cents_sum % 100:02d}")
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:4]]
+    run(*arguments)
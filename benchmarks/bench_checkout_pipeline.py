@@ -0,0 +1,126 @@
+"""
+Compares synchronous checkout (price, update_copurchase_history,
+get_recommendations per order, as option 9 used to do) with CheckoutPipeline,
+where the history update is queued and applied in micro-batches by a
+background worker. Reports orders/sec and checkout latency percentiles, and
+checks that the history ends up identical once the pipeline is flushed.
+With an in-memory history the pipeline only moves the update off the
+checkout path (same CPU, lower latency). The durable run logs to a
+CopurchaseStore with fsync: synchronous checkout pays one fsync per order,
+the pipeline one per batch, which is where it gains throughput.
+Usage: python benchmarks/bench_checkout_pipeline.py [num_orders] [num_products] [max_batch_delay_ms] [durable_orders]
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkout_pipeline import CheckoutPipeline
+from pricing_engine import PricingEngine
+from storage import CopurchaseStore
+
+import synthetic
+
+import main
+
+
+def percentile(sorted_values, fraction):
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def report(label, latencies, seconds):
+    latencies = sorted(latencies)
+    print(f"{label:<28}{len(latencies) / seconds:10,.0f} orders/sec   "
+          f"p50 {percentile(latencies, 0.50) * 1e6:8.1f} us   p99 {percentile(latencies, 0.99) * 1e6:8.1f} us")
+
+
+def run_durable(carts, engine, lookup, now, max_batch_delay_ms):
+    """Synchronous vs pipelined checkout against a CopurchaseStore that fsyncs its log."""
+    print(f"\ndurable history (CopurchaseStore, sync=True), {len(carts):,} orders")
+    with tempfile.TemporaryDirectory() as directory:
+        store = CopurchaseStore(os.path.join(directory, "sync.db"), sync=True)
+        latencies = []
+        start = time.perf_counter()
+        for cart in carts:
+            began = time.perf_counter()
+            engine.price_cart(cart, lookup, now)
+            store.record_checkout(cart)
+            main.get_recommendations(cart, store, lookup)
+            latencies.append(time.perf_counter() - began)
+        report("synchronous", latencies, time.perf_counter() - start)
+        expected = store.to_dict()
+        store.close()
+
+        store = CopurchaseStore(os.path.join(directory, "pipeline.db"), sync=True)
+        latencies = []
+        start = time.perf_counter()
+        with CheckoutPipeline(store.record_checkouts, max_batch_delay=max_batch_delay_ms / 1000) as pipeline:
+            for cart in carts:
+                began = time.perf_counter()
+                engine.price_cart(cart, lookup, now)
+                pipeline.submit(cart)
+                with pipeline.lock:
+                    main.get_recommendations(cart, store, lookup)
+                latencies.append(time.perf_counter() - began)
+            pipeline.flush()
+            seconds = time.perf_counter() - start
+            stats = pipeline.stats()
+        report("pipeline (incl. flush)", latencies, seconds)
+        print(f"  {stats['batches']} batches, one fsync each (synchronous: one per order)")
+        assert store.to_dict() == expected, "pipeline history differs"
+        store.close()
+
+
+def run(num_orders=20_000, num_products=5_000, max_batch_delay_ms=50, durable_orders=2_000):
+    products = synthetic.make_catalog(num_products)
+    lookup = {product['id']: product for product in products}
+    now = main.app.simulated_now
+    engine = PricingEngine(*synthetic.make_promotions(lookup, now))
+    carts = synthetic.make_carts(lookup, num_orders, cart_size=4)
+    print(f"{num_orders:,} orders over {num_products:,} products, max batch delay {max_batch_delay_ms} ms")
+
+    expected = {}
+    latencies = []
+    start = time.perf_counter()
+    for cart in carts:
+        began = time.perf_counter()
+        engine.price_cart(cart, lookup, now)
+        main.update_copurchase_history(cart, expected)
+        main.get_recommendations(cart, expected, lookup)
+        latencies.append(time.perf_counter() - began)
+    report("synchronous", latencies, time.perf_counter() - start)
+
+    history = {}
+
+    def apply_orders(orders):
+        for cart in orders:
+            main.update_copurchase_history(cart, history)
+
+    latencies = []
+    start = time.perf_counter()
+    with CheckoutPipeline(apply_orders, max_batch_delay=max_batch_delay_ms / 1000) as pipeline:
+        for cart in carts:
+            began = time.perf_counter()
+            engine.price_cart(cart, lookup, now)
+            pipeline.submit(cart)
+            with pipeline.lock:
+                main.get_recommendations(cart, history, lookup)
+            latencies.append(time.perf_counter() - began)
+        pipeline.flush()
+        seconds = time.perf_counter() - start
+        stats = pipeline.stats()
+    report("pipeline (incl. flush)", latencies, seconds)
+    print(f"  {stats['batches']} batches (avg {stats['applied'] / max(1, stats['batches']):.1f} orders), "
+          f"max observed lag {stats['max_observed_lag_seconds'] * 1e3:.1f} ms")
+    assert history == expected and list(history) == list(expected), "pipeline history differs"
+
+    run_durable(carts[:durable_orders], engine, lookup, now, max_batch_delay_ms)
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:5]]
+    run(*arguments)
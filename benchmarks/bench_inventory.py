@@ -0,0 +1,89 @@
+"""
+Contention benchmark for Inventory: many threads reserve and check out carts
+while a flash sale sends a share of them after one hot product. Compares one
+global lock (num_stripes=1) with striped locks, and checks that no unit is
+oversold: units committed + units on hand must equal the starting stock.
+Usage: python benchmarks/bench_inventory.py [--threads 8] [--carts 5000] [--hot-share 0.5]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import Inventory, OutOfStockError
+
+HOT_PRODUCT = 1
+
+
+def shopper(inventory, thread_id, num_carts, num_products, hot_share, now, committed, lock):
+    rng = random.Random(thread_id)
+    sold = {}
+    failed = 0
+    for cart_number in range(num_carts):
+        holder = (thread_id, cart_number)
+        cart = {}
+        if rng.random() < hot_share:
+            cart[HOT_PRODUCT] = 1
+        for product_id in rng.sample(range(2, num_products + 1), rng.randint(1, 3)):
+            cart[product_id] = rng.randint(1, 2)
+        try:
+            for product_id, quantity in cart.items():
+                inventory.reserve(holder, product_id, quantity, now)
+            inventory.commit(holder, cart, now)
+        except OutOfStockError:
+            failed += 1
+            for product_id in cart:
+                inventory.release(holder, product_id, now)
+            continue
+        for product_id, quantity in cart.items():
+            sold[product_id] = sold.get(product_id, 0) + quantity
+    with lock:
+        for product_id, quantity in sold.items():
+            committed[product_id] = committed.get(product_id, 0) + quantity
+        committed['failed'] = committed.get('failed', 0) + failed
+
+
+def run(num_stripes, threads, carts, num_products, hot_share, hot_stock):
+    stock = {product_id: 10 ** 9 for product_id in range(2, num_products + 1)}
+    stock[HOT_PRODUCT] = hot_stock
+    inventory = Inventory(stock, num_stripes=num_stripes, reservation_ttl=timedelta(minutes=15))
+    now = datetime(2025, 4, 26, 11, 41, 15)
+    committed = {}
+    lock = threading.Lock()
+    workers = [threading.Thread(target=shopper, args=(inventory, thread_id, carts, num_products, hot_share,
+                                                       now, committed, lock))
+               for thread_id in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+
+    for product_id, quantity in stock.items():
+        assert committed.get(product_id, 0) + inventory.on_hand(product_id) == quantity, f"product {product_id} oversold"
+        assert inventory.available(product_id, now) == inventory.on_hand(product_id), "reservation leaked"
+    total = threads * carts
+    print(f"stripes={num_stripes:<4} {total / seconds:12,.0f} checkouts/sec  "
+          f"hot product sold {committed.get(HOT_PRODUCT, 0)}/{hot_stock}, {committed.get('failed', 0)} carts refused")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory contention benchmark.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--carts", type=int, default=5_000, help="Checkouts attempted per thread.")
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--hot-share", type=float, default=0.5, help="Share of carts containing the hot product.")
+    parser.add_argument("--hot-stock", type=int, default=10_000, help="Starting stock of the hot product.")
+    args = parser.parse_args()
+    for num_stripes in (1, 16, 64):
+        run(num_stripes, args.threads, args.carts, args.products, args.hot_share, args.hot_stock)
+
+
+if __name__ == "__main__":
+    main()
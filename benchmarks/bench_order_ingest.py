@@ -0,0 +1,54 @@
+"""
+Measures order-log ingestion throughput for different worker counts and checks
+the result against update_copurchase_history() called once per order.
+Usage: python benchmarks/bench_order_ingest.py [num_orders] [num_products]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_ingest import ingest_orders
+
+import main
+
+
+def write_order_log(path, num_orders, num_products, seed=42):
+    rng = random.Random(seed)
+    orders = []
+    with open(path, "w", encoding="utf-8") as handle:
+        for order_id in range(num_orders):
+            items = [rng.randint(1, num_products) for _ in range(rng.randint(1, 6))]
+            orders.append(items)
+            handle.write(json.dumps({'order_id': order_id, 'items': items}) + "\n")
+    return orders
+
+
+def run(num_orders=200_000, num_products=5_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.jsonl")
+        orders = write_order_log(path, num_orders, num_products)
+        print(f"{num_orders} orders over {num_products} products ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        start = time.perf_counter()
+        expected = {}
+        for items in orders:
+            main.update_copurchase_history(dict.fromkeys(items), expected)
+        serial_seconds = time.perf_counter() - start
+        print(f"update_copurchase_history loop: {num_orders / serial_seconds:12,.0f} orders/sec (from memory)")
+
+        worker_counts = sorted({1, 2, os.cpu_count() or 1})
+        for workers in worker_counts:
+            history, stats = ingest_orders([path], workers=workers)
+            assert history == expected and list(history) == list(expected), "ingested history differs"
+            print(f"ingest_orders workers={workers:<3}       {stats.orders / stats.seconds:12,.0f} orders/sec "
+                  f"({stats.distinct_pairs} distinct pairs)")
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:3]]
+    run(*arguments)
@@ -0,0 +1,95 @@
+"""
+Measures the promotion rule engine (promotion_rules.py). First checks that the
+default rule set prices carts exactly like PricingEngine.price_cart(), then
+prices the same carts with growing numbers of extra category and bundle rules.
+Per-cart cost follows the number of rules that touch the cart's products
+(rules/line), not the size of the rule set: the last run adds 100,000 rules
+on products that are in no cart and costs the same as the default set.
+Usage: python benchmarks/bench_promotions.py [num_products] [num_carts]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing_engine import PricingEngine
+from promotion_rules import CompiledPromotions, default_promotions
+
+import synthetic
+
+import main
+
+
+def rules_per_line(promotions, carts):
+    """Average number of line and bundle rules the decision table returns per cart line."""
+    lines = [product_id for cart in carts for product_id in cart]
+    touching = sum(len(promotions.line_rules.get(product_id, ())) + len(promotions.bundles_by_product.get(product_id, ()))
+                   for product_id in lines)
+    return touching / len(lines)
+
+
+def extra_rules(product_ids, num_rules, seed=42):
+    """Returns (categories, rules): half category sales, half two-product bundles."""
+    rng = random.Random(seed)
+    categories = {}
+    rules = []
+    for index in range(num_rules):
+        if index % 2 == 0:
+            name = f"category-{index}"
+            categories[name] = rng.sample(product_ids, 10)
+            rules.append({'type': 'category_percent', 'category': name, 'value': rng.choice([0.05, 0.10]),
+                          'group': "category", 'exclusive': rng.random() < 0.1})
+        else:
+            rules.append({'type': 'bundle', 'products': rng.sample(product_ids, 2), 'discount': 5.0})
+    return categories, rules
+
+
+def time_carts(promotions, carts, lookup, now):
+    start = time.perf_counter()
+    for cart in carts:
+        promotions.price_cart(cart, lookup, now)
+    return (time.perf_counter() - start) / len(carts)
+
+
+def run(num_products=20_000, num_carts=5_000):
+    products = synthetic.make_catalog(num_products)
+    lookup = {product['id']: product for product in products}
+    product_ids = list(lookup)
+    now = main.app.simulated_now
+    bogo_ids, flash_sales, tiered_discounts = synthetic.make_promotions(lookup, now)
+    carts = synthetic.make_carts(lookup, num_carts)
+    print(f"{num_carts:,} carts over {num_products:,} products")
+
+    engine = PricingEngine(bogo_ids, flash_sales, tiered_discounts)
+    start = time.perf_counter()
+    for cart in carts:
+        engine.price_cart(cart, lookup, now)
+    builtin = (time.perf_counter() - start) / num_carts
+    for cart in carts:
+        assert engine.price_cart_promotions(cart, lookup, now) == engine.price_cart(cart, lookup, now), \
+            "default rule set differs from price_cart()"
+    print(f"{'built-in rules (price_cart)':<36}{builtin * 1e6:8.2f} us/cart")
+
+    base = default_promotions(bogo_ids, flash_sales, tiered_discounts)
+    in_carts = {product_id for cart in carts for product_id in cart}
+    elsewhere = [product_id for product_id in product_ids if product_id not in in_carts]
+    runs = [(0, product_ids, ""), (1_000, product_ids, ""), (10_000, product_ids, ""), (100_000, product_ids, "")]
+    if len(elsewhere) >= 10:
+        runs.append((100_000, elsewhere, " elsewhere"))
+    for num_rules, targets, suffix in runs:
+        categories, rules = extra_rules(targets, num_rules)
+        config = {'categories': categories, 'rules': rules + base['rules']}
+        start = time.perf_counter()
+        promotions = CompiledPromotions(config)
+        compile_seconds = time.perf_counter() - start
+        per_cart = time_carts(promotions, carts, lookup, now)
+        label = f"default + {num_rules:,} rules{suffix}"
+        print(f"{label:<36}{per_cart * 1e6:8.2f} us/cart   {rules_per_line(promotions, carts):6.2f} rules/line   "
+              f"(compile {compile_seconds * 1e3:8.1f} ms)")
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:3]]
+    run(*arguments)
@@ -0,0 +1,54 @@
+"""
+Measures how ShardedRecommender throughput scales with the number of shards
+(one worker process each) and checks every result against single-process
+get_recommendations(). Speedups need as many free cores as shards.
+Usage: python benchmarks/bench_sharded_recommendations.py [num_products] [num_orders] [num_carts]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sharded_recommendations import ShardedRecommender
+
+import synthetic
+
+import main
+
+BATCH_SIZE = 1_000  # Carts per fan-out round trip
+
+
+def run(num_products=20_000, num_orders=100_000, num_carts=2_000, cart_size=8):
+    product_ids = range(1, num_products + 1)
+    history = {}
+    for order in synthetic.make_orders(product_ids, num_orders, max_order_size=10):
+        main.update_copurchase_history(dict.fromkeys(order), history)
+    carts = synthetic.make_carts(product_ids, num_carts, cart_size)
+    print(f"{num_products:,} products, {sum(len(row) for row in history.values()):,} co-purchase pairs, "
+          f"{num_carts:,} carts; {os.cpu_count()} CPU(s)")
+
+    start = time.perf_counter()
+    expected = [main.get_recommendations(cart, history, None) for cart in carts]
+    serial_seconds = time.perf_counter() - start
+    print(f"get_recommendations (1 process): {num_carts / serial_seconds:12,.0f} carts/sec")
+
+    shard_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    one_shard = None
+    for num_shards in shard_counts:
+        with ShardedRecommender(history, num_shards) as recommender:
+            recommender.recommend_many(carts[:BATCH_SIZE])  # Warm-up
+            start = time.perf_counter()
+            results = []
+            for offset in range(0, num_carts, BATCH_SIZE):
+                results.extend(recommender.recommend_many(carts[offset:offset + BATCH_SIZE]))
+            seconds = time.perf_counter() - start
+        assert results == expected, "sharded recommendations differ from get_recommendations"
+        one_shard = one_shard or seconds
+        print(f"ShardedRecommender shards={num_shards:<3}    {num_carts / seconds:12,.0f} carts/sec "
+              f"(x{one_shard / seconds:.2f} vs 1 shard)")
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:4]]
+    run(*arguments)
@@ -0,0 +1,62 @@
+"""
+Measures the cold start cost of main.py: `import main` in a fresh interpreter,
+then the first use of the lazily built application context (catalog, pricing
+engine, cart). Also checks that the import prints nothing, and lists the
+slowest modules reported by python -X importtime.
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.app.shopping_cart, main.app.search_index, main.app.catalog_views, main.app.inventory
+ready = time.perf_counter()
+print(f"{imported - start} {ready - imported}")
+"""
+
+
+def run_probe():
+    result = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    lines = result.stdout.splitlines()
+    assert len(lines) == 1, f"import main printed output: {lines[:-1]}"
+    import_seconds, context_seconds = (float(value) for value in lines[0].split())
+    return import_seconds, context_seconds
+
+
+def slowest_imports(limit=8):
+    """Returns (cumulative microseconds, module) for the slowest imports in `python -c "import main"`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        timings.append((int(cumulative), module.rstrip()))
+    return sorted(timings, reverse=True)[:limit]
+
+
+def run(runs=20):
+    samples = [run_probe() for _ in range(runs)]
+    import_times = [import_seconds * 1e3 for import_seconds, _ in samples]
+    context_times = [context_seconds * 1e3 for _, context_seconds in samples]
+    print(f"import main (cold, {runs} runs): median {statistics.median(import_times):6.2f} ms, "
+          f"min {min(import_times):6.2f} ms")
+    print(f"first use of main.app:          median {statistics.median(context_times):6.2f} ms, "
+          f"min {min(context_times):6.2f} ms")
+    print("Slowest imports (cumulative):")
+    for microseconds, module in slowest_imports():
+        print(f"  {microseconds / 1e3:8.2f} ms  {module}")
+
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:2]]
+    run(*arguments)
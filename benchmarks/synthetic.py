@@ -0,0 +1,72 @@
+"""
+Synthetic data generators for the benchmarks: catalogs, promotion sets, carts
+and order histories. Everything is seeded, so a given scale always produces
+the same data.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+_NAME_WORDS = ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Webcam', 'Dock', 'Cable', 'Charger',
+               'Headset', 'Speaker', 'Tablet', 'Stand', 'Hub', 'Drive', 'Case', 'Lamp']
+
+
+def make_catalog(num_products, seed=42):
+    """Returns a products list shaped like main.products, ids 1..num_products."""
+    rng = random.Random(seed)
+    return [{"id": product_id,
+             "name": f"{rng.choice(_NAME_WORDS)} {rng.choice(_NAME_WORDS)} {product_id}",
+             "price": round(rng.uniform(1, 500), 2)}
+            for product_id in range(1, num_products + 1)]
+
+
+def make_promotions(product_ids, now, flash_fraction=0.1, bogo_fraction=0.05, seed=42):
+    """
+    Returns (bogo_ids, flash_sales, tiered_discounts) in the shapes main.py uses.
+    About flash_fraction of the products get a sale window somewhere within a day
+    of now (some overlap, some expired, some upcoming).
+    """
+    rng = random.Random(seed)
+    product_ids = list(product_ids)
+    flash_sales = []
+    for _ in range(int(len(product_ids) * flash_fraction)):
+        start = now + timedelta(minutes=rng.randint(-24 * 60, 24 * 60))
+        percent = rng.random() < 0.5
+        flash_sales.append({
+            'product_id': rng.choice(product_ids),
+            'start_time': start,
+            'end_time': start + timedelta(minutes=rng.randint(30, 24 * 60)),
+            'discount_type': 'percent' if percent else 'fixed',
+            'value': rng.choice([0.10, 0.20, 0.35]) if percent else rng.choice([5.00, 10.00, 25.00]),
+        })
+    bogo_ids = set(rng.sample(product_ids, max(1, int(len(product_ids) * bogo_fraction))))
+    tiered_discounts = [(500.00, 0.20), (200.00, 0.15), (100.00, 0.08)]
+    return bogo_ids, flash_sales, tiered_discounts
+
+
+def _popularity(num_products, skew):
+    # Zipf-like weights: a few products are in many carts, most are rare
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, num_products + 1)))
+
+
+def make_carts(product_ids, num_carts, cart_size=5, max_quantity=4, skew=1.0, seed=42):
+    """Returns num_carts cart dicts of (up to) cart_size distinct products each."""
+    rng = random.Random(seed)
+    product_ids = list(product_ids)
+    cumulative = _popularity(len(product_ids), skew)
+    carts = []
+    for _ in range(num_carts):
+        cart = {}
+        for product_id in rng.choices(product_ids, cum_weights=cumulative, k=cart_size):
+            cart[product_id] = rng.randint(1, max_quantity)
+        carts.append(cart)
+    return carts
+
+
+def make_orders(product_ids, num_orders, max_order_size=6, skew=1.0, seed=7):
+    """Returns an order history: a list of product id lists (each like a checked-out cart's keys)."""
+    rng = random.Random(seed)
+    product_ids = list(product_ids)
+    cumulative = _popularity(len(product_ids), skew)
+    return [list(dict.fromkeys(rng.choices(product_ids, cum_weights=cumulative, k=rng.randint(1, max_order_size))))
+            for _ in range(num_orders)]
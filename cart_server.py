@@ -0,0 +1,175 @@
+"""
+Asyncio front end for CartService: one JSON object per line over a local socket.
+
+Request:  {"id": 7, "op": "add", "session": "alice", "product_id": 2, "quantity": 1}
+Response: {"id": 7, "ok": true, "quantity": 1}
+Errors:   {"id": 7, "ok": false, "error": "Product ID 99 not found."}
+
+Ops: ping, add, remove, view, total, checkout, stock.
+Adding reserves stock for the session and checkout commits the whole cart
+(see inventory.py); an out-of-stock add or checkout fails and leaves the cart as it was.
+Requests longer than MAX_REQUEST_BYTES get an error response and the connection is closed.
+Run with: python cart_server.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--stock N]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from cart_service import CartError, CartService
+
+MAX_REQUEST_BYTES = 64 * 1024  # StreamReader limit for one request line
+
+
+def _cart_items(cart):
+    # JSON object keys must be strings, so carts travel as [[product_id, quantity], ...]
+    return [[product_id, quantity] for product_id, quantity in cart.items()]
+
+
+def _field(request, name):
+    if name not in request:
+        raise CartError(f"Missing field '{name}'.")
+    return request[name]
+
+
+class CartRequestHandler:
+    """Decodes one request dict, calls the CartService and builds the response dict."""
+
+    def __init__(self, service, clock):
+        self.service = service
+        self.clock = clock  # Returns the current_time used for flash sales
+        self._ops = {
+            'ping': self._ping,
+            'add': self._add,
+            'remove': self._remove,
+            'view': self._view,
+            'total': self._total,
+            'checkout': self._checkout,
+            'stock': self._stock,
+        }
+
+    def handle(self, request):
+        response = {'id': request.get('id')}
+        op = self._ops.get(request.get('op'))
+        if op is None:
+            response.update(ok=False, error=f"Unknown op: {request.get('op')!r}")
+            return response
+        try:
+            response.update(op(request))
+            response['ok'] = True
+        except KeyError as error:
+            # Request fields go through _field(), so this is a product missing from the catalog
+            response.update(ok=False, error=f"Product ID {error.args[0]} not found.")
+        except (CartError, TypeError, ValueError) as error:
+            response.update(ok=False, error=str(error))
+        return response
+
+    def _ping(self, request):
+        return {}
+
+    def _add(self, request):
+        quantity = self.service.add_to_cart(_field(request, 'session'), int(_field(request, 'product_id')),
+                                            int(request.get('quantity', 1)), self.clock())
+        return {'quantity': quantity}
+
+    def _remove(self, request):
+        quantity = self.service.remove_from_cart(_field(request, 'session'), int(_field(request, 'product_id')),
+                                                 int(request.get('quantity', 1)), self.clock())
+        return {'quantity': quantity}
+
+    def _view(self, request):
+        return {'cart': _cart_items(self.service.get_cart(_field(request, 'session')))}
+
+    def _total(self, request):
+        return {'totals': self.service.calculate_total(_field(request, 'session'), self.clock())}
+
+    def _checkout(self, request):
+        cart, totals = self.service.checkout(_field(request, 'session'), self.clock())
+        return {'cart': _cart_items(cart), 'totals': totals}
+
+    def _stock(self, request):
+        inventory = self.service.inventory
+        if inventory is None:
+            raise CartError("This server does not track inventory.")
+        product_id = int(_field(request, 'product_id'))
+        return {'on_hand': inventory.on_hand(product_id), 'available': inventory.available(product_id, self.clock())}
+
+
+async def _serve_connection(handler, reader, writer):
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:  # Over the reader limit (LimitOverrunError); the stream cannot resync
+                response = {'id': None, 'ok': False, 'error': f"Request too long (limit {MAX_REQUEST_BYTES} bytes)."}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+                break
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object.")
+                response = handler.handle(request)
+            except ValueError as error:
+                response = {'id': None, 'ok': False, 'error': f"Bad request: {error}"}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            # Only wait when the socket buffer is backing up
+            if writer.transport.get_write_buffer_size() > 64 * 1024:
+                await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(handler, host="127.0.0.1", port=8765, unix_path=None):
+    """Starts listening and returns the asyncio Server (port=0 picks a free port)."""
+    def on_connect(reader, writer):
+        return _serve_connection(handler, reader, writer)
+
+    if unix_path:
+        return await asyncio.start_unix_server(on_connect, path=unix_path, limit=MAX_REQUEST_BYTES)
+    return await asyncio.start_server(on_connect, host, port, backlog=4096, limit=MAX_REQUEST_BYTES)
+
+
+async def serve_forever(handler, host, port, unix_path=None):
+    server = await start_server(handler, host, port, unix_path)
+    if unix_path:
+        print(f"Listening on {unix_path}", flush=True)
+    else:
+        bound_host, bound_port = server.sockets[0].getsockname()[:2]
+        print(f"Listening on {bound_host}:{bound_port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line-delimited JSON cart server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", dest="unix_path", help="Serve on a Unix domain socket instead of TCP.")
+    parser.add_argument("--shards", type=int, default=64, help="Number of lock stripes for carts.")
+    parser.add_argument("--stock", type=int, help="Units on hand of every product (default: main.INITIAL_STOCK).")
+    args = parser.parse_args()
+
+    from main import app as shop  # Catalog, pricing rules, stock and simulated time
+
+    inventory = shop.inventory
+    if args.stock is not None:
+        for product in shop.products:
+            inventory.set_stock(product['id'], args.stock)
+    service = CartService(shop.product_lookup, shop.pricing_engine, num_shards=args.shards, inventory=inventory)
+    # Simulated time moves with the wall clock so reservations expire
+    started = time.monotonic()
+    handler = CartRequestHandler(service, clock=lambda: shop.simulated_now + timedelta(seconds=time.monotonic() - started))
+    try:
+        asyncio.run(serve_forever(handler, args.host, args.port, args.unix_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import threading
+import zlib
+
+from inventory import InventoryError
+
+
+# --- Multi-Session Cart Service ---
+# Many shopping carts keyed by session id, safe to use from many threads.
+# Carts live in a fixed number of shards, each guarded by its own lock
+# (lock striping), so sessions in different shards never wait on each other.
+# Pricing runs on a copy of the cart taken under the lock, so the expensive
+# part of calculate_total happens outside any lock.
+# With an Inventory (see inventory.py), adding an item reserves it for the
+# session, removing it releases the hold, and checkout commits the whole cart
+# atomically, so concurrent sessions cannot oversell. These calls run under
+# the session's shard lock; Inventory never takes a shard lock, so the nesting
+# cannot deadlock.
+
+
+class CartError(ValueError):
+    """Raised for invalid cart operations (unknown product, bad quantity, ...)."""
+
+
+class _Shard:
+    __slots__ = ('lock', 'carts')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.carts = {}  # {session_id: {product_id: quantity}}
+
+
+class CartService:
+    """Thread-safe store of carts for many concurrent sessions."""
+
+    def __init__(self, lookup, pricing_engine, num_shards=64, inventory=None):
+        """inventory: optional Inventory; holds are keyed by session id."""
+        if num_shards <= 0:
+            raise ValueError("num_shards must be positive.")
+        self.lookup = lookup
+        self.pricing_engine = pricing_engine
+        self.inventory = inventory
+        self._shards = [_Shard() for _ in range(num_shards)]
+
+    def _shard(self, session_id):
+        # crc32 instead of hash() so shard placement is stable across processes
+        return self._shards[zlib.crc32(str(session_id).encode("utf-8")) % len(self._shards)]
+
+    def _require_time(self, current_time):
+        if self.inventory is not None and current_time is None:
+            raise ValueError("current_time is required when the service tracks inventory.")
+
+    def add_to_cart(self, session_id, product_id, quantity=1, current_time=None):
+        """
+        Adds quantity of a product to the session's cart. Returns the new line quantity.
+        With inventory, the units are reserved first (CartError if out of stock).
+        """
+        if product_id not in self.lookup:
+            raise CartError(f"Product ID {product_id} not found.")
+        if quantity <= 0:
+            raise CartError("Quantity must be positive.")
+        self._require_time(current_time)
+        shard = self._shard(session_id)
+        with shard.lock:
+            if self.inventory is not None:
+                try:
+                    self.inventory.reserve(session_id, product_id, quantity, current_time)
+                except InventoryError as exc:
+                    raise CartError(str(exc)) from exc
+            cart = shard.carts.setdefault(session_id, {})
+            cart[product_id] = cart.get(product_id, 0) + quantity
+            return cart[product_id]
+
+    def remove_from_cart(self, session_id, product_id, quantity=1, current_time=None):
+        """Removes up to quantity of a product. Returns the remaining line quantity (0 if removed)."""
+        if quantity <= 0:
+            raise CartError("Quantity must be positive.")
+        self._require_time(current_time)
+        shard = self._shard(session_id)
+        with shard.lock:
+            cart = shard.carts.get(session_id)
+            if not cart or product_id not in cart:
+                raise CartError(f"Product ID {product_id} not in cart.")
+            if self.inventory is not None:
+                self.inventory.release(session_id, product_id, current_time, min(quantity, cart[product_id]))
+            if cart[product_id] > quantity:
+                cart[product_id] -= quantity
+                return cart[product_id]
+            del cart[product_id]
+            if not cart:
+                del shard.carts[session_id]
+            return 0
+
+    def get_cart(self, session_id):
+        """Returns a copy of the session's cart (empty dict if it has none)."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            return dict(shard.carts.get(session_id, {}))
+
+    def calculate_total(self, session_id, current_time):
+        """Prices a snapshot of the session's cart; same breakdown as calculate_total()."""
+        return self.pricing_engine.price_cart(self.get_cart(session_id), self.lookup, current_time)
+
+    def checkout(self, session_id, current_time):
+        """
+        Atomically takes the session's cart out of the store (and, with inventory,
+        out of stock) and prices it. Returns (cart, totals); raises CartError if the
+        cart is empty or cannot be filled, leaving the cart as it was.
+        """
+        shard = self._shard(session_id)
+        with shard.lock:
+            cart = shard.carts.get(session_id)
+            if not cart:
+                raise CartError("Your cart is empty.")
+            if self.inventory is not None:
+                try:
+                    self.inventory.commit(session_id, cart, current_time)
+                except InventoryError as exc:
+                    raise CartError(str(exc)) from exc
+            del shard.carts[session_id]
+        return cart, self.pricing_engine.price_cart(cart, self.lookup, current_time)
+
+    def clear(self, session_id, current_time=None):
+        """Empties the session's cart, releasing its holds."""
+        self._require_time(current_time)
+        shard = self._shard(session_id)
+        with shard.lock:
+            cart = shard.carts.pop(session_id, None)
+            if cart and self.inventory is not None:
+                for product_id in cart:
+                    self.inventory.release(session_id, product_id, current_time)
+
+    def session_count(self):
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.carts)
+        return total
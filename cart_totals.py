@@ -0,0 +1,139 @@
+from collections.abc import MutableMapping
+
+
+# --- Incremental Cart Totals ---
+# calculate_total() re-prices every line each time a cart is viewed or checked
+# out. IncrementalCart is a drop-in replacement for the {product_id: quantity}
+# cart dict that prices a line when it changes and keeps running cart-level
+# sums, so add_to_cart()/remove_from_cart() do not re-price the cart and
+# reading the totals only has to apply the tier.
+# The sums must be bit-identical to calculate_total(), which adds the line
+# floats left to right in cart order: a sum that is off by one ulp can land on
+# the other side of a tier threshold. Adding a new product appends to the
+# running sums in that same order. Changing or removing an existing line
+# marks them stale, and the next breakdown() re-adds the cached line totals
+# in cart order (no line is re-priced).
+
+
+class IncrementalCart(MutableMapping):
+    """
+    {product_id: quantity} mapping that maintains its price breakdown as it changes.
+    Lines are priced with pricing_engine's compiled rules at current_time.
+    A rule change (pricing_engine.invalidate()/rebuild()) is picked up
+    automatically; call set_time() when the clock moves, or reprice() after
+    editing product prices in lookup.
+    """
+
+    def __init__(self, lookup, pricing_engine, current_time, items=()):
+        self.lookup = lookup
+        self.pricing_engine = pricing_engine
+        self.current_time = current_time
+        self._quantities = {}
+        self._lines = {}  # {product_id: (line_total, item_discount, note)}
+        self._subtotal = 0.0
+        self._item_discount = 0.0
+        self._sums_stale = False
+        self._rules = pricing_engine.rules  # Rules the current lines were priced with
+        self.update(items)
+
+    # --- Mapping protocol ---
+
+    def __getitem__(self, product_id):
+        return self._quantities[product_id]
+
+    def __contains__(self, product_id):
+        return product_id in self._quantities
+
+    def __iter__(self):
+        return iter(self._quantities)
+
+    def __len__(self):
+        return len(self._quantities)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._quantities!r})"
+
+    def __setitem__(self, product_id, quantity):
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        self._sync_rules()
+        if product_id in self._lines:
+            self._sums_stale = True  # The line keeps its place in cart order
+        self._quantities[product_id] = quantity
+        self._price(product_id)
+
+    def __delitem__(self, product_id):
+        self._sync_rules()  # Before the removal: reprice() rebuilds _lines from _quantities
+        del self._quantities[product_id]
+        del self._lines[product_id]
+        self._sums_stale = True
+
+    def clear(self):
+        self._quantities.clear()
+        self._lines.clear()
+        self._subtotal = 0.0
+        self._item_discount = 0.0
+        self._sums_stale = False
+
+    # --- Line bookkeeping ---
+
+    def _price(self, product_id):
+        price_of = getattr(self.lookup, 'price_of', None)  # CatalogStore: skip building product views
+        price = price_of(product_id) if price_of else self.lookup[product_id]['price']
+        line = self._rules.price_line(product_id, self._quantities[product_id], price, self.current_time)
+        self._lines[product_id] = line
+        if not self._sums_stale:
+            # Appending in cart order: the same additions calculate_total() makes
+            self._subtotal += line[0]
+            if line[2] is not None:
+                self._item_discount += line[1]
+
+    def _resum(self):
+        lines = self._lines
+        subtotal = 0.0
+        item_discount = 0.0
+        for product_id in self._quantities:
+            line_total, discount, note = lines[product_id]
+            subtotal += line_total
+            if note is not None:
+                item_discount += discount
+        self._subtotal = subtotal
+        self._item_discount = item_discount
+        self._sums_stale = False
+
+    def _sync_rules(self):
+        if self.pricing_engine.rules is not self._rules:
+            self.reprice()
+
+    # --- Totals ---
+
+    def reprice(self):
+        """Re-prices every line from scratch with the current rules, time and prices."""
+        self._rules = self.pricing_engine.rules
+        self._lines.clear()
+        self._subtotal = 0.0
+        self._item_discount = 0.0
+        self._sums_stale = False
+        for product_id in self._quantities:
+            self._price(product_id)
+
+    def set_time(self, current_time):
+        """Moves the cart's clock; lines are re-priced only if the time actually changed."""
+        if current_time != self.current_time:
+            self.current_time = current_time
+            self.reprice()
+
+    def line(self, product_id):
+        """Returns (line_total, item_discount, note) for one line."""
+        self._sync_rules()
+        return self._lines[product_id]
+
+    def breakdown(self):
+        """Returns the same breakdown dictionary as calculate_total() for this cart."""
+        self._sync_rules()
+        if self._sums_stale:
+            self._resum()
+        lines = self._lines
+        discount_details = [{'id': product_id, 'note': lines[product_id][2]}
+                            for product_id in self._quantities if lines[product_id][2] is not None]
+        return self._rules.summarize(self._subtotal, self._item_discount, discount_details)
@@ -0,0 +1,203 @@
+import operator
+from array import array
+from collections.abc import Mapping
+from itertools import repeat
+
+
+# --- Compact Catalog Store ---
+# Every product in `products` is a dict holding a boxed int, a str and a
+# boxed float, and product_lookup adds a dict slot per product on top:
+# several hundred bytes per SKU. CatalogStore keeps the catalog column-wise:
+#   ids, prices   typed arrays ('q' int64, 'd' float64), one slot per row
+#   names         one packed UTF-8 buffer plus start/length arrays per row
+#   row index     O(1) id -> row lookup: a direct-address array('q') indexed
+#                 by product id while ids are small non-negative ints (the usual
+#                 dense SKU numbering), switching to a {product_id: row} dict
+#                 once they get too sparse
+# It is a Mapping of product_id -> ProductView, so it can stand in for
+# product_lookup: lookup[product_id]['price'] keeps working. Tight loops can
+# skip the view with price_of(product_id).
+# Keys match ids the way dict keys do (numpy ints, True, 3.0 all find id 3
+# or 1), whichever row index is in use; ids are stored as plain ints.
+
+_DENSE_SLACK = 1024  # Ids below 4 * len(catalog) + this stay in the direct-address array
+
+
+def _as_product_id(product_id):
+    """The int id a key looks up as, or None if it cannot equal any int id."""
+    try:
+        return operator.index(product_id)  # int subclasses, numpy integers
+    except TypeError:
+        pass
+    try:
+        as_int = int(product_id)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return as_int if as_int == product_id else None  # 3.0 -> 3, but not 3.5 or "3"
+
+
+class ProductView(Mapping):
+    """Read-only product record backed by a CatalogStore row; supports product['price'] etc."""
+
+    __slots__ = ('_store', '_row')
+
+    _FIELDS = ('id', 'name', 'price')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def id(self):
+        return self._store._ids[self._row]
+
+    @property
+    def name(self):
+        return self._store.name_at(self._row)
+
+    @property
+    def price(self):
+        return self._store._prices[self._row]
+
+    def __getitem__(self, field):
+        if field == 'price':
+            return self._store._prices[self._row]
+        if field == 'id':
+            return self._store._ids[self._row]
+        if field == 'name':
+            return self._store.name_at(self._row)
+        raise KeyError(field)
+
+    def __iter__(self):
+        return iter(self._FIELDS)
+
+    def __len__(self):
+        return len(self._FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CatalogStore(Mapping):
+    """Array-backed catalog: product_id -> ProductView, in catalog (row) order. Ids must fit in int64."""
+
+    def __init__(self, product_list=()):
+        self._ids = array('q')
+        self._prices = array('d')
+        self._name_starts = array('q')
+        self._name_lengths = array('I')
+        self._names = bytearray()
+        self._dense_rows = array('q')  # Row by product id, -1 if absent; None once ids are sparse
+        self._row_by_id = None         # {product_id: row} after switching away from the array
+        for product in product_list:
+            self.add_product(product)
+
+    # --- Mapping protocol (drop-in for product_lookup) ---
+
+    def __getitem__(self, product_id):
+        return ProductView(self, self.row_of(product_id))
+
+    def __contains__(self, product_id):
+        return self._find_row(product_id) >= 0
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    # --- Row index ---
+
+    def _find_row(self, product_id):
+        if type(product_id) is not int:
+            product_id = _as_product_id(product_id)
+            if product_id is None:
+                return -1
+        dense_rows = self._dense_rows
+        if dense_rows is None:
+            return self._row_by_id.get(product_id, -1)
+        if 0 <= product_id < len(dense_rows):
+            return dense_rows[product_id]
+        return -1
+
+    def _index_row(self, product_id, row):
+        dense_rows = self._dense_rows
+        if dense_rows is not None:
+            if 0 <= product_id < 4 * len(self._ids) + _DENSE_SLACK:
+                if product_id >= len(dense_rows):
+                    # Grow geometrically so appends stay amortized O(1)
+                    size = min(max(product_id + 1, 2 * len(dense_rows)), 4 * len(self._ids) + _DENSE_SLACK)
+                    dense_rows.extend(repeat(-1, size - len(dense_rows)))
+                dense_rows[product_id] = row
+                return
+            self._row_by_id = {existing_id: existing_row for existing_row, existing_id in enumerate(self._ids)}
+            self._dense_rows = None
+        self._row_by_id[product_id] = row
+
+    # --- Maintenance ---
+
+    def add_product(self, product):
+        """Appends a product, or updates name/price in place if its id exists. Returns its row."""
+        product_id = operator.index(product['id'])  # TypeError for non-integer ids
+        encoded = product['name'].encode("utf-8")
+        row = self._find_row(product_id)
+        is_new = row < 0
+        if is_new:
+            row = len(self._ids)
+            self._ids.append(product_id)
+            self._prices.append(product['price'])
+            self._name_starts.append(0)
+            self._name_lengths.append(0)
+            self._index_row(product_id, row)
+        else:
+            self._prices[row] = product['price']
+        if is_new or encoded != self.name_bytes_at(row):
+            # Renames append to the name buffer; the old bytes are left unused
+            self._name_starts[row] = len(self._names)
+            self._name_lengths[row] = len(encoded)
+            self._names += encoded
+        return row
+
+    def set_price(self, product_id, price):
+        self._prices[self.row_of(product_id)] = price
+
+    # --- Row access ---
+
+    def row_of(self, product_id):
+        """Returns the row of a product id (KeyError if unknown)."""
+        row = self._find_row(product_id)
+        if row < 0:
+            raise KeyError(product_id)
+        return row
+
+    def price_of(self, product_id):
+        """Price of a product without building a ProductView."""
+        return self._prices[self.row_of(product_id)]
+
+    def id_at(self, row):
+        return self._ids[row]
+
+    def price_at(self, row):
+        return self._prices[row]
+
+    def name_bytes_at(self, row):
+        start = self._name_starts[row]
+        return bytes(self._names[start:start + self._name_lengths[row]])
+
+    def name_at(self, row):
+        start = self._name_starts[row]
+        return self._names[start:start + self._name_lengths[row]].decode("utf-8")
+
+    def products(self):
+        """Returns ProductViews for every row in catalog order (a stand-in for the products list)."""
+        return [ProductView(self, row) for row in range(len(self._ids))]
+
+    def columns(self):
+        """Returns the (ids, prices) arrays; treat them as read-only."""
+        return self._ids, self._prices
+
+    def to_dicts(self):
+        """Materializes the catalog as the original list of product dicts."""
+        names = self.name_at
+        return [{'id': product_id, 'name': names(row), 'price': price}
+                for row, (product_id, price) in enumerate(zip(self._ids, self._prices))]
@@ -0,0 +1,124 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+
+# --- Pre-Sorted Catalog Views ---
+# Keeps the catalog sorted by name and by price at all times, so a sorted page
+# is a slice (O(log n + page size)) and a price range is two bisects.
+# Each criterion has an ascending list keyed (value, position, id) and a
+# descending list keyed (value, -position, id) walked from the end; equal
+# values therefore keep catalog order in both directions, exactly like the
+# stable sorted(..., reverse=...) used by get_sorted_products().
+
+SORT_CRITERIA = ('name', 'price')
+
+Page = namedtuple('Page', ['products', 'next_cursor', 'total'])
+
+
+class CatalogViews:
+    """Sorted name/price views and a price range index over the catalog."""
+
+    def __init__(self, product_list=()):
+        self._products = {}   # {product_id: product}
+        self._keys = {}       # {product_id: (name, price, position)} as currently indexed
+        self._ascending = {criteria: [] for criteria in SORT_CRITERIA}
+        self._descending = {criteria: [] for criteria in SORT_CRITERIA}
+        self._next_position = 0
+        # Bulk build: sort once instead of inserting one by one
+        for product in product_list:
+            self._remember(product)
+        for criteria in SORT_CRITERIA:
+            index = 0 if criteria == 'name' else 1
+            self._ascending[criteria] = sorted(
+                (keys[index], keys[2], product_id) for product_id, keys in self._keys.items())
+            self._descending[criteria] = sorted(
+                (keys[index], -keys[2], product_id) for product_id, keys in self._keys.items())
+
+    def __len__(self):
+        return len(self._products)
+
+    def _remember(self, product):
+        product_id = product['id']
+        previous = self._keys.get(product_id)
+        if previous is not None:
+            position = previous[2]
+        else:
+            position = self._next_position
+            self._next_position += 1
+        self._products[product_id] = product
+        self._keys[product_id] = (product['name'], product['price'], position)
+        return position
+
+    # --- Maintenance ---
+
+    def add_product(self, product):
+        """Adds a product, or re-sorts it after a name/price edit (same id keeps its position)."""
+        if product['id'] in self._keys:
+            self._unlink(product['id'])
+        self._remember(product)
+        name, price, position = self._keys[product['id']]
+        for criteria, value in (('name', name), ('price', price)):
+            insort(self._ascending[criteria], (value, position, product['id']))
+            insort(self._descending[criteria], (value, -position, product['id']))
+
+    def remove_product(self, product_id):
+        if product_id in self._keys:
+            self._unlink(product_id)
+            del self._keys[product_id]
+            del self._products[product_id]
+
+    def _unlink(self, product_id):
+        name, price, position = self._keys[product_id]
+        for criteria, value in (('name', name), ('price', price)):
+            ascending = self._ascending[criteria]
+            del ascending[bisect_left(ascending, (value, position, product_id))]
+            descending = self._descending[criteria]
+            del descending[bisect_left(descending, (value, -position, product_id))]
+
+    # --- Queries ---
+
+    def sorted_page(self, criteria='name', reverse=False, offset=0, limit=10, cursor=None):
+        """
+        Returns one Page of products sorted by criteria.
+        Pass the previous page's next_cursor to continue after it (stable even
+        if products are added or removed in between), or use offset/limit.
+        """
+        if criteria not in SORT_CRITERIA:
+            raise ValueError(f"Invalid sort criteria: {criteria!r}")
+        entries = self._descending[criteria] if reverse else self._ascending[criteria]
+        total = len(entries)
+
+        if reverse:
+            # Walk the descending list from its end
+            start = total - 1 - offset if cursor is None else bisect_left(entries, cursor) - 1
+            stop = max(start - limit, -1)
+            indexes = range(start, stop, -1)
+            has_more = stop >= 0
+        else:
+            start = offset if cursor is None else bisect_right(entries, cursor)
+            stop = min(start + limit, total)
+            indexes = range(start, stop)
+            has_more = stop < total
+
+        selected = [entries[index] for index in indexes]
+        next_cursor = selected[-1] if selected and has_more else None
+        products = self._products
+        return Page([products[entry[2]] for entry in selected], next_cursor, total)
+
+    def price_range(self, min_price=0.0, max_price=float('inf'), offset=0, limit=None):
+        """
+        Returns a Page of products with min_price <= price <= max_price, cheapest
+        first. Found with two bisects over the price-sorted view (LeetCode: Binary Search).
+        Here next_cursor is the offset of the next page (None on the last page).
+        """
+        if min_price > max_price:
+            min_price, max_price = max_price, min_price
+        entries = self._ascending['price']
+        low = bisect_left(entries, (min_price,))
+        high = bisect_right(entries, (max_price, float('inf')))
+        start = low + offset
+        stop = high if limit is None else min(start + limit, high)
+        products = self._products
+        selected = [products[entries[index][2]] for index in range(start, stop)]
+        next_offset = offset + len(selected) if stop < high else None
+        return Page(selected, next_offset, high - low)
@@ -0,0 +1,136 @@
+from bisect import bisect_right
+
+from money import RATE_SCALE, apply_rate, format_cents, to_cents, to_dollars, to_rate
+
+
+# --- Integer-Cents Pricing ---
+# The float path (calculate_total / price_cart) sums float dollars, so totals
+# depend on summation order and drift in the last bits. This path prices in
+# integer cents with one defined rounding rule per discount type:
+#   * unit prices        converted to whole cents, half away from zero
+#   * BOGO               free items x unit price - exact, no rounding
+#   * flash percent      line total x rate, rounded half up to the cent per line
+#   * flash fixed        fixed amount (in cents) x quantity, capped at the line total - exact
+#   * tiered             subtotal after item discounts x rate, rounded half up once per cart
+# Rates are integer parts per million (see money.py). BOGO vs Flash is decided
+# on the rounded cent amounts (BOGO wins ties, Flash must be strictly better),
+# and tier thresholds are compared in cents. Totals are exact integers, so
+# they are identical however carts are batched or summed.
+
+FLASH_PERCENT = 1
+FLASH_FIXED = 2
+
+CENTS_FIELDS = (
+    'subtotal_before_discounts_cents',
+    'total_item_discount_cents',
+    'tiered_discount_amount_cents',
+    'total_discount_applied_cents',
+    'final_total_cents',
+)
+
+
+class _CentsByPrice(dict):
+    """{float price: cents}, filled on first use; a catalog has few distinct prices."""
+
+    def __missing__(self, price):
+        cents = self[price] = to_cents(price)
+        return cents
+
+
+class CentsPricingRules:
+    """Integer-cents form of a CompiledPricingRules (see PricingEngine.cents_rules)."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.bogo_ids = rules.bogo_ids
+        self._first_active = rules.flash_index.first_active
+        self.flash_terms = {}  # {id(sale): (FLASH_PERCENT, rate) or (FLASH_FIXED, cents)}
+        sale_product_ids = set()
+        for _, _, _, sale in rules.flash_index.iter_entries():
+            sale_product_ids.add(sale['product_id'])
+            if sale['discount_type'] == 'percent':
+                self.flash_terms[id(sale)] = (FLASH_PERCENT, to_rate(sale['value']))
+            elif sale['discount_type'] == 'fixed':
+                self.flash_terms[id(sale)] = (FLASH_FIXED, to_cents(sale['value']))
+        # Most lines have no sale at all; checking this set skips the interval tree lookup
+        self.sale_product_ids = frozenset(sale_product_ids)
+        # Lines for any other product have no item discount, so there is nothing to round
+        self.discounted_ids = self.bogo_ids | self.sale_product_ids
+        self.tier_thresholds = [to_cents(threshold) for threshold in rules.tier_thresholds]
+        # (rate in parts per million, percentage shown in the breakdown)
+        self.tier_table = [(to_rate(percentage), percentage * 100) for _, percentage in rules.tier_table]
+        self.cents_by_price = _CentsByPrice()
+
+    def price_cents(self, price):
+        """Unit price in cents (cached in cents_by_price)."""
+        return self.cents_by_price[price]
+
+    def flash_terms_for(self, product_id, current_time):
+        """Returns (kind, amount) of the active flash sale in integer form, or None."""
+        if product_id not in self.sale_product_ids:
+            return None
+        sale = self._first_active(product_id, current_time)
+        return self.flash_terms.get(id(sale)) if sale else None
+
+    def price_line(self, product_id, quantity, price_cents, current_time):
+        """Integer version of CompiledPricingRules.price_line(): (line_cents, discount_cents, note)."""
+        line_cents = price_cents * quantity
+
+        bogo_cents = 0
+        flash_cents = 0
+
+        if product_id in self.bogo_ids:
+            free_items = quantity // 2
+            if free_items > 0:
+                bogo_cents = free_items * price_cents
+
+        sale = self._first_active(product_id, current_time) if product_id in self.sale_product_ids else None
+        if sale:
+            kind, amount = self.flash_terms[id(sale)]
+            if kind == FLASH_PERCENT:
+                flash_cents = (line_cents * amount + RATE_SCALE // 2) // RATE_SCALE  # apply_rate(), inlined
+            else:
+                flash_cents = min(line_cents, amount * quantity)
+
+        # BOGO wins ties, Flash must be strictly better
+        if bogo_cents > 0 and bogo_cents >= flash_cents:
+            return line_cents, bogo_cents, f"(-${format_cents(bogo_cents)} BOGO)"
+        if flash_cents > 0 and flash_cents > bogo_cents:
+            return line_cents, flash_cents, f"(-${format_cents(flash_cents)} Flash Sale)"
+        return line_cents, 0, None
+
+    def tier_for(self, subtotal_cents):
+        """Returns (rate, percentage) of the tier that applies to a subtotal in cents, or None."""
+        index = bisect_right(self.tier_thresholds, subtotal_cents)
+        return self.tier_table[index - 1] if index else None
+
+    def summarize(self, subtotal_cents, item_discount_cents, discount_details):
+        """Applies the tier and builds the cents breakdown dict."""
+        subtotal_after_item_discounts = subtotal_cents - item_discount_cents
+
+        tiered_discount_cents = 0
+        applied_tiered_percentage = 0.0
+        tier = self.tier_for(subtotal_after_item_discounts)
+        if tier is not None:
+            tiered_discount_cents = apply_rate(subtotal_after_item_discounts, tier[0])
+            applied_tiered_percentage = tier[1]
+
+        return {
+            'subtotal_before_discounts_cents': subtotal_cents,
+            'total_item_discount_cents': item_discount_cents,
+            'tiered_discount_percentage': applied_tiered_percentage,
+            'tiered_discount_amount_cents': tiered_discount_cents,
+            'total_discount_applied_cents': item_discount_cents + tiered_discount_cents,
+            'final_total_cents': subtotal_after_item_discounts - tiered_discount_cents,
+            'discount_details': discount_details
+        }
+
+
+def breakdown_in_dollars(breakdown):
+    """Converts a cents breakdown to the calculate_total() shape (float dollars) for display."""
+    dollars = {field[:-len('_cents')]: to_dollars(breakdown[field]) for field in CENTS_FIELDS}
+    dollars['tiered_discount_percentage'] = breakdown['tiered_discount_percentage']
+    dollars['discount_details'] = breakdown['discount_details']
+    return {field: dollars[field] for field in (
+        'subtotal_before_discounts', 'total_item_discount', 'tiered_discount_percentage',
+        'tiered_discount_amount', 'total_discount_applied', 'final_total', 'discount_details')}
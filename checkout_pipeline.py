@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+
+from instrumentation import get_logger
+
+
+# --- Checkout Pipeline (write-behind history updates) ---
+# Checkout prices and confirms an order right away and hands the order to a
+# background worker, which applies co-purchase updates in micro-batches.
+# The hand-off queue is bounded: when the worker falls behind, submit()
+# blocks (backpressure) instead of letting memory grow. The worker starts a
+# batch with the first waiting order and collects more for at most
+# max_batch_delay seconds or until batch_size orders, so the model trails
+# checkouts by max_batch_delay plus the time to apply one batch (stats()
+# reports the largest lag seen). close() (or flush()) waits until every
+# submitted order has been applied.
+# What this buys is latency isolation: a checkout no longer waits for the
+# model update. It does not add CPU; with the GIL, CPU-bound updates cost the
+# same on the worker thread as inline. Throughput only goes up when applying a
+# batch is cheaper than applying its orders one at a time, e.g. one flush and
+# fsync per batch with CopurchaseStore.record_checkouts() instead of one per
+# order (see benchmarks/bench_checkout_pipeline.py).
+# The worker holds `lock` while it applies a batch; hold it too while reading
+# the history (e.g. get_recommendations) from another thread.
+
+logger = get_logger("checkout")
+
+_STOP = object()
+
+
+class CheckoutPipeline:
+    """Bounded queue plus one worker thread that applies orders in micro-batches."""
+
+    def __init__(self, apply_batch, max_pending=1024, batch_size=64, max_batch_delay=0.05, clock=time.monotonic):
+        """
+        apply_batch(orders) applies a list of submitted orders to the model.
+        max_pending: orders queued before submit() blocks.
+        max_batch_delay: seconds a batch may wait for more orders before it is applied.
+        """
+        if max_pending <= 0 or batch_size <= 0:
+            raise ValueError("max_pending and batch_size must be positive.")
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.max_batch_delay = max_batch_delay
+        self.clock = clock
+        self.lock = threading.RLock()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._progress = threading.Condition()
+        self._submitted = 0
+        self._applied = 0  # Orders done (applied or failed)
+        self.batches = 0
+        self.failed = 0
+        self.max_observed_lag = 0.0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="checkout-pipeline", daemon=True)
+        self._worker.start()
+
+    def submit(self, order, timeout=None):
+        """
+        Queues one order for apply_batch(). Blocks while the queue is full;
+        raises queue.Full if timeout (seconds) passes first.
+        """
+        if self._closed:
+            raise RuntimeError("Checkout pipeline is closed.")
+        with self._progress:
+            self._submitted += 1
+        try:
+            self._queue.put((order, self.clock()), timeout=timeout)
+        except queue.Full:
+            with self._progress:
+                self._submitted -= 1
+                self._progress.notify_all()
+            raise
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[1] + self.max_batch_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - self.clock()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # Seen again after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            failed = 0
+            try:
+                with self.lock:
+                    self.apply_batch([order for order, _ in batch])
+            except Exception:
+                failed = len(batch)
+                logger.exception("Applying %d queued orders failed", len(batch))
+            lag = self.clock() - batch[0][1]
+            with self._progress:
+                self.failed += failed
+                self.batches += 1
+                self.max_observed_lag = max(self.max_observed_lag, lag)
+                self._applied += len(batch)
+                self._progress.notify_all()
+
+    def pending(self):
+        """Orders submitted but not yet applied."""
+        with self._progress:
+            return self._submitted - self._applied
+
+    def flush(self, timeout=None):
+        """Waits until every order submitted so far has been applied. Returns False on timeout."""
+        with self._progress:
+            target = self._submitted
+            return self._progress.wait_for(lambda: self._applied >= target, timeout)
+
+    def close(self, timeout=None):
+        """Applies everything still queued, then stops the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def stats(self):
+        with self._progress:
+            return {
+                'submitted': self._submitted,
+                'applied': self._applied - self.failed,
+                'failed': self.failed,
+                'pending': self._submitted - self._applied,
+                'batches': self.batches,
+                'max_observed_lag_seconds': self.max_observed_lag,
+            }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
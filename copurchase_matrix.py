@@ -0,0 +1,192 @@
+import numpy as np
+
+
+# --- Sparse Co-Purchase Model (NumPy) ---
+# Same symmetric counts as the copurchase_counts dict-of-dicts, stored as a CSR
+# matrix over dense product indexes. New pairs are appended to a COO buffer
+# (row, col arrays) and merged into the CSR arrays by compact(), which happens
+# automatically once the buffer grows past compact_threshold pairs and before
+# any query, so batch updates between queries rather than single orders.
+# Product ids are mapped to dense int32 indexes in first-seen order; counts are int32.
+
+
+def _unique_in_order(items):
+    """Distinct items of an order, first occurrence first (a cart dict's keys already are)."""
+    return list(dict.fromkeys(items))
+
+
+class CopurchaseMatrix:
+    """
+    Co-purchase counts in compressed sparse row form.
+    Supports the read side of the history_map protocol (`in`, `[product_id]`,
+    iteration), so get_recommendations() can use it unchanged, plus a
+    vectorized recommend() that sums the cart's rows directly.
+    """
+
+    def __init__(self, compact_threshold=1_000_000):
+        self.compact_threshold = compact_threshold
+        self._index_of = {}     # {product_id: dense index}
+        self._product_ids = []  # dense index -> product_id
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._counts = np.zeros(0, dtype=np.int32)
+        self._pending_rows = []  # COO buffer chunks
+        self._pending_cols = []
+        self._pending_size = 0
+
+    # --- Ingestion ---
+
+    def _dense(self, product_id):
+        index = self._index_of.get(product_id)
+        if index is None:
+            index = self._index_of[product_id] = len(self._product_ids)
+            self._product_ids.append(product_id)
+        return index
+
+    def add_order(self, cart):
+        """Records one order (a cart dict or a list of product ids)."""
+        self.add_orders((cart,))
+
+    def add_orders(self, orders):
+        """
+        Records many orders in one call, like calling update_copurchase_history()
+        for each of them. Pairs are generated per order size with one triu_indices
+        gather over all orders of that size (LeetCode: Combinations, vectorized).
+        """
+        orders_by_size = {}
+        for order in orders:
+            dense = [self._dense(product_id) for product_id in _unique_in_order(order)]
+            if len(dense) >= 2:
+                orders_by_size.setdefault(len(dense), []).append(dense)
+
+        for size, group in orders_by_size.items():
+            members = np.asarray(group, dtype=np.int32)
+            first, second = np.triu_indices(size, k=1)
+            item_a = members[:, first].ravel()
+            item_b = members[:, second].ravel()
+            # Both directions, like history_map[a][b] and history_map[b][a]
+            self._pending_rows.append(np.concatenate((item_a, item_b)))
+            self._pending_cols.append(np.concatenate((item_b, item_a)))
+            self._pending_size += 2 * len(item_a)
+
+        if self._pending_size >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """Merges the COO buffer into the CSR arrays, summing duplicate pairs."""
+        if not self._pending_size:
+            return
+        num_products = len(self._product_ids)
+
+        existing_rows = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr))
+        rows = np.concatenate([existing_rows] + [chunk.astype(np.int64) for chunk in self._pending_rows])
+        cols = np.concatenate([self._indices.astype(np.int64)] + [chunk.astype(np.int64) for chunk in self._pending_cols])
+        weights = np.concatenate((self._counts.astype(np.int64), np.ones(self._pending_size, dtype=np.int64)))
+
+        # Sort by (row, col) through a single int64 key, then sum runs of equal keys
+        keys = rows * num_products + cols
+        order = np.argsort(keys)
+        keys = keys[order]
+        weights = weights[order]
+        run_starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        unique_keys = keys[run_starts]
+        summed = np.add.reduceat(weights, run_starts)
+        if summed.size and summed.max() > np.iinfo(np.int32).max:
+            raise OverflowError("Co-purchase count exceeds int32 range.")
+
+        row_of_key = unique_keys // num_products
+        self._indices = (unique_keys % num_products).astype(np.int32)
+        self._counts = summed.astype(np.int32)
+        self._indptr = np.zeros(num_products + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_of_key, minlength=num_products), out=self._indptr[1:])
+
+        self._pending_rows = []
+        self._pending_cols = []
+        self._pending_size = 0
+
+    # --- Queries (history_map protocol) ---
+
+    def _row_slice(self, index):
+        if index + 1 >= len(self._indptr):
+            return slice(0, 0)
+        return slice(self._indptr[index], self._indptr[index + 1])
+
+    def row(self, product_id):
+        """Returns {other_product_id: count} for one product (empty if never co-purchased)."""
+        self.compact()
+        index = self._index_of.get(product_id)
+        if index is None:
+            return {}
+        row_slice = self._row_slice(index)
+        product_ids = self._product_ids
+        return {product_ids[col]: count for col, count in
+                zip(self._indices[row_slice].tolist(), self._counts[row_slice].tolist())}
+
+    def __contains__(self, product_id):
+        self.compact()
+        index = self._index_of.get(product_id)
+        if index is None:
+            return False
+        row_slice = self._row_slice(index)
+        return row_slice.stop > row_slice.start
+
+    def __getitem__(self, product_id):
+        if product_id not in self:
+            raise KeyError(product_id)
+        return self.row(product_id)
+
+    def __iter__(self):
+        self.compact()
+        row_lengths = np.diff(self._indptr)
+        return iter([self._product_ids[index] for index in np.flatnonzero(row_lengths).tolist()])
+
+    def __len__(self):
+        self.compact()
+        return int(np.count_nonzero(np.diff(self._indptr)))
+
+    def num_pairs(self):
+        """Number of stored (directed) product pairs."""
+        self.compact()
+        return len(self._indices)
+
+    def to_dict(self):
+        """Expands the matrix back into the dict-of-dicts history_map format."""
+        return {product_id: self.row(product_id) for product_id in self}
+
+    # --- Recommendations ---
+
+    def scores(self, cart_product_ids):
+        """
+        Sums the rows of the cart's products into a dense score vector
+        (indexed like the internal product list), with cart items zeroed out.
+        """
+        self.compact()
+        dense = [self._index_of[product_id] for product_id in cart_product_ids if product_id in self._index_of]
+        scores = np.zeros(len(self._product_ids), dtype=np.int64)
+        if not dense:
+            return scores
+        slices = [self._row_slice(index) for index in dense]
+        cols = np.concatenate([self._indices[row_slice] for row_slice in slices])
+        counts = np.concatenate([self._counts[row_slice] for row_slice in slices])
+        np.add.at(scores, cols, counts)
+        scores[dense] = 0
+        return scores
+
+    def recommend(self, cart, num_recommendations=3):
+        """
+        Returns up to num_recommendations product ids with the highest summed
+        co-purchase counts for the cart. Ties go to the lower product id.
+        """
+        if not cart or num_recommendations <= 0:
+            return []
+        scores = self.scores(list(cart))
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        product_ids = self._product_ids
+        # Partial selection first, then an exact ordering of the short list
+        if len(candidates) > num_recommendations:
+            cutoff = np.partition(scores[candidates], len(candidates) - num_recommendations)[len(candidates) - num_recommendations]
+            candidates = candidates[scores[candidates] >= cutoff]
+        ranked = sorted(candidates.tolist(), key=lambda index: (-int(scores[index]), product_ids[index]))
+        return [product_ids[index] for index in ranked[:num_recommendations]]
@@ -0,0 +1,160 @@
+import math
+
+
+# --- Time-Decayed Co-Purchase History ---
+# Plain co-purchase counts grow forever, so old trends outweigh recent ones.
+# Here each co-purchase contributes exp(-rate * age) instead of 1, with rate
+# set by a half-life. Decay is applied lazily with "forward decay": a checkout
+# at time t adds exp(rate * (t - epoch)) to the stored weight, where epoch is
+# one global reference time. The real (decayed) weight at time `now` is
+#     stored * exp(-rate * (now - epoch))
+# so nothing is rescanned when time moves on. Because that factor is the same
+# for every edge, rankings computed from the stored weights (get_recommendations,
+# NeighborIndex) are exactly the rankings by decayed weight, at any time.
+# prune() drops edges whose decayed weight has fallen below a threshold.
+# Stored numbers grow by exp(rate * elapsed), so record_checkout() and prune()
+# move the epoch forward (rescaling every row) once that exponent gets large;
+# without this, exp() would overflow after enough half-lives when pruning is
+# off. Decayed reads use exp(-rate * elapsed), which underflows to 0.0 instead.
+# All times are the same current_time values the pricing code uses.
+
+_REBASE_EXPONENT = 200.0  # Rebase once stored weights reach ~e**200, far below float overflow
+
+
+class DecayedCopurchaseHistory:
+    """
+    Co-purchase history with exponential time decay, usable as history_map for
+    get_recommendations(). Rows hold epoch-relative (forward) weights; use
+    weight()/decayed_row() for the actual decayed values.
+    """
+
+    def __init__(self, half_life, epoch, prune_threshold=0.05, prune_interval=None):
+        """
+        half_life: timedelta after which a co-purchase counts half as much.
+        epoch: datetime reference point (e.g. simulated_now at startup).
+        prune_threshold: edges with a decayed weight below this are dropped by prune().
+        prune_interval: timedelta; record_checkout() prunes when this much time
+            has passed since the last prune (None: only when prune() is called).
+        """
+        seconds = half_life.total_seconds()
+        if seconds <= 0:
+            raise ValueError("half_life must be positive.")
+        self.rate = math.log(2) / seconds
+        self.epoch = epoch
+        self.prune_threshold = prune_threshold
+        self.prune_interval = prune_interval
+        self.last_prune = epoch
+        self._rows = {}  # {product_id: {neighbor_id: forward weight}}
+
+    def _exponent(self, current_time):
+        return self.rate * (current_time - self.epoch).total_seconds()
+
+    def _growth(self, current_time):
+        """exp(rate * (current_time - epoch)): a co-purchase's weight in stored units."""
+        return math.exp(self._exponent(current_time))
+
+    def _rebase(self, current_time):
+        """Moves the epoch to current_time, rescaling every stored weight. Returns the rescaled product ids."""
+        factor = math.exp(-self._exponent(current_time))  # Same relative weights, smaller numbers
+        for row in self._rows.values():
+            for neighbor_id in row:
+                row[neighbor_id] *= factor
+        self.epoch = current_time
+        return set(self._rows)
+
+    def _notify(self, changed, observers):
+        for product_id in changed:
+            row = self._rows.get(product_id, {})
+            for observer in observers:
+                observer.refresh(product_id, row)
+
+    # --- history_map read protocol ---
+
+    def __contains__(self, product_id):
+        return product_id in self._rows
+
+    def __getitem__(self, product_id):
+        return self._rows[product_id]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def num_edges(self):
+        """Number of directed (product, neighbor) weights stored."""
+        return sum(len(row) for row in self._rows.values())
+
+    # --- Updates ---
+
+    def record_checkout(self, cart, current_time, observers=()):
+        """
+        Adds one co-purchase for every pair of distinct items in the cart, at
+        current_time, in the same pair order as update_copurchase_history().
+        Observers get record_pair(a, b, stored_weight); stored weights only
+        grow, so a NeighborIndex stays exact. A rebase rescales every row and
+        sends refresh(product_id, row) first.
+        """
+        if self.prune_interval is not None and current_time - self.last_prune >= self.prune_interval:
+            self.prune(current_time, observers)
+        product_ids = list(dict.fromkeys(cart))
+        if len(product_ids) < 2:
+            return
+        if self._exponent(current_time) > _REBASE_EXPONENT:
+            self._notify(self._rebase(current_time), observers)
+        increment = self._growth(current_time)
+        rows = self._rows
+        for i in range(len(product_ids)):
+            for j in range(i + 1, len(product_ids)):
+                item_a_id = product_ids[i]
+                item_b_id = product_ids[j]
+                row_a = rows.setdefault(item_a_id, {})
+                row_a[item_b_id] = row_a.get(item_b_id, 0.0) + increment
+                row_b = rows.setdefault(item_b_id, {})
+                row_b[item_a_id] = row_b.get(item_a_id, 0.0) + increment
+                for observer in observers:
+                    observer.record_pair(item_a_id, item_b_id, row_a[item_b_id])
+                    observer.record_pair(item_b_id, item_a_id, row_b[item_a_id])
+
+    # --- Decayed values ---
+
+    def weight(self, product_id, neighbor_id, current_time):
+        """Decayed co-purchase weight of a pair at current_time (0.0 if unknown)."""
+        stored = self._rows.get(product_id, {}).get(neighbor_id, 0.0)
+        return stored * math.exp(-self._exponent(current_time))
+
+    def decayed_row(self, product_id, current_time):
+        """Returns {neighbor_id: decayed weight} for one product at current_time."""
+        factor = math.exp(-self._exponent(current_time))
+        return {neighbor_id: stored * factor for neighbor_id, stored in self._rows.get(product_id, {}).items()}
+
+    # --- Maintenance ---
+
+    def prune(self, current_time, observers=()):
+        """
+        Drops edges whose decayed weight at current_time is below
+        prune_threshold, after rebasing the epoch to current_time if stored
+        weights have grown large. Observers get refresh(product_id, row) for
+        every row that changed. Returns the number of edges removed. O(edges).
+        """
+        changed = set()
+        if self._exponent(current_time) > _REBASE_EXPONENT:
+            changed = self._rebase(current_time)
+        cutoff = self.prune_threshold * self._growth(current_time)
+        removed = 0
+        for product_id in list(self._rows):
+            row = self._rows[product_id]
+            weak = [neighbor_id for neighbor_id, stored in row.items() if stored < cutoff]
+            if not weak:
+                continue
+            for neighbor_id in weak:
+                del row[neighbor_id]
+            removed += len(weak)
+            changed.add(product_id)
+            if not row:
+                del self._rows[product_id]
+
+        self.last_prune = current_time
+        self._notify(changed, observers)
+        return removed
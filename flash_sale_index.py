@@ -0,0 +1,146 @@
+from datetime import datetime
+
+
+# --- Flash Sale Index ---
+# A centered interval tree per product answers "which sales for product P are
+# active at time T" in O(log n + k).
+# All windows are inclusive on both ends (start <= T <= end), like FLASH_SALES.
+
+
+def _valid_window(sale):
+    """Returns (start, end) for a sale that can ever be active, otherwise None."""
+    start = sale.get('start_time')
+    end = sale.get('end_time')
+    if isinstance(start, datetime) and isinstance(end, datetime) and start <= end:
+        return start, end
+    return None
+
+
+class _IntervalNode:
+    """One node of a centered interval tree (LeetCode: Trees, Divide and Conquer)."""
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start  # Intervals containing center, start ascending
+        self.by_end = by_end      # Same intervals, end descending
+        self.left = left
+        self.right = right
+
+
+def _build_tree(entries):
+    """
+    Builds a centered interval tree from (start, end, position, sale) tuples.
+    Each level takes the median endpoint as its center, so the depth stays logarithmic.
+    """
+    if not entries:
+        return None
+
+    endpoints = sorted([entry[0] for entry in entries] + [entry[1] for entry in entries])
+    center = endpoints[len(endpoints) // 2]
+
+    left_entries = []
+    right_entries = []
+    overlapping = []
+    for entry in entries:
+        if entry[1] < center:
+            left_entries.append(entry)
+        elif entry[0] > center:
+            right_entries.append(entry)
+        else:
+            overlapping.append(entry)
+
+    by_start = sorted(overlapping, key=lambda entry: entry[0])
+    by_end = sorted(overlapping, key=lambda entry: entry[1], reverse=True)
+    return _IntervalNode(center, by_start, by_end, _build_tree(left_entries), _build_tree(right_entries))
+
+
+def _query_tree(node, current_time, found):
+    """Appends every interval in the tree that contains current_time to found."""
+    while node is not None:
+        if current_time < node.center:
+            # Everything stored here ends at or after center, so only the start matters
+            for entry in node.by_start:
+                if entry[0] > current_time:
+                    break
+                found.append(entry)
+            node = node.left
+        elif current_time > node.center:
+            # Everything stored here starts at or before center, so only the end matters
+            for entry in node.by_end:
+                if entry[1] < current_time:
+                    break
+                found.append(entry)
+            node = node.right
+        else:
+            found.extend(node.by_start)
+            return
+
+
+class FlashSaleIndex:
+    """
+    Flash sales grouped by product, each group stored as an interval tree.
+    Sales added after construction are buffered per product and the product's
+    tree is rebuilt on its next lookup.
+    """
+
+    def __init__(self, flash_sales=()):
+        self._entries = {}   # {product_id: [(start, end, position, sale), ...]}
+        self._trees = {}     # {product_id: _IntervalNode}
+        self._dirty = set()
+        self._next_position = 0
+        self.bulk_load(flash_sales)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def bulk_load(self, flash_sales):
+        """Adds many sales at once. Trees are built lazily, one product at a time."""
+        entries = self._entries
+        position = self._next_position
+        for sale in flash_sales:
+            window = _valid_window(sale)
+            if window is not None:
+                product_id = sale['product_id']
+                entries.setdefault(product_id, []).append((window[0], window[1], position, sale))
+                self._dirty.add(product_id)
+            position += 1
+        self._next_position = position
+
+    def add(self, sale):
+        """Adds a single sale; it ranks after every sale already in the index."""
+        self.bulk_load((sale,))
+
+    def _tree_for(self, product_id):
+        if product_id in self._dirty:
+            self._trees[product_id] = _build_tree(self._entries[product_id])
+            self._dirty.discard(product_id)
+        return self._trees.get(product_id)
+
+    def active_sales(self, product_id, current_time):
+        """Returns every sale active for the product at current_time, in load order."""
+        tree = self._tree_for(product_id)
+        if tree is None:
+            return []
+        found = []
+        _query_tree(tree, current_time, found)
+        found.sort(key=lambda entry: entry[2])
+        return [entry[3] for entry in found]
+
+    def first_active(self, product_id, current_time):
+        """Returns the earliest-loaded active sale, or None (same rule as get_active_flash_sale)."""
+        tree = self._tree_for(product_id)
+        if tree is None:
+            return None
+        found = []
+        _query_tree(tree, current_time, found)
+        if not found:
+            return None
+        return min(found, key=lambda entry: entry[2])[3]
+
+    def iter_entries(self):
+        """Yields (start, end, position, sale) for every indexed sale."""
+        for entries in self._entries.values():
+            yield from entries
+
@@ -0,0 +1,149 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+
+# --- Instrumentation: Logging & Timing Counters ---
+# Debug output goes through the standard logging module under the "smart_cart"
+# logger, so it is silent (and its messages never formatted) unless enabled.
+# Timing counters are off by default; when off, a timed function costs one
+# flag check per call.
+
+LOGGER_NAME = "smart_cart"
+SAMPLE_WINDOW = 2048  # Recent latencies kept per function for percentiles
+
+_timing_enabled = False
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_logger(component=None):
+    """Returns the project logger, or a child logger such as smart_cart.pricing."""
+    return logging.getLogger(f"{LOGGER_NAME}.{component}" if component else LOGGER_NAME)
+
+
+def configure_logging(level=None):
+    """
+    Sets up console logging for the smart_cart loggers.
+    level defaults to the SMART_CART_LOG_LEVEL environment variable, then WARNING.
+    An unknown level name falls back to INFO with a warning.
+    """
+    level = level or os.environ.get("SMART_CART_LOG_LEVEL", "WARNING")
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+        logger.addHandler(handler)
+    try:
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+    except (TypeError, ValueError):
+        logger.setLevel(logging.INFO)
+        logger.warning("Unknown log level %r, using INFO.", level)
+    return logger
+
+
+class TimingStats:
+    """Call count, total/min/max and a window of recent latencies for one function."""
+
+    __slots__ = ('calls', 'total_seconds', 'min_seconds', 'max_seconds', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.min_seconds = float('inf')
+        self.max_seconds = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def record(self, seconds):
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds < self.min_seconds:
+            self.min_seconds = seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Nearest-rank percentile over the recent sample window (fraction in 0..1)."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+        return ordered[rank]
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'total_seconds': self.total_seconds,
+            'mean_seconds': self.total_seconds / self.calls if self.calls else 0.0,
+            'min_seconds': self.min_seconds if self.calls else 0.0,
+            'max_seconds': self.max_seconds,
+            'p50_seconds': self.percentile(0.50),
+            'p95_seconds': self.percentile(0.95),
+            'p99_seconds': self.percentile(0.99),
+        }
+
+
+def enable_timing(enabled=True):
+    """Turns the per-call timing counters on or off."""
+    global _timing_enabled
+    _timing_enabled = enabled
+
+
+def timing_enabled():
+    return _timing_enabled
+
+
+def record_timing(name, seconds):
+    """Adds one latency sample for name (used by timed() and by callers timing blocks)."""
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = TimingStats()
+        stats.record(seconds)
+
+
+def timed(name):
+    """Decorator that records call latency under name while timing is enabled."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _timing_enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_timing(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def get_metrics():
+    """Returns {name: stats dict} for every timed function called so far."""
+    with _stats_lock:
+        return {name: stats.snapshot() for name, stats in _stats.items()}
+
+
+def reset_metrics():
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_metrics():
+    """Renders the counters in Prometheus text exposition format for scraping."""
+    lines = [
+        "# TYPE smart_cart_calls_total counter",
+        "# TYPE smart_cart_latency_seconds summary",
+    ]
+    for name, stats in sorted(get_metrics().items()):
+        lines.append(f'smart_cart_calls_total{{function="{name}"}} {stats["calls"]}')
+        for quantile, key in (("0.5", 'p50_seconds'), ("0.95", 'p95_seconds'), ("0.99", 'p99_seconds')):
+            lines.append(f'smart_cart_latency_seconds{{function="{name}",quantile="{quantile}"}} {stats[key]:.9f}')
+        lines.append(f'smart_cart_latency_seconds_sum{{function="{name}"}} {stats["total_seconds"]:.9f}')
+        lines.append(f'smart_cart_latency_seconds_count{{function="{name}"}} {stats["calls"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,201 @@
+import heapq
+import itertools
+import threading
+from datetime import timedelta
+
+
+# --- Inventory with Reservations ---
+# Stock levels per product, reservations ("holds") taken when items go into a
+# cart, and an atomic checkout that commits a whole cart in one step.
+# Products are spread over a fixed number of stripes, each with its own lock
+# (lock striping, like CartService), so a rush on one hot product only queues
+# operations on that product's stripe. commit() locks only the stripes its cart
+# items fall in, in ascending stripe order, so concurrent commits cannot
+# deadlock, and either applies every line or none. num_stripes=1 (one global
+# lock) is an opt-in: it saves a few lock acquisitions per multi-product commit,
+# but serializes every reservation and checkout behind a hot product.
+# Holds expire reservation_ttl after they were last taken or extended. Expiry
+# is lazy: each stripe keeps a heap of expiry times and drops expired holds
+# whenever it is touched. Times are the same current_time values the pricing
+# code uses.
+
+
+class InventoryError(ValueError):
+    """Raised for invalid inventory operations (unstocked product, bad quantity, ...)."""
+
+
+class OutOfStockError(InventoryError):
+    """Raised when a reservation or commit needs more units than are available."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages  # {product_id: units available to this holder}
+        details = ", ".join(f"product ID {product_id}: only {available} available"
+                            for product_id, available in shortages.items())
+        super().__init__(f"Not enough stock ({details}).")
+
+
+class _Stripe:
+    __slots__ = ('lock', 'on_hand', 'reserved', 'holds', 'expiries')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.on_hand = {}   # {product_id: units in stock, reserved ones included}
+        self.reserved = {}  # {product_id: units held by carts}
+        self.holds = {}     # {(holder, product_id): [quantity, expires_at]}
+        self.expiries = []  # Heap of (expires_at, sequence, holder, product_id)
+
+    def expire(self, current_time):
+        """Drops holds that expired at or before current_time. Caller holds the lock."""
+        expiries = self.expiries
+        while expiries and expiries[0][0] <= current_time:
+            expires_at, _, holder, product_id = heapq.heappop(expiries)
+            hold = self.holds.get((holder, product_id))
+            if hold is not None and hold[1] == expires_at:  # Not extended since
+                self.reserved[product_id] -= hold[0]
+                del self.holds[(holder, product_id)]
+
+    def held(self, holder, product_id):
+        hold = self.holds.get((holder, product_id))
+        return hold[0] if hold else 0
+
+    def free(self, product_id):
+        return self.on_hand[product_id] - self.reserved.get(product_id, 0)
+
+
+class Inventory:
+    """Thread-safe stock levels with expiring reservations and atomic multi-product commits."""
+
+    def __init__(self, stock=None, num_stripes=64, reservation_ttl=timedelta(minutes=15)):
+        if num_stripes <= 0:
+            raise ValueError("num_stripes must be positive.")
+        self.reservation_ttl = reservation_ttl
+        self._stripes = [_Stripe() for _ in range(num_stripes)]
+        self._sequence = itertools.count()  # Tie-breaker for equal expiry times
+        for product_id, quantity in (stock or {}).items():
+            self.set_stock(product_id, quantity)
+
+    def _stripe(self, product_id):
+        return self._stripes[hash(product_id) % len(self._stripes)]
+
+    # --- Stock levels ---
+
+    def set_stock(self, product_id, quantity):
+        """Sets the units on hand (reserved units included) for a product."""
+        if quantity < 0:
+            raise InventoryError("Stock cannot be negative.")
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            stripe.on_hand[product_id] = quantity
+
+    def add_stock(self, product_id, quantity):
+        """Restocks a product. Returns the new units on hand."""
+        if quantity <= 0:
+            raise InventoryError("Quantity must be positive.")
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            stripe.on_hand[product_id] = stripe.on_hand.get(product_id, 0) + quantity
+            return stripe.on_hand[product_id]
+
+    def on_hand(self, product_id):
+        """Units in stock, reserved ones included (0 if the product is not stocked)."""
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            return stripe.on_hand.get(product_id, 0)
+
+    def available(self, product_id, current_time):
+        """Units that can still be reserved at current_time."""
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            if product_id not in stripe.on_hand:
+                return 0
+            stripe.expire(current_time)
+            return stripe.free(product_id)
+
+    # --- Reservations ---
+
+    def reserve(self, holder, product_id, quantity, current_time):
+        """
+        Adds quantity units to holder's hold on a product and extends the hold
+        to current_time + reservation_ttl. Returns the units now held.
+        Raises OutOfStockError if fewer than quantity units are free.
+        """
+        if quantity <= 0:
+            raise InventoryError("Quantity must be positive.")
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            if product_id not in stripe.on_hand:
+                raise InventoryError(f"Product ID {product_id} is not stocked.")
+            stripe.expire(current_time)
+            available = stripe.free(product_id)
+            if quantity > available:
+                raise OutOfStockError({product_id: available})
+            stripe.reserved[product_id] = stripe.reserved.get(product_id, 0) + quantity
+            expires_at = current_time + self.reservation_ttl
+            hold = stripe.holds.setdefault((holder, product_id), [0, expires_at])
+            hold[0] += quantity
+            hold[1] = expires_at
+            heapq.heappush(stripe.expiries, (expires_at, next(self._sequence), holder, product_id))
+            return hold[0]
+
+    def release(self, holder, product_id, current_time, quantity=None):
+        """Releases up to quantity units of holder's hold (all of it if None). Returns the units released."""
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            stripe.expire(current_time)
+            hold = stripe.holds.get((holder, product_id))
+            if hold is None:
+                return 0
+            released = hold[0] if quantity is None else min(quantity, hold[0])
+            hold[0] -= released
+            stripe.reserved[product_id] -= released
+            if not hold[0]:
+                del stripe.holds[(holder, product_id)]
+            return released
+
+    def held(self, holder, product_id, current_time):
+        """Units of a product held by holder at current_time."""
+        stripe = self._stripe(product_id)
+        with stripe.lock:
+            stripe.expire(current_time)
+            return stripe.held(holder, product_id)
+
+    # --- Checkout ---
+
+    def commit(self, holder, cart, current_time):
+        """
+        Atomically takes every line of cart ({product_id: quantity}) out of stock.
+        Each line uses holder's hold first and free stock for the rest (e.g. after
+        the hold expired); holder's holds on these products are then dropped.
+        Raises OutOfStockError, changing nothing, if any line cannot be filled.
+        """
+        items = [(product_id, quantity) for product_id, quantity in cart.items() if quantity > 0]
+        stripe_indexes = sorted({hash(product_id) % len(self._stripes) for product_id, _ in items})
+        locked = []
+        try:
+            for index in stripe_indexes:  # Ascending order: no lock-order deadlocks
+                self._stripes[index].lock.acquire()
+                locked.append(self._stripes[index])
+            for stripe in locked:
+                stripe.expire(current_time)
+
+            shortages = {}
+            for product_id, quantity in items:
+                stripe = self._stripe(product_id)
+                if product_id not in stripe.on_hand:
+                    shortages[product_id] = 0
+                    continue
+                available = stripe.held(holder, product_id) + stripe.free(product_id)
+                if quantity > available:
+                    shortages[product_id] = available
+            if shortages:
+                raise OutOfStockError(shortages)
+
+            for product_id, quantity in items:
+                stripe = self._stripe(product_id)
+                hold = stripe.holds.pop((holder, product_id), None)
+                if hold is not None:
+                    stripe.reserved[product_id] -= hold[0]
+                stripe.on_hand[product_id] -= quantity
+        finally:
+            for stripe in reversed(locked):
+                stripe.lock.release()
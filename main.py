@@ -1,13 +1,24 @@
+import heapq
+import logging
+import os
 import sys
 from datetime import datetime, timedelta
+from functools import cached_property
 
+from instrumentation import configure_logging, enable_timing, format_metrics, get_logger, timed, timing_enabled
+from cart_totals import IncrementalCart
+from catalog_views import SORT_CRITERIA, CatalogViews
+from checkout_pipeline import CheckoutPipeline
+from inventory import Inventory, InventoryError
+from pricing_engine import PricingEngine
+from recommendation_cache import RecommendationCache
+from recommendation_index import NeighborIndex, get_top_recommendations
+from search_index import ProductSearchIndex
 
-# --- Phase 4: Recommendation Engine Data ---
-
-# Stores co-purchase counts: {product_id_A: {product_id_B: count}}
-# Example: {1: {3: 5}} means Laptop(1) and Keyboard(3) were bought together 5 times.
-
-copurchase_counts = {}
+# Debug output is routed through logging; enable it with SMART_CART_LOG_LEVEL=DEBUG
+logger = get_logger()
+TRACE = 5  # Below DEBUG; used for full history dumps
+logging.addLevelName(TRACE, "TRACE")
 
 
 # --- Phase 3: Deals and Discounts ---
@@ -22,74 +33,162 @@ TIERED_DISCOUNTS = [
     (100.00, 0.08),  # 8% off if subtotal >= $100 (and < $200)
 ]
 
-# Optional: Flash Sales
-# Using a simulated 'now' based on when the prompt context was set.
-# In a real continuously running app, you'd replace simulated_now with datetime.now()
-# Current time reference: Saturday, April 26, 2025 at 11:41:15 AM CEST
-try:
-    # Attempt to create a specific datetime for reproducibility based on context
-    simulated_now = datetime(2025, 4, 26, 11, 41, 15)
-except ValueError:
-    # Fallback if the date is invalid (e.g., running in a different year)
-    print("Warning: Could not simulate specific context time. Using current system time for flash sales.")
-    simulated_now = datetime.now()
-
-print(f"(Simulating time as: {simulated_now.strftime('%Y-%m-%d %H:%M:%S')})") # Info for user
-
-FLASH_SALES = [
-    {
-        'product_id': 1,  # Laptop
-        'start_time': simulated_now - timedelta(hours=1),  # Started 1 hour ago
-        'end_time': simulated_now + timedelta(hours=1),  # Ends in 1 hour
-        'discount_type': 'percent',  # 'percent' or 'fixed'
-        'value': 0.20  # 20% off
-    },
-    {
-        'product_id': 4,  # Monitor
-        'start_time': simulated_now + timedelta(days=1),  # Starts tomorrow
-        'end_time': simulated_now + timedelta(days=1, hours=2),  # Ends 2 hours after start
-        'discount_type': 'fixed',
-        'value': 50.00  # $50 off
-    }
-]
+# Units in stock per product. Items are reserved when added to the cart and
+# taken out of stock atomically at checkout (see inventory.py).
+INITIAL_STOCK = {1: 5, 2: 50, 3: 30, 4: 10, 5: 20, 6: 8}
+CONSOLE_SESSION = "console"  # Reservation holder for the console shopper
 
 
+def get_simulated_now():
+    """
+    Optional: Flash Sales
+    Using a simulated 'now' based on when the prompt context was set.
+    In a real continuously running app, you'd replace simulated_now with datetime.now()
+    Current time reference: Saturday, April 26, 2025 at 11:41:15 AM CEST
+    """
+    try:
+        # Attempt to create a specific datetime for reproducibility based on context
+        return datetime(2025, 4, 26, 11, 41, 15)
+    except ValueError:
+        # Fallback if the date is invalid (e.g., running in a different year)
+        print("Warning: Could not simulate specific context time. Using current system time for flash sales.")
+        return datetime.now()
+
+
+def make_flash_sales(simulated_now):
+    """Returns the FLASH_SALES list, with windows relative to simulated_now."""
+    return [
+        {
+            'product_id': 1,  # Laptop
+            'start_time': simulated_now - timedelta(hours=1),  # Started 1 hour ago
+            'end_time': simulated_now + timedelta(hours=1),  # Ends in 1 hour
+            'discount_type': 'percent',  # 'percent' or 'fixed'
+            'value': 0.20  # 20% off
+        },
+        {
+            'product_id': 4,  # Monitor
+            'start_time': simulated_now + timedelta(days=1),  # Starts tomorrow
+            'end_time': simulated_now + timedelta(days=1, hours=2),  # Ends 2 hours after start
+            'discount_type': 'fixed',
+            'value': 50.00  # $50 off
+        }
+    ]
+
 
 # --- Product Catalog ---
 # Using a list of dictionaries to represent products
 # Each dictionary has 'id', 'name', and 'price'
 
-products = [
-    {"id": 1, "name": "Laptop", "price": 999.99},
-    {"id": 2, "name": "Mouse", "price": 25.50},
-    {"id": 3, "name": "Keyboard", "price": 75.00},
-    {"id": 4, "name": "Monitor", "price": 300.00},
-    {"id": 5, "name": "Webcam", "price": 50.00},
-    {"id": 6, "name": "Docking Station", "price": 150.00},
-]
-
-# --- Data Structures ---
+def load_products():
+    """Returns the product catalog (a fresh list on every call)."""
+    return [
+        {"id": 1, "name": "Laptop", "price": 999.99},
+        {"id": 2, "name": "Mouse", "price": 25.50},
+        {"id": 3, "name": "Keyboard", "price": 75.00},
+        {"id": 4, "name": "Monitor", "price": 300.00},
+        {"id": 5, "name": "Webcam", "price": 50.00},
+        {"id": 6, "name": "Docking Station", "price": 150.00},
+    ]
+
+
+# --- Application Context ---
+# Importing this module does no work and prints nothing. The catalog, the
+# promotions and the recommendation model live on `app` and are built the
+# first time they are used. Old module attributes (main.products,
+# main.pricing_engine, ...) still work through the module __getattr__ below.
+# To swap a piece in, assign it on the context, e.g. app.pricing_engine = engine.
+
+class ShopContext:
+    """Catalog, promotions, model and cart state, each built on first access."""
+
+    @cached_property
+    def simulated_now(self):
+        return get_simulated_now()
+
+    @cached_property
+    def flash_sales(self):
+        return make_flash_sales(self.simulated_now)
+
+    @cached_property
+    def pricing_engine(self):
+        # Compiled view of the three rule collections (LeetCode: Hashing, Binary Search)
+        # Call pricing_engine.invalidate() after editing BOGO_ELIGIBLE_IDS, FLASH_SALES or TIERED_DISCOUNTS.
+        return PricingEngine(BOGO_ELIGIBLE_IDS, self.flash_sales, TIERED_DISCOUNTS)
+
+    @cached_property
+    def products(self):
+        return load_products()
+
+    @cached_property
+    def product_lookup(self):
+        # For efficient lookup by product ID (LeetCode: Hashing)
+        # Create a dictionary mapping product ID to the product dictionary
+        return {product['id']: product for product in self.products}
+
+    @cached_property
+    def search_index(self):
+        # Search index over product names (LeetCode: Inverted Index, Trie)
+        # Keep it current with search_index.add_product() / remove_product() when the catalog changes.
+        return ProductSearchIndex(self.products)
+
+    @cached_property
+    def catalog_views(self):
+        # Catalog kept pre-sorted by name and price for paged listing and price ranges
+        # (LeetCode: Binary Search). Update with catalog_views.add_product() / remove_product().
+        return CatalogViews(self.products)
+
+    @cached_property
+    def copurchase_counts(self):
+        # --- Phase 4: Recommendation Engine Data ---
+        # Stores co-purchase counts: {product_id_A: {product_id_B: count}}
+        # Example: {1: {3: 5}} means Laptop(1) and Keyboard(3) were bought together 5 times.
+        return {}
+
+    @cached_property
+    def inventory(self):
+        return Inventory(INITIAL_STOCK)
+
+    @cached_property
+    def shopping_cart(self):
+        # The shopping cart (LeetCode: Hashing)
+        # Mapping of product ID to quantity that keeps its running totals up to date,
+        # e.g. {1: 2, 3: 1} means 2 Laptops, 1 Keyboard
+        return IncrementalCart(self.product_lookup, self.pricing_engine, self.simulated_now)
+
+
+app = ShopContext()
+
+# Module attribute -> ShopContext attribute
+_APP_ATTRIBUTES = {
+    'simulated_now': 'simulated_now',
+    'FLASH_SALES': 'flash_sales',
+    'pricing_engine': 'pricing_engine',
+    'products': 'products',
+    'product_lookup': 'product_lookup',
+    'search_index': 'search_index',
+    'catalog_views': 'catalog_views',
+    'copurchase_counts': 'copurchase_counts',
+    'inventory': 'inventory',
+    'shopping_cart': 'shopping_cart',
+}
+
+
+def __getattr__(name):
+    """Serves main.products, main.pricing_engine, ... from app (built on first use)."""
+    attribute = _APP_ATTRIBUTES.get(name)
+    if attribute is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(app, attribute)
 
-# For efficient lookup by product ID (LeetCode: Hashing)
-# Create a dictionary mapping product ID to the product dictionary
-product_lookup = {product['id']: product for product in products}
-
-
-# The shopping cart (LeetCode: Hashing)
-# Dictionary mapping product ID to quantity
-shopping_cart = {}   # Example: {1: 2, 3: 1} means 2 Laptops, 1 Keyboard
 
 # --- Helper Function for Flash Sales ---
 def get_active_flash_sale(product_id, current_time):
-    """Checks if there's an active flash sale for the product."""
-    for sale in FLASH_SALES:
-        if sale['product_id'] == product_id:
-            start = sale.get('start_time')
-            end = sale.get('end_time')
-            if isinstance(start, datetime) and isinstance(end, datetime):
-                if start <= current_time <= end:
-                    return sale
-    return None
+    """Checks if there's an active flash sale for the product (uses the compiled per-product index)."""
+    return app.pricing_engine.active_flash_sale(product_id, current_time)
+
+def get_active_flash_sales(product_id, current_time):
+    """Returns all active flash sales for the product (overlapping sales included), in list order."""
+    return app.pricing_engine.active_flash_sales(product_id, current_time)
 
 # --- Core Functions ---
 
@@ -144,7 +243,7 @@ def remove_from_cart(cart, lookup, product_id, quantity=1):
              print(f"Removed {quantity} x {product_name} from cart. Item removed.")
     return True
 
-def view_cart(cart, lookup, current_time):
+def view_cart(cart, lookup, current_time, integer_cents=False):
     """Displays the current cart contents and calculated totals including discounts."""
     print("\n--- Shopping Cart ---")
 
@@ -154,7 +253,8 @@ def view_cart(cart, lookup, current_time):
         return
     
     total_items = 0
-    item_discount_notes = {detail['id']: detail['note'] for detail in calculate_total(cart, lookup, current_time)['discount_details']}
+    totals = get_cart_totals(cart, lookup, current_time, integer_cents)
+    item_discount_notes = {detail['id']: detail['note'] for detail in totals['discount_details']}
     for product_id, quantity in cart.items():
         product = lookup[product_id]
         item_total = product['price'] * quantity
@@ -163,8 +263,6 @@ def view_cart(cart, lookup, current_time):
         total_items += quantity
 
     print(f"Total items in cart: {total_items}")
-    # Calculate totals and display breakdown
-    totals = calculate_total(cart, lookup, current_time)
 
     print(f"Subtotal:                     ${totals['subtotal_before_discounts']:.2f}")
     if totals['total_item_discount'] > 0:
@@ -180,13 +278,35 @@ def view_cart(cart, lookup, current_time):
         print(f"Total:                        ${totals['final_total']:.2f}")
 
 
-
+def get_cart_totals(cart, lookup, current_time, integer_cents=False):
+    """
+    Returns the calculate_total() breakdown for a cart.
+    An IncrementalCart already keeps its totals, so only the tier is applied;
+    a plain dict cart is priced from scratch.
+    With integer_cents=True the cart is priced in integer cents (see
+    cents_pricing.py for the rounding rules) and converted back to dollars.
+    When a promotion config is loaded, the promotion rule engine prices the cart.
+    """
+    if app.pricing_engine.promotions_config is not None:
+        return app.pricing_engine.price_cart_promotions(cart, lookup, current_time)
+    if integer_cents:
+        from cents_pricing import breakdown_in_dollars  # Only needed in cents mode
+        return breakdown_in_dollars(app.pricing_engine.price_cart_cents(cart, lookup, current_time))
+    if isinstance(cart, IncrementalCart):
+        cart.set_time(current_time)
+        return cart.breakdown()
+    return calculate_total(cart, lookup, current_time)
+
+
+@timed("calculate_total")
 def calculate_total(cart, lookup, current_time):
     """
     Calculates the total price including discounts (BOGO, Flash, Tiered).
     Returns a dictionary with detailed breakdown.
     (LeetCode Concepts: Hashing, Conditional Logic, Interval checks)
     """
+    debug = logger.isEnabledFor(logging.DEBUG)  # Checked once so disabled logging costs nothing per line
+    rules = app.pricing_engine.rules
     subtotal_before_discounts = 0.0
     total_item_discount = 0.0
     discount_details = []
@@ -203,21 +323,23 @@ def calculate_total(cart, lookup, current_time):
         applied_discount_note = ""
 
         # Check BOGO (LeetCode: Hashing for quick check
-        if product_id in BOGO_ELIGIBLE_IDS:
+        if product_id in rules.bogo_ids:
             free_items = quantity // 2
             if free_items > 0:
                 bogo_discount_amount = free_items * price
-                print(f"Debug: BOGO for {product['name']} - free items: {free_items}, discount: {bogo_discount_amount}")
+                if debug:
+                    logger.debug("BOGO for %s - free items: %s, discount: %s", product['name'], free_items, bogo_discount_amount)
 
         # Check Flash Sales (LeetCode: Interval check)
-        active_sale = get_active_flash_sale(product_id, current_time)
+        active_sale = rules.active_flash_sale(product_id, current_time)
         if active_sale:
             if active_sale['discount_type'] == 'percent':
                 flash_discount_amount = line_item_total  * active_sale['value']
             elif active_sale['discount_type'] == 'fixed':
                 # Apply fixed discount but don't make item price negative
                 flash_discount_amount = min(line_item_total, active_sale['value'] * quantity)
-                print(f"Debug: Flash Sale for {product['name']} - discount: {flash_discount_amount}")
+                if debug:
+                    logger.debug("Flash Sale for %s - discount: %s", product['name'], flash_discount_amount)
 
         # Apply the BEST item-specific discount (BOGO vs Flash)
         best_item_discount = 0.0
@@ -227,41 +349,47 @@ def calculate_total(cart, lookup, current_time):
             # Apply BOGO if it exists and is better than or equal to flash
             best_item_discount = bogo_discount_amount
             applied_discount_note = f"(-${best_item_discount:.2f} BOGO)" # Corrected BOGO note
-            print(f"Debug Calc Loop: Product {product_id}, Applied BOGO as best discount: {best_item_discount:.2f}")
+            if debug:
+                logger.debug("Product %s, Applied BOGO as best discount: %.2f", product_id, best_item_discount)
         elif flash_discount_amount > 0 and flash_discount_amount > bogo_discount_amount:
             # Apply Flash if it exists and is strictly better than BOGO
             best_item_discount = flash_discount_amount
             applied_discount_note = f"(-${best_item_discount:.2f} Flash Sale)" # Correct Flash note
-            print(f"Debug Calc Loop: Product {product_id}, Applied Flash Sale as best discount: {best_item_discount:.2f}")
-        else:
+            if debug:
+                logger.debug("Product %s, Applied Flash Sale as best discount: %.2f", product_id, best_item_discount)
+        elif debug:
             # No discount or both are zero
-             print(f"Debug Calc Loop: Product {product_id}, No item discount applied (BOGO={bogo_discount_amount:.2f}, Flash={flash_discount_amount:.2f})")
+            logger.debug("Product %s, No item discount applied (BOGO=%.2f, Flash=%.2f)", product_id, bogo_discount_amount, flash_discount_amount)
 
         # Update totals based on the determined best_item_discount (which could be 0.0)
         total_item_discount += best_item_discount
-        print(f"Debug Calc Loop: Product {product_id}, Total Item Discount Cumulative Now: {total_item_discount:.2f}") # Renamed for clarity
+        if debug:
+            logger.debug("Product %s, Total Item Discount Cumulative Now: %.2f", product_id, total_item_discount)
 
         # Add the note to the details list if a discount was applied
         if applied_discount_note:
             discount_details.append({'id': product_id, 'note': applied_discount_note})
-            print(f"Debug Calc Loop: Product {product_id}, Added discount note: {applied_discount_note}")
+            if debug:
+                logger.debug("Product %s, Added discount note: %s", product_id, applied_discount_note)
 
         
     # --- Calculate subtotal after item discounts ---
     subtotal_after_item_discounts = subtotal_before_discounts - total_item_discount
-    print(f"Debug: Subtotal after item discounts: {subtotal_after_item_discounts}")
+    if debug:
+        logger.debug("Subtotal after item discounts: %s", subtotal_after_item_discounts)
 
     # --- Apply Tiered Discount ---
     tiered_discount_amount = 0.0
     applied_tiered_percentage = 0.0
 
-    # Iterate thresholds high to low (LeetCode: Conditional Logic)
-    for threshold, percentage in TIERED_DISCOUNTS:
-        if subtotal_after_item_discounts >= threshold:
-            tiered_discount_amount = subtotal_after_item_discounts * percentage
-            applied_tiered_percentage = percentage * 100
-            break
-    print(f"Debug: Tiered discount amount: {tiered_discount_amount}")
+    # Bisect the compiled tier table instead of scanning it (LeetCode: Binary Search)
+    tier = rules.tier_for(subtotal_after_item_discounts)
+    if tier is not None:
+        threshold, percentage = tier
+        tiered_discount_amount = subtotal_after_item_discounts * percentage
+        applied_tiered_percentage = percentage * 100
+    if debug:
+        logger.debug("Tiered discount amount: %s", tiered_discount_amount)
 
     # --- Calculate Final Total ---
     final_total = subtotal_after_item_discounts - tiered_discount_amount
@@ -305,7 +433,7 @@ def get_sorted_products(product_list, criteria='name', reverse=False):
         print("Warning: Invalid sort criteria. Defaulting to sorting by name.")
         criteria = 'name'
     
-    sorted_list = sorted(product_list, key=lambda p: p[criteria], reverse=True)
+    sorted_list = sorted(product_list, key=lambda p: p[criteria], reverse=reverse)
     return sorted_list
 
 def filter_products_by_price(product_list, min_price=0.0, max_price=float('inf')):
@@ -335,21 +463,44 @@ def filter_products_by_price(product_list, min_price=0.0, max_price=float('inf')
             results.append(product)
     return results
 
+def display_paged(fetch_page, page_size=10):
+    """
+    Displays a long product listing one page at a time.
+    fetch_page(cursor, limit) returns a catalog_views.Page; the first call gets cursor=None.
+    """
+    cursor = None
+    shown = 0
+    while True:
+        page = fetch_page(cursor, page_size)
+        display_products(page.products)
+        shown += len(page.products)
+        if page.next_cursor is None:
+            break
+        more = input(f"Showing {shown} of {page.total}. Press Enter for more, or 'q' to stop: ")
+        if more.strip().lower() == 'q':
+            break
+        cursor = page.next_cursor
+
 # --- Phase 4 Functions ---
 
-def update_copurchase_history(cart, history_map):
+@timed("update_copurchase_history")
+def update_copurchase_history(cart, history_map, observers=()):
     """
     Updates the co-purchase history based on items bought together in the cart.
     Increments counts for every unique pair of distinct items in the cart.
+    Each observer (e.g. a NeighborIndex) gets record_pair(a, b, new_count) for
+    both directions of every updated pair.
     """
+    debug = logger.isEnabledFor(logging.DEBUG)
     product_ids_in_cart = list(cart.keys())
 
     # Need at least two distinct items to form a pair
     if len(product_ids_in_cart) < 2:
-        print("Debug Reco: Cart needs at least 2 distinct items to update co-purchase history.")
+        logger.debug("Cart needs at least 2 distinct items to update co-purchase history.")
         return
     
-    print(f"Debug Reco Update: Processing pairs for cart items {product_ids_in_cart}")
+    if debug:
+        logger.debug("Processing pairs for cart items %s", product_ids_in_cart)
 
     # Iterate through all unique pairs of items in the cart
     # (LeetCode: Combination generation concept)
@@ -361,29 +512,43 @@ def update_copurchase_history(cart, history_map):
             # Ensure dictionaries exist, then increment count for A -> B
             history_map.setdefault(item_a_id, {})
             history_map[item_a_id][item_b_id] = history_map[item_a_id].get(item_b_id, 0) + 1
-            print(f"Debug Reco Update: Increased count for {item_a_id} -> {item_b_id}")
+            for observer in observers:
+                observer.record_pair(item_a_id, item_b_id, history_map[item_a_id][item_b_id])
+            if debug:
+                logger.debug("Increased count for %s -> %s", item_a_id, item_b_id)
 
             # Ensure dictionaries exist, then increment count for B -> A (for easy lookup later)
             history_map.setdefault(item_b_id, {})
             history_map[item_b_id][item_a_id] = history_map[item_b_id].get(item_a_id, 0) + 1
-            print(f"Debug Reco Update: Increased count for {item_b_id} -> {item_a_id}")
-    
-    print(f"Debug Reco Update: History map updated: {history_map}")
+            for observer in observers:
+                observer.record_pair(item_b_id, item_a_id, history_map[item_b_id][item_a_id])
+            if debug:
+                logger.debug("Increased count for %s -> %s", item_b_id, item_a_id)
+
+    # Dumping the whole map is O(catalog^2), so it sits one level below DEBUG
+    if logger.isEnabledFor(TRACE):
+        logger.log(TRACE, "History map updated: %s", history_map)
 
 
-def get_recommendations(cart, history_map, lookup, num_recommendations=3):
+@timed("get_recommendations")
+def get_recommendations(cart, history_map, lookup, num_recommendations=3, neighbor_index=None):
     """
     Generates product recommendations based on cart contents and co-purchase history.
     Returns a list of top recommended product IDs.
-    (LeetCode Concepts: Hashing, Sorting)
+    With a NeighborIndex, scores come from its precomputed top-K lists instead of
+    full history rows (ties then go to the lower product ID).
+    (LeetCode Concepts: Hashing, Heap / Top K)
     """
     if not cart:
         return []
+
+    if neighbor_index is not None:
+        return get_top_recommendations(cart, neighbor_index, num_recommendations)
     
     recommendation_scores = {}
     items_in_cart_ids = set(cart.keys())
 
-    print(f"\n--- Generating Recommendations based on items: {list(items_in_cart_ids)} ---")
+    logger.debug("Generating recommendations based on items: %s", items_in_cart_ids)
 
     #Iterate through items in the cart
     for item_id in items_in_cart_ids:
@@ -395,32 +560,153 @@ def get_recommendations(cart, history_map, lookup, num_recommendations=3):
                 if other_item_id not in items_in_cart_ids:
                     # Add the co-purchase count to the score for the potential recommendation
                     recommendation_scores[other_item_id] = recommendation_scores.get(other_item_id, 0) + count
-                    #print(f"Debug Reco Gen: Item {item_id} suggests {other_item_id} with count {count}. Total score for {other_item_id}: {recommendation_scores[other_item_id]}")
 
     if not recommendation_scores:
-        print("No co-purchase data found for items in cart. Cannot generate recommendations yet.")
+        logger.info("No co-purchase data found for items in cart. Cannot generate recommendations yet.")
         return []
     
-    # Sort the potential recommendations by score (descending)
-    # Uses a lambda function similar to Phase 2 sorting
-    sorted_recommendations = sorted(recommendation_scores.items(), key=lambda item: item[1], reverse=True)
+    # Select the top N by score (descending) with a heap instead of sorting every candidate.
+    # heapq.nlargest keeps the same order as sorted(..., reverse=True)[:N], ties included.
+    top_recommendations = heapq.nlargest(num_recommendations, recommendation_scores.items(), key=lambda item: item[1])
     # Format: [(product_id1, score1), (product_id2, score2), ...]
-    #print(f"Debug Reco Gen: Sorted scores: {sorted_recommendations}")
 
     # Get the product IDs of the top N recommendations
-    recommended_ids = [item_id for item_id, score in sorted_recommendations[:num_recommendations]]
+    recommended_ids = [item_id for item_id, score in top_recommendations]
 
     return recommended_ids
 
 
+def get_cached_recommendations(cart, history_map, lookup, cache, num_recommendations=3, neighbor_index=None):
+    """
+    Same as get_recommendations(), memoized in a RecommendationCache.
+    The cache must also be passed to update_copurchase_history() as an observer
+    so entries for updated products are invalidated. Carts with the same items
+    share an entry, so equal-score ties keep the order of the cart that filled it.
+    """
+    return cache.get_or_compute(
+        cart, num_recommendations,
+        lambda: get_recommendations(cart, history_map, lookup, num_recommendations, neighbor_index))
+
+
 # --- Main Program Loop (Simple Console UI) ---
 
 def main():
     """Runs the main shopping cart interaction loop."""
 
-    copurchase_counts = {}
+    # SMART_CART_LOG_LEVEL=DEBUG shows pricing/recommendation traces,
+    # SMART_CART_TIMING=1 collects per-call latency counters (printed on exit)
+    configure_logging()
+    if os.environ.get("SMART_CART_TIMING") == "1":
+        enable_timing()
+    # SMART_CART_CENTS=1 prices carts in exact integer cents instead of float dollars
+    integer_cents = os.environ.get("SMART_CART_CENTS") == "1"
+
+    # SMART_CART_PROMOTIONS=<file.json> replaces the built-in BOGO/flash/tier rules
+    # with a promotion config (see promotion_rules.py)
+    promotions_path = os.environ.get("SMART_CART_PROMOTIONS")
+    if promotions_path:
+        from promotion_rules import PromotionConfigError, load_promotions
+        try:
+            app.pricing_engine.set_promotions(load_promotions(promotions_path))
+            app.pricing_engine.promotions  # Compile now so config errors show up at startup
+        except (OSError, PromotionConfigError) as exc:
+            print(f"Warning: could not load promotions from '{promotions_path}' ({exc}). Using the built-in rules.")
+            app.pricing_engine.set_promotions(None)
+        else:
+            if integer_cents:
+                print("Warning: SMART_CART_CENTS is ignored when SMART_CART_PROMOTIONS is set.")
+                integer_cents = False
+
+    # SMART_CART_DATA=<file> keeps the catalog and co-purchase history across runs:
+    # a memory-mapped snapshot plus an append-only log of checkouts, checkpointed on exit
+    data_path = os.environ.get("SMART_CART_DATA")
+    history_store = None
+    if data_path:
+        from storage import CopurchaseStore
+        history_store = CopurchaseStore(data_path)
+        if history_store.snapshot is not None:
+            # Catalog from the mapped snapshot instead of load_products(): products and
+            # lookups decode one record on demand, so startup does not read the catalog
+            app.product_lookup = history_store.lookup
+            app.products = history_store.mapped_products
+
+    # Catalog, promotions and cart are built here, on first use. The search index
+    # and sorted views scan the whole catalog, so they wait for the first search/listing.
+    simulated_now = app.simulated_now
+    print(f"(Simulating time as: {simulated_now.strftime('%Y-%m-%d %H:%M:%S')})") # Info for user
+    products = app.products
+    product_lookup = app.product_lookup
+    inventory = app.inventory
+    shopping_cart = app.shopping_cart
+    copurchase_counts = app.copurchase_counts
+    # SMART_CART_DECAY_HALF_LIFE_DAYS=<days> makes older co-purchases count less
+    # (exponential decay on current_time, weak pairs pruned once a day)
+    decayed_history = None
+    half_life_days = os.environ.get("SMART_CART_DECAY_HALF_LIFE_DAYS")
+    if half_life_days:
+        if history_store is not None:
+            print("Warning: SMART_CART_DECAY_HALF_LIFE_DAYS is ignored when SMART_CART_DATA is set.")
+        else:
+            from decayed_history import DecayedCopurchaseHistory
+            try:
+                decayed_history = DecayedCopurchaseHistory(timedelta(days=float(half_life_days)), simulated_now,
+                                                           prune_interval=timedelta(days=1))
+            except ValueError:
+                print(f"Warning: invalid SMART_CART_DECAY_HALF_LIFE_DAYS '{half_life_days}', decay disabled.")
+    # SMART_CART_MATRIX=1 keeps the in-memory history in a CopurchaseMatrix (CSR, needs numpy):
+    # each write-behind batch of orders is ingested with one add_orders() call
+    copurchase_matrix = None
+    if os.environ.get("SMART_CART_MATRIX") == "1":
+        if history_store is not None or decayed_history is not None:
+            print("Warning: SMART_CART_MATRIX is ignored with SMART_CART_DATA or SMART_CART_DECAY_HALF_LIFE_DAYS.")
+        else:
+            from copurchase_matrix import CopurchaseMatrix
+            copurchase_matrix = CopurchaseMatrix()
+    if history_store is not None:
+        history_map = history_store
+    elif decayed_history is not None:
+        history_map = decayed_history
+    elif copurchase_matrix is not None:
+        history_map = copurchase_matrix
+    else:
+        history_map = copurchase_counts
+    recommendation_cache = RecommendationCache(max_entries=256, ttl_seconds=600)
+    # Recommendations rank from per-product top-K neighbor lists instead of full rows
+    # (the matrix instead sums the cart's CSR rows with CopurchaseMatrix.recommend()).
+    # The index is built from the history on the first recommendation (not at startup)
+    # and from then on kept current as a history observer.
+    history_observers = [recommendation_cache]
+    neighbor_index = None
+
+    # Checkout confirms an order right away; co-purchase learning runs behind it on a
+    # background worker. SMART_CART_HISTORY_BATCH_DELAY_MS=<ms> is how long an order may wait
+    # for more orders to share its update batch (default 50).
+    # This keeps checkout latency independent of the update; it does not make updates cheaper,
+    # except that the SMART_CART_DATA history store writes its log once per batch.
+    def apply_orders(orders):
+        if copurchase_matrix is not None:
+            copurchase_matrix.add_orders([product_ids for product_ids, _ in orders])
+            recommendation_cache.invalidate_products({product_id for product_ids, _ in orders if len(product_ids) > 1
+                                                      for product_id in product_ids})
+            return
+        if history_store is not None:
+            history_store.record_checkouts([product_ids for product_ids, _ in orders], observers=history_observers)
+            return
+        for product_ids, checkout_time in orders:
+            if decayed_history is not None:
+                decayed_history.record_checkout(product_ids, checkout_time, observers=history_observers)
+            else:
+                update_copurchase_history(dict.fromkeys(product_ids), copurchase_counts, observers=history_observers)
+
+    batch_delay_ms = os.environ.get("SMART_CART_HISTORY_BATCH_DELAY_MS", "50")
+    try:
+        max_batch_delay = max(0.0, float(batch_delay_ms)) / 1000
+    except ValueError:
+        print(f"Warning: invalid SMART_CART_HISTORY_BATCH_DELAY_MS '{batch_delay_ms}', using 50.")
+        max_batch_delay = 0.05
+    checkout_pipeline = CheckoutPipeline(apply_orders, max_batch_delay=max_batch_delay)
    
-    current_product_view = list(products) # Start with the full list
+    current_product_view = products # Start with the full list
     current_time = simulated_now
 
     while True:
@@ -446,32 +732,39 @@ def main():
             display_products(current_product_view) # Display the potentially filtered/sorted list
         elif choice == '2':
             keyword = input("Enter search keyword: ")
-            search_results = search_products_by_name(products, keyword) # Search the original list
+            search_index = app.search_index
+            search_results = search_index.search(keyword) # Search the whole catalog via the index
             print(f"\n--- Search Results for '{keyword}' ---")
             display_products(search_results)
+            suggestions = search_index.complete(keyword, limit=5)
+            if suggestions:
+                print("Did you mean: " + ", ".join(f"{product['name']} (ID: {product['id']})" for product in suggestions))
             # current_product_view = search_results
         elif choice == '3':
             criteria = input("Sort by (name/price): ").lower()
             order = input("Order (asc/desc): ").lower()
             reverse_order = (order == 'desc')
-            # Sort the original list to show all products sorted
-            sorted_list = get_sorted_products(products, criteria, reverse_order)
+            if criteria not in SORT_CRITERIA:
+                print("Warning: Invalid sort criteria. Defaulting to sorting by name.")
+                criteria = 'name'
+            # Page through the pre-sorted view instead of re-sorting the catalog
             print(f"\n--- Products Sorted by {criteria} ({order}) ---")
-            display_products(sorted_list)
-            # current_product_view = sorted_list
+            display_paged(lambda cursor, limit: app.catalog_views.sorted_page(criteria, reverse_order, limit=limit, cursor=cursor))
         elif choice == '4':
             try:
                 min_p = float(input("Enter minimum price (e.g., 50.0): "))
                 max_p = float(input("Enter maximum price (e.g., 500.0): "))
-                filtered_list = filter_products_by_price(products, min_p, max_p) # Filter original list
+                if min_p < 0 or max_p < 0:
+                    print("Warning: Prices cannot be negative. Using 0 instead.")
+                    min_p, max_p = max(0, min_p), max(0, max_p)
+                # Bisect the price-sorted view (results cheapest first)
                 print(f"\n--- Products between ${min_p:.2f} and ${max_p:.2f} ---")
-                display_products(filtered_list)
-                # current_product_view = filtered_list
+                display_paged(lambda cursor, limit: app.catalog_views.price_range(min_p, max_p, offset=cursor or 0, limit=limit))
             except ValueError:
                 print("Invalid price input. Please enter numbers.")
         elif choice == '5':
              print("Resetting product view to show all products.")
-             current_product_view = list(products) # Go back to the full list
+             current_product_view = products # Go back to the full list
              display_products(current_product_view)
 
         # --- Cart Actions (Adjust numbers) ---
@@ -484,7 +777,13 @@ def main():
                      print(f"Error: Product ID {product_id} does not exist in the catalog.")
                 else:
                     quantity = int(input("Enter quantity: "))
-                    add_to_cart(shopping_cart, product_lookup, product_id, quantity)
+                    try:
+                        if quantity > 0:
+                            inventory.reserve(CONSOLE_SESSION, product_id, quantity, current_time)
+                    except InventoryError as exc:
+                        print(f"Error: {exc}")
+                    else:
+                        add_to_cart(shopping_cart, product_lookup, product_id, quantity)
             except ValueError:
                 print("Invalid input. Please enter numbers for ID and quantity.")
         elif choice == '7':
@@ -494,17 +793,25 @@ def main():
                      print(f"Error: Product ID {product_id} is not in your cart.")
                 else:
                     quantity = int(input("Enter quantity to remove: "))
-                    remove_from_cart(shopping_cart, product_lookup, product_id, quantity)
+                    if remove_from_cart(shopping_cart, product_lookup, product_id, quantity):
+                        inventory.release(CONSOLE_SESSION, product_id, current_time, quantity)
             except ValueError:
                 print("Invalid input. Please enter numbers for ID and quantity.")
         elif choice == '8':
-            view_cart(shopping_cart, product_lookup, current_time)
+            view_cart(shopping_cart, product_lookup, current_time, integer_cents)
         elif choice == '9':
             print("\n--- Checking Out ---")
             if not shopping_cart:
                 print("\nYour cart is empty. Total is $0.00")
             else:
-                totals = calculate_total(shopping_cart, product_lookup, current_time)
+                # 1. Take the whole cart out of stock in one step (nothing changes on failure)
+                try:
+                    inventory.commit(CONSOLE_SESSION, shopping_cart, current_time)
+                except InventoryError as exc:
+                    print(f"Checkout failed: {exc}")
+                    print("Please adjust your cart and try again.")
+                    continue
+                totals = get_cart_totals(shopping_cart, product_lookup, current_time, integer_cents)
                 print("\n--- Cart Total Breakdown ---")
                 print(f"Subtotal:                     ${totals['subtotal_before_discounts']:.2f}")
                 if totals['total_item_discount'] > 0:
@@ -521,14 +828,24 @@ def main():
                 print("----------------------------\n")
                 print("Processing order...") # Simulate processing
 
-                # 2. Update co-purchase history (LEARN from this purchase)
+                # 2. Queue the co-purchase update (LEARN from this purchase); applied in the background
                 print("Updating purchase history...")
-                update_copurchase_history(shopping_cart, copurchase_counts)
+                checkout_pipeline.submit((list(shopping_cart), current_time))
 
 
                 # 3. Generate recommendations based on the cart just checked out
                 print("Generating recommendations for your next purchase...")
-                recommended_ids = get_recommendations(shopping_cart, copurchase_counts, product_lookup, num_recommendations=3)
+                with checkout_pipeline.lock:  # The worker may be updating the history
+                    if copurchase_matrix is not None:
+                        recommended_ids = recommendation_cache.get_or_compute(
+                            shopping_cart, 3, lambda: copurchase_matrix.recommend(shopping_cart, num_recommendations=3))
+                    else:
+                        if neighbor_index is None:
+                            neighbor_index = NeighborIndex.from_history(history_map)
+                            history_observers.append(neighbor_index)
+                        recommended_ids = get_cached_recommendations(shopping_cart, history_map, product_lookup,
+                                                                     recommendation_cache, num_recommendations=3,
+                                                                     neighbor_index=neighbor_index)
 
                 if recommended_ids:
                     print("\n--- You might also be interested in ---")
@@ -545,6 +862,16 @@ def main():
 
         # --- Exit ---
         elif choice == '0':
+            checkout_pipeline.close()  # Applies any queued history updates first
+            if timing_enabled():
+                print("\n--- Timing Metrics ---")
+                print(format_metrics())
+                print(f"Recommendation cache: {recommendation_cache.stats()}")
+                print(f"Checkout pipeline: {checkout_pipeline.stats()}")
+            if history_store is not None:
+                print("Saving purchase history...")
+                history_store.checkpoint(products)
+                history_store.close()
             print("Exiting application. Goodbye!")
             break
         else:
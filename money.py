@@ -0,0 +1,45 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+
+# --- Integer Money Helpers ---
+# Amounts are whole cents (int) and discount rates are integer parts per
+# million, so every pricing step is integer arithmetic and the only rounding
+# is the explicit half-up rounding in to_cents(), to_rate() and apply_rate().
+
+CENTS_PER_DOLLAR = 100
+RATE_SCALE = 1_000_000  # 0.15 (15%) is stored as 150_000
+
+
+def _decimal(value):
+    # repr() gives the shortest decimal that round-trips (19.99, not 19.98999...),
+    # so rounding decisions are made on the number as it was written
+    number = Decimal(value) if isinstance(value, (int, str)) else Decimal(repr(float(value)))
+    if not number.is_finite():
+        raise ValueError(f"Amount must be finite: {value!r}")
+    return number
+
+
+def to_cents(amount):
+    """Converts dollars (float, int or str) to whole cents, rounding half away from zero."""
+    return int(_decimal(amount).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_rate(rate):
+    """Converts a fractional rate (0.2 for 20%) to parts per million, rounding half up."""
+    return int((_decimal(rate) * RATE_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def apply_rate(cents, rate):
+    """Returns rate (parts per million) of a non-negative cents amount, rounded half up to the cent."""
+    return (cents * rate + RATE_SCALE // 2) // RATE_SCALE
+
+
+def format_cents(cents):
+    """Formats cents as dollars with two decimals: 1999 -> '19.99'."""
+    sign = "-" if cents < 0 else ""
+    whole, part = divmod(abs(cents), CENTS_PER_DOLLAR)
+    return f"{sign}{whole}.{part:02d}"
+
+
+def to_dollars(cents):
+    return cents / CENTS_PER_DOLLAR
@@ -0,0 +1,341 @@
+"""
+Backfills co-purchase history from historical order logs.
+
+Input formats (optionally gzip-compressed, picked by file extension):
+  JSONL  one order per line: {"order_id": 1, "items": [3, 5]}, {"items": {"3": 2}},
+         {"items": [[3, 2], [5, 1]]} or a bare list [3, 5]
+  CSV    one row per order line: order_id,product_id[,quantity]; rows of the
+         same order must be contiguous. A header row is optional.
+
+Files are streamed in chunks of raw lines and never loaded whole. Chunks go
+to a pool of worker processes through a bounded queue; each worker parses its
+chunks and keeps ONE partial pair-count map, which it sends back when the
+input is exhausted. The partial maps are merged at the end into the same
+history_map that calling update_copurchase_history() once per order would
+build (same counts, and the same row and neighbour order).
+
+Run with: python order_ingest.py orders.jsonl [more files] [--workers 4] [--output cart.db]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from operator import itemgetter
+
+FORMATS = ('jsonl', 'csv')
+DEFAULT_CHUNK_SIZE = 10_000  # Lines per chunk handed to a worker
+_ORDER_SHIFT = 40  # Bits for the pair index within an order in a first-occurrence stamp
+_CHUNK_SHIFT = 80  # Bits for (order index, pair index) within a chunk
+
+IngestStats = namedtuple('IngestStats', ['orders', 'distinct_pairs', 'seconds'])
+
+
+def detect_format(path):
+    """Returns 'jsonl' or 'csv' from the file extension (a trailing .gz is ignored)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return 'csv'
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return 'jsonl'
+    raise ValueError(f"Cannot tell the format of {path!r}; pass --format.")
+
+
+def _open_binary(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+# --- Parsing (runs in the workers) ---
+
+def _order_items(record):
+    """Product ids of one JSON order, first occurrence first (like the keys of a cart dict)."""
+    items = record.get('items', record.get('products')) if isinstance(record, dict) else record
+    if isinstance(items, dict):
+        product_ids = [int(product_id) for product_id in items]
+    elif isinstance(items, list):
+        product_ids = [int(item[0]) if isinstance(item, list) else int(item) for item in items]
+    else:
+        raise ValueError(f"Order has no item list: {record!r}")
+    return list(dict.fromkeys(product_ids))
+
+
+def parse_jsonl_orders(data):
+    """Yields the product id list of each order in a block of JSONL bytes."""
+    for line in data.splitlines():
+        if line.strip():
+            yield _order_items(json.loads(line))
+
+
+def parse_csv_orders(data, order_column=0, product_column=1):
+    """Yields the product id list of each order in a block of CSV bytes (contiguous rows per order)."""
+    current_order = None
+    product_ids = {}
+    for row in csv.reader(io.StringIO(data.decode("utf-8"))):
+        if not row:
+            continue
+        if row[order_column] != current_order:
+            if product_ids:
+                yield list(product_ids)
+            current_order = row[order_column]
+            product_ids = {}
+        product_ids[int(row[product_column])] = True
+    if product_ids:
+        yield list(product_ids)
+
+
+def _parse_chunk(chunk):
+    _, fmt, columns, data = chunk
+    if fmt == 'csv':
+        return parse_csv_orders(data, *columns)
+    return parse_jsonl_orders(data)
+
+
+# --- Pair counting ---
+
+class PairCounts:
+    """
+    Partial co-purchase counts for part of the order stream.
+    counts maps each unordered pair (lower id, higher id) to its count; first
+    maps it to a stamp of the pair's first occurrence, which is what fixes
+    dict insertion order in the serial loop. A stamp packs (chunk number,
+    order index, pair index) into one integer, times two, plus 1 when the
+    first order listed the higher id first.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.first = {}
+        self.orders = 0
+
+    def add_chunk(self, chunk):
+        chunk_base = chunk[0] << _CHUNK_SHIFT
+        counts = self.counts
+        first = self.first
+        for order_index, product_ids in enumerate(_parse_chunk(chunk)):
+            self.orders += 1
+            stamp = (chunk_base | (order_index << _ORDER_SHIFT)) << 1
+            size = len(product_ids)
+            for i in range(size):
+                item_a_id = product_ids[i]
+                for j in range(i + 1, size):
+                    item_b_id = product_ids[j]
+                    if item_a_id < item_b_id:
+                        key = (item_a_id, item_b_id)
+                        flipped = 0
+                    else:
+                        key = (item_b_id, item_a_id)
+                        flipped = 1
+                    count = counts.get(key)
+                    if count is None:
+                        counts[key] = 1
+                        first[key] = stamp | flipped
+                    else:
+                        counts[key] = count + 1
+                    stamp += 2
+
+    def merge(self, other):
+        """Adds another partial map into this one (earliest first occurrence wins)."""
+        counts = self.counts
+        first = self.first
+        other_first = other.first
+        for key, count in other.counts.items():
+            seen = first.get(key)
+            if seen is None:
+                counts[key] = count
+                first[key] = other_first[key]
+            else:
+                counts[key] += count
+                if other_first[key] < seen:
+                    first[key] = other_first[key]
+        self.orders += other.orders
+
+    def to_history(self):
+        """
+        Builds the {product_id: {neighbor_id: count}} history_map.
+        Both directions of every pair are inserted in first-occurrence order
+        (A -> B before B -> A, as update_copurchase_history() does).
+        """
+        history = {}
+        counts = self.counts
+        for key, stamp in sorted(self.first.items(), key=itemgetter(1)):
+            count = counts[key]
+            item_a_id, item_b_id = (key[1], key[0]) if stamp & 1 else key
+            history.setdefault(item_a_id, {})[item_b_id] = count
+            history.setdefault(item_b_id, {})[item_a_id] = count
+        return history
+
+
+# --- Streaming reader ---
+
+def _csv_fields(line):
+    return next(csv.reader([line.decode("utf-8")]), [])
+
+
+def _csv_columns(header_line):
+    """Returns ((order column, product column), is_header) for the first line of a CSV file."""
+    fields = [field.strip().lower() for field in _csv_fields(header_line)]
+    if 'order_id' in fields and 'product_id' in fields:
+        return (fields.index('order_id'), fields.index('product_id')), True
+    return (0, 1), False
+
+
+def iter_chunks(paths, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields (chunk number, format, csv columns, bytes) chunks of about chunk_size
+    lines from each file in turn. CSV chunks are only cut between orders.
+    """
+    chunk_number = 0
+    for path in paths:
+        file_format = fmt or detect_format(path)
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown format: {file_format!r}")
+        with _open_binary(path) as handle:
+            columns = None
+            lines = []
+            boundary_order = None  # CSV: order id of the line that filled the chunk
+            for line in handle:
+                if file_format == 'csv':
+                    if columns is None:
+                        columns, is_header = _csv_columns(line)
+                        if is_header:
+                            continue
+                    if boundary_order is not None:
+                        fields = _csv_fields(line)
+                        if fields and fields[columns[0]] == boundary_order:
+                            lines.append(line)
+                            continue
+                        yield chunk_number, file_format, columns, b"".join(lines)
+                        chunk_number += 1
+                        lines = []
+                        boundary_order = None
+                    lines.append(line)
+                    if len(lines) >= chunk_size:
+                        fields = _csv_fields(line)
+                        boundary_order = fields[columns[0]] if fields else None
+                        if boundary_order is None:
+                            yield chunk_number, file_format, columns, b"".join(lines)
+                            chunk_number += 1
+                            lines = []
+                else:
+                    lines.append(line)
+                    if len(lines) >= chunk_size:
+                        yield chunk_number, file_format, columns, b"".join(lines)
+                        chunk_number += 1
+                        lines = []
+            if lines:
+                yield chunk_number, file_format, columns, b"".join(lines)
+                chunk_number += 1
+
+
+# --- Process pool ---
+
+def _worker(tasks, results):
+    partial = PairCounts()
+    error = None
+    while True:
+        chunk = tasks.get()
+        if chunk is None:
+            break
+        if error is None:  # After a failure keep draining so the reader never blocks
+            try:
+                partial.add_chunk(chunk)
+            except Exception as exc:
+                error = f"chunk {chunk[0]}: {exc!r}"
+    results.put(('error', error) if error else ('ok', partial))
+
+
+def count_pairs(paths, fmt=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams the order files through the worker pool and returns the merged PairCounts.
+    workers=None uses every CPU; workers <= 1 counts in this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = iter_chunks(paths, fmt, chunk_size)
+
+    if workers <= 1:
+        total = PairCounts()
+        for chunk in chunks:
+            total.add_chunk(chunk)
+        return total
+
+    context = multiprocessing.get_context()
+    tasks = context.Queue(maxsize=workers * 2)  # Bounded, so reading never runs far ahead
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(tasks, results), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for chunk in chunks:
+            tasks.put(chunk)
+    finally:
+        for _ in processes:
+            tasks.put(None)
+
+    total = PairCounts()
+    errors = []
+    for _ in processes:
+        status, payload = results.get()
+        if status == 'ok':
+            total.merge(payload)
+        else:
+            errors.append(payload)
+    for process in processes:
+        process.join()
+    if errors:
+        raise ValueError(f"Order ingestion failed: {'; '.join(errors)}")
+    return total
+
+
+def ingest_orders(paths, fmt=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Returns (history_map, IngestStats) for the given order files."""
+    start = time.perf_counter()
+    counts = count_pairs(paths, fmt, workers, chunk_size)
+    history = counts.to_history()
+    return history, IngestStats(counts.orders, len(counts.counts), time.perf_counter() - start)
+
+
+def merge_history(history_map, ingested):
+    """Adds an ingested history into an existing dict-of-dicts history_map in place."""
+    for product_id, row in ingested.items():
+        target = history_map.setdefault(product_id, {})
+        for neighbor_id, count in row.items():
+            target[neighbor_id] = target.get(neighbor_id, 0) + count
+    return history_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill co-purchase history from order logs.")
+    parser.add_argument("paths", nargs="+", help="JSONL or CSV order files (.gz allowed).")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the file extension).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Lines per chunk.")
+    parser.add_argument("--output", help="Snapshot file to merge the history into (see storage.py).")
+    args = parser.parse_args()
+
+    history, stats = ingest_orders(args.paths, args.format, args.workers, args.chunk_size)
+    rate = stats.orders / stats.seconds if stats.seconds > 0 else float('inf')
+    print(f"Ingested {stats.orders} orders ({stats.distinct_pairs} distinct pairs) "
+          f"in {stats.seconds:.2f}s: {rate:,.0f} orders/sec")
+
+    if args.output:
+        from storage import CopurchaseStore
+
+        store = CopurchaseStore(args.output)
+        try:
+            products = None
+            if store.snapshot is None:
+                from main import app  # New snapshot: take the catalog from main.py
+                products = app.products
+            store.import_history(history, products)
+        finally:
+            store.close()
+        print(f"Merged into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+from bisect import bisect_right
+
+from flash_sale_index import FlashSaleIndex
+from instrumentation import timed
+
+
+# --- Compiled Pricing Rules ---
+# calculate_total() used to re-scan FLASH_SALES for every cart line and walk
+# TIERED_DISCOUNTS for every cart. The compiler below turns those rule lists
+# into lookup structures once: flash sales go into a per-product interval
+# index (see flash_sale_index.py) and tiers into a bisect-able table.
+
+
+def _compile_tiers(tiered_discounts):
+    """
+    Builds a bisect-able tier table from (threshold, percentage) tuples.
+    The original loop applies the FIRST listed tier whose threshold is met, so
+    for every ascending threshold we keep the earliest-listed tier among all
+    tiers at or below it (a prefix minimum over list position).
+    Returns (thresholds, tiers) with thresholds ascending.
+    """
+    ordered = sorted(enumerate(tiered_discounts), key=lambda item: (item[1][0], item[0]))
+
+    thresholds = []
+    tiers = []
+    best_position = None
+    best_tier = None
+    for position, (threshold, percentage) in ordered:
+        if best_position is None or position < best_position:
+            best_position = position
+            best_tier = (threshold, percentage)
+        thresholds.append(threshold)
+        tiers.append(best_tier)
+    return thresholds, tiers
+
+
+class CompiledPricingRules:
+    """Immutable snapshot of the BOGO, flash sale and tier rules in lookup form."""
+
+    def __init__(self, bogo_ids, flash_sales, tiered_discounts):
+        self.bogo_ids = frozenset(bogo_ids)
+        self.flash_index = FlashSaleIndex(flash_sales)
+        self.tier_thresholds, self.tier_table = _compile_tiers(tiered_discounts)
+
+    def active_flash_sale(self, product_id, current_time):
+        """
+        Returns the active sale for the product, or None.
+        When several sales overlap, the one listed first in FLASH_SALES wins,
+        matching get_active_flash_sale().
+        """
+        return self.flash_index.first_active(product_id, current_time)
+
+    def price_line(self, product_id, quantity, price, current_time):
+        """
+        Prices one cart line. Returns (line_total, item_discount, note), where
+        note is the discount_details note, or None when no discount applies.
+        """
+        line_item_total = price * quantity
+
+        bogo_discount_amount = 0.0
+        flash_discount_amount = 0.0
+
+        if product_id in self.bogo_ids:
+            free_items = quantity // 2
+            if free_items > 0:
+                bogo_discount_amount = free_items * price
+
+        active_sale = self.active_flash_sale(product_id, current_time)
+        if active_sale:
+            if active_sale['discount_type'] == 'percent':
+                flash_discount_amount = line_item_total * active_sale['value']
+            elif active_sale['discount_type'] == 'fixed':
+                flash_discount_amount = min(line_item_total, active_sale['value'] * quantity)
+
+        # BOGO wins ties, Flash must be strictly better
+        if bogo_discount_amount > 0 and bogo_discount_amount >= flash_discount_amount:
+            return line_item_total, bogo_discount_amount, f"(-${bogo_discount_amount:.2f} BOGO)"
+        if flash_discount_amount > 0 and flash_discount_amount > bogo_discount_amount:
+            return line_item_total, flash_discount_amount, f"(-${flash_discount_amount:.2f} Flash Sale)"
+        return line_item_total, 0.0, None
+
+    def tier_for(self, subtotal):
+        """Returns the (threshold, percentage) tier that applies to a subtotal, or None."""
+        index = bisect_right(self.tier_thresholds, subtotal)
+        if index == 0:
+            return None
+        return self.tier_table[index - 1]
+
+    def summarize(self, subtotal_before_discounts, total_item_discount, discount_details):
+        """Applies the tier to the item-level sums and builds the calculate_total() breakdown dict."""
+        subtotal_after_item_discounts = subtotal_before_discounts - total_item_discount
+
+        tiered_discount_amount = 0.0
+        applied_tiered_percentage = 0.0
+        tier = self.tier_for(subtotal_after_item_discounts)
+        if tier is not None:
+            tiered_discount_amount = subtotal_after_item_discounts * tier[1]
+            applied_tiered_percentage = tier[1] * 100
+
+        final_total = subtotal_after_item_discounts - tiered_discount_amount
+        total_discount_applied = total_item_discount + tiered_discount_amount
+
+        return {
+            'subtotal_before_discounts': subtotal_before_discounts,
+            'total_item_discount': total_item_discount,
+            'tiered_discount_percentage': applied_tiered_percentage,
+            'tiered_discount_amount': tiered_discount_amount,
+            'total_discount_applied': total_discount_applied,
+            'final_total': final_total,
+            'discount_details': discount_details
+        }
+
+
+class PricingEngine:
+    """
+    Holds references to the live rule collections and a compiled copy of them.
+    The compiled copy is rebuilt lazily: call invalidate() after editing
+    BOGO_ELIGIBLE_IDS, FLASH_SALES or TIERED_DISCOUNTS, or rebuild() to
+    compile eagerly.
+    promotions is an optional promotion config (see promotion_rules.py);
+    without one, price_cart_promotions() uses the config equivalent of the
+    three collections.
+    """
+
+    def __init__(self, bogo_ids, flash_sales, tiered_discounts, promotions=None):
+        self.bogo_ids = bogo_ids
+        self.flash_sales = flash_sales
+        self.tiered_discounts = tiered_discounts
+        self.promotions_config = promotions
+        self.generation = 0  # Bumped on every rebuild so callers can detect changes
+        self._rules = None
+        self._cents_rules = None
+        self._promotions = None
+        self._promotions_rules = None  # self.rules when _promotions was compiled
+
+    @property
+    def rules(self):
+        if self._rules is None:
+            self.rebuild()
+        return self._rules
+
+    def rebuild(self):
+        """Compiles the current rule collections immediately."""
+        self._rules = CompiledPricingRules(self.bogo_ids, self.flash_sales, self.tiered_discounts)
+        self.generation += 1
+        return self._rules
+
+    @property
+    def cents_rules(self):
+        """Integer-cents form of the current rules (see cents_pricing.py), rebuilt with them."""
+        rules = self.rules
+        if self._cents_rules is None or self._cents_rules.rules is not rules:
+            from cents_pricing import CentsPricingRules  # Deferred: decimal is only needed in cents mode
+            self._cents_rules = CentsPricingRules(rules)
+        return self._cents_rules
+
+    @property
+    def promotions(self):
+        """The promotion rule engine (CompiledPromotions), recompiled whenever the rules are."""
+        rules = self.rules
+        if self._promotions is None or self._promotions_rules is not rules:
+            from promotion_rules import CompiledPromotions, default_promotions
+            config = self.promotions_config
+            if config is None:
+                config = default_promotions(self.bogo_ids, self.flash_sales, self.tiered_discounts)
+            self._promotions = CompiledPromotions(config)
+            self._promotions_rules = rules
+        return self._promotions
+
+    def set_promotions(self, config):
+        """Replaces the promotion config (None: back to the default rule set)."""
+        self.promotions_config = config
+        self.invalidate()
+
+    def invalidate(self):
+        """Marks the compiled rules as stale; they are rebuilt on next use."""
+        self._rules = None
+
+    def active_flash_sale(self, product_id, current_time):
+        return self.rules.active_flash_sale(product_id, current_time)
+
+    def active_flash_sales(self, product_id, current_time):
+        """Returns every overlapping sale active for the product, in FLASH_SALES order."""
+        return self.rules.flash_index.active_sales(product_id, current_time)
+
+    @timed("price_cart")
+    def price_cart(self, cart, lookup, current_time):
+        """
+        Prices a cart with the compiled rules.
+        Returns the same breakdown dictionary as calculate_total() in main.py,
+        computed with the same floating point operations in the same order.
+        """
+        rules = self.rules
+        price_of = getattr(lookup, 'price_of', None)  # CatalogStore: skip building product views
+        subtotal_before_discounts = 0.0
+        total_item_discount = 0.0
+        discount_details = []
+
+        for product_id, quantity in cart.items():
+            price = price_of(product_id) if price_of else lookup[product_id]['price']
+            line_item_total, item_discount, note = rules.price_line(product_id, quantity, price, current_time)
+            subtotal_before_discounts += line_item_total
+            if note is not None:
+                total_item_discount += item_discount
+                discount_details.append({'id': product_id, 'note': note})
+
+        return rules.summarize(subtotal_before_discounts, total_item_discount, discount_details)
+
+    @timed("price_cart_promotions")
+    def price_cart_promotions(self, cart, lookup, current_time):
+        """
+        Prices a cart with the promotion rule engine. Returns the calculate_total()
+        breakdown; with the default rule set the result is identical to price_cart().
+        """
+        return self.promotions.price_cart(cart, lookup, current_time)
+
+    @timed("price_cart_cents")
+    def price_cart_cents(self, cart, lookup, current_time):
+        """
+        Prices a cart in integer cents with the rounding rules in cents_pricing.py.
+        Returns the *_cents breakdown (ints) plus 'tiered_discount_percentage'
+        and 'discount_details'; breakdown_in_dollars() converts it for display.
+        """
+        rules = self.cents_rules
+        price_line = rules.price_line
+        cents_by_price = rules.cents_by_price
+        discounted_ids = rules.discounted_ids
+        price_of = getattr(lookup, 'price_of', None)
+        subtotal_cents = 0
+        item_discount_cents = 0
+        discount_details = []
+
+        for product_id, quantity in cart.items():
+            price = price_of(product_id) if price_of else lookup[product_id]['price']
+            price_cents = cents_by_price[price]
+            if product_id not in discounted_ids:
+                subtotal_cents += price_cents * quantity  # No BOGO or sale: skip price_line()
+                continue
+            line_cents, discount_cents, note = price_line(product_id, quantity, price_cents, current_time)
+            subtotal_cents += line_cents
+            if note is not None:
+                item_discount_cents += discount_cents
+                discount_details.append({'id': product_id, 'note': note})
+
+        return rules.summarize(subtotal_cents, item_discount_cents, discount_details)
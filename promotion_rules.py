@@ -0,0 +1,308 @@
+import json
+from datetime import datetime
+
+from flash_sale_index import FlashSaleIndex
+from pricing_engine import CompiledPricingRules
+
+
+# --- Promotion Rule Engine ---
+# Promotions are loaded from a config (JSON) instead of being hard-coded:
+#
+#   {"categories": {"peripherals": [2, 3, 5]},
+#    "rules": [
+#      {"type": "buy_x_get_y", "products": [2, 5], "buy": 1, "get": 1},
+#      {"type": "flash", "product_id": 1, "start_time": "2025-04-26T10:41:15",
+#       "end_time": "2025-04-26T12:41:15", "discount_type": "percent", "value": 0.20},
+#      {"type": "category_percent", "category": "peripherals", "value": 0.10, "group": "category"},
+#      {"type": "bundle", "products": {"1": 1, "4": 1}, "discount": 100.0, "exclusive": true},
+#      {"type": "tiered", "tiers": [[200.0, 0.15], [100.0, 0.08]]}]}
+#
+# Line rules (buy_x_get_y, flash, category_percent) are priced per cart line:
+#   * Each rule belongs to a stacking group (default "item"). Within a group
+#     only the largest discount applies, ties going to the rule listed first;
+#     the winners of different groups stack.
+#   * An "exclusive" rule combines with nothing: the line gets either the best
+#     exclusive discount or the stacked group winners, whichever is larger.
+#   * Of several flash rules active for the same product, the first listed
+#     applies (as with FLASH_SALES); it then competes in its group.
+#   * A line never gets more off than its total.
+# Bundle rules then take a fixed amount or a percentage off each complete set
+# of their products (units are used by one bundle only, in listed order).
+# A stacking bundle is added on top of line discounts; an exclusive bundle
+# replaces the line discounts of its products when it is worth more. The
+# replacement is per line, not per unit: if a line has more units than the
+# bundle sets use, the extra units lose their line discount too (and the
+# bundle only wins when it beats the whole lines' discounts).
+# Tiered rules apply to the subtotal after item discounts, first listed tier
+# met, exactly like TIERED_DISCOUNTS.
+# Compilation builds a decision table: product id -> the line rules that can
+# touch it, plus product id -> bundles that include it, so pricing a cart only
+# evaluates rules for the product ids in that cart, however many rules exist.
+# default_promotions() turns BOGO_ELIGIBLE_IDS / FLASH_SALES / TIERED_DISCOUNTS
+# into a rule set that prices carts exactly like calculate_total().
+
+RULE_TYPES = ('buy_x_get_y', 'flash', 'category_percent', 'bundle', 'tiered')
+DEFAULT_GROUP = "item"
+
+_BUY_X_GET_Y = 1
+_FLASH = 2
+_PERCENT = 3
+
+
+class PromotionConfigError(ValueError):
+    """Raised for malformed promotion configs."""
+
+
+def default_promotions(bogo_ids, flash_sales, tiered_discounts):
+    """Returns the config equivalent of today's BOGO, flash sale and tier rules."""
+    rules = [{'type': 'buy_x_get_y', 'products': sorted(bogo_ids), 'buy': 1, 'get': 1, 'label': "BOGO"}]
+    rules.extend(dict(sale, type='flash') for sale in flash_sales)
+    rules.append({'type': 'tiered', 'tiers': [list(tier) for tier in tiered_discounts]})
+    return {'rules': rules}
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def load_promotions(path):
+    """
+    Reads a promotion config from a JSON file (ISO 8601 strings for flash sale times).
+    Raises OSError if the file cannot be read, PromotionConfigError if it is malformed.
+    """
+    with open(path, encoding="utf-8") as handle:
+        try:
+            config = json.load(handle)
+        except ValueError as exc:  # JSONDecodeError, UnicodeDecodeError
+            raise PromotionConfigError(f"{path}: not valid JSON ({exc}).") from exc
+    if not isinstance(config, dict) or not isinstance(config.get('rules'), list):
+        raise PromotionConfigError(f"{path}: expected an object with a 'rules' list.")
+    for position, rule in enumerate(config['rules']):
+        if isinstance(rule, dict) and rule.get('type') == 'flash':
+            for field in ('start_time', 'end_time'):
+                value = _require(rule, position, field)
+                try:
+                    rule[field] = _parse_time(value)
+                except (TypeError, ValueError) as exc:
+                    raise PromotionConfigError(f"{path}: rule {position} (flash): bad {field} ({exc}).") from exc
+                if not isinstance(rule[field], datetime):
+                    raise PromotionConfigError(f"{path}: rule {position} (flash): {field} must be an ISO 8601 time.")
+    return config
+
+
+def _require(rule, position, field, kind=None):
+    if field not in rule:
+        raise PromotionConfigError(f"Rule {position} ({rule.get('type')}) needs '{field}'.")
+    value = rule[field]
+    if kind is not None and not isinstance(value, kind):
+        raise PromotionConfigError(f"Rule {position} ({rule.get('type')}): '{field}' has the wrong type.")
+    return value
+
+
+def _bundle_products(rule, position):
+    products = _require(rule, position, 'products', (list, dict))
+    if isinstance(products, list):
+        products = {product_id: 1 for product_id in products}
+    counts = {int(product_id): int(count) for product_id, count in products.items()}
+    if not counts or min(counts.values()) <= 0:
+        raise PromotionConfigError(f"Rule {position} (bundle) needs positive product counts.")
+    return counts
+
+
+class CompiledPromotions:
+    """A promotion config compiled into per-product decision tables."""
+
+    def __init__(self, config):
+        if not isinstance(config, dict):
+            raise PromotionConfigError(f"Expected a promotion config object, got {config!r}.")
+        categories = config.get('categories', {})
+        if not isinstance(categories, dict):
+            raise PromotionConfigError("'categories' must map category names to product id lists.")
+        self.line_rules = {}          # {product_id: [(kind, position, group, exclusive, label, params)]}
+        self.bundles = []             # [(position, {product_id: count}, kind, amount, exclusive, label)]
+        self.bundles_by_product = {}  # {product_id: [bundle index]}
+        flash_rules = []
+        tiers = []
+        rules = config.get('rules', [])
+        if not isinstance(rules, list):
+            raise PromotionConfigError("'rules' must be a list.")
+
+        for position, rule in enumerate(rules):
+            if not isinstance(rule, dict) or rule.get('type') not in RULE_TYPES:
+                raise PromotionConfigError(f"Rule {position}: expected a rule with a type in {RULE_TYPES}, got {rule!r}.")
+            try:
+                rule_type = rule['type']
+                group = rule.get('group', DEFAULT_GROUP)
+                hash(group)  # Groups key a dict when pricing
+                exclusive = bool(rule.get('exclusive', False))
+
+                if rule_type == 'buy_x_get_y':
+                    buy = int(rule.get('buy', 1))
+                    get = int(rule.get('get', 1))
+                    if buy <= 0 or get <= 0:
+                        raise PromotionConfigError(f"Rule {position} (buy_x_get_y): buy and get must be positive.")
+                    fraction = float(rule.get('discount', 1.0))  # Share of the price taken off the "get" items
+                    label = rule.get('label') or f"Buy {buy} Get {get}"
+                    entry = (_BUY_X_GET_Y, position, group, exclusive, label, (buy + get, get, fraction))
+                    for product_id in _require(rule, position, 'products', list):
+                        self.line_rules.setdefault(product_id, []).append(entry)
+                elif rule_type == 'flash':
+                    hash(_require(rule, position, 'product_id'))
+                    _require(rule, position, 'start_time')
+                    _require(rule, position, 'end_time')
+                    if rule.get('discount_type') in ('percent', 'fixed'):
+                        float(_require(rule, position, 'value'))
+                    # Unknown discount types stay "active" but take nothing off, as in FLASH_SALES
+                    flash_rules.append(dict(rule, _position=position, _group=group, _exclusive=exclusive,
+                                            _label=rule.get('label') or "Flash Sale"))
+                elif rule_type == 'category_percent':
+                    category = _require(rule, position, 'category')
+                    if category not in categories:
+                        raise PromotionConfigError(f"Rule {position}: unknown category {category!r}.")
+                    value = float(_require(rule, position, 'value'))
+                    entry = (_PERCENT, position, group, exclusive, rule.get('label') or f"{category} Sale", value)
+                    for product_id in categories[category]:
+                        self.line_rules.setdefault(product_id, []).append(entry)
+                elif rule_type == 'bundle':
+                    products = _bundle_products(rule, position)
+                    if 'percent' in rule:
+                        kind, amount = _PERCENT, float(rule['percent'])
+                    else:
+                        kind, amount = None, float(_require(rule, position, 'discount'))
+                    index = len(self.bundles)
+                    self.bundles.append((position, products, kind, amount, exclusive, rule.get('label') or "Bundle"))
+                    for product_id in products:
+                        self.bundles_by_product.setdefault(product_id, []).append(index)
+                else:  # tiered
+                    tiers.extend((float(threshold), float(percentage))
+                                 for threshold, percentage in _require(rule, position, 'tiers', list))
+            except PromotionConfigError:
+                raise
+            except (TypeError, ValueError, KeyError, AttributeError) as exc:
+                # e.g. "buy": null, a tier that is not a [threshold, rate] pair, a non-numeric count
+                raise PromotionConfigError(f"Rule {position} ({rule['type']}): {exc}.") from exc
+
+        # One flash entry per product: the index picks the first listed active sale
+        self.flash_index = FlashSaleIndex(flash_rules)
+        flash_entry = (_FLASH, None, None, None, None, None)
+        for product_id in {sale['product_id'] for sale in flash_rules}:
+            self.line_rules.setdefault(product_id, []).append(flash_entry)
+        self.line_rules = {product_id: tuple(entries) for product_id, entries in self.line_rules.items()}
+        self.order_rules = CompiledPricingRules((), (), tiers)
+
+    def _line_discount(self, entries, product_id, quantity, price, line_total, current_time):
+        """Returns (discount, note) for one line, or (0.0, None)."""
+        best = {}  # {group: (amount, position, label)}
+        best_exclusive = None
+        for kind, position, group, exclusive, label, params in entries:
+            if kind == _BUY_X_GET_Y:
+                set_size, get, fraction = params
+                free_items = (quantity // set_size) * get
+                if free_items <= 0:
+                    continue
+                amount = free_items * price if fraction == 1.0 else free_items * price * fraction
+            elif kind == _PERCENT:
+                amount = line_total * params
+            else:
+                sale = self.flash_index.first_active(product_id, current_time)
+                if not sale:
+                    continue
+                if sale['discount_type'] == 'percent':
+                    amount = line_total * sale['value']
+                elif sale['discount_type'] == 'fixed':
+                    amount = min(line_total, sale['value'] * quantity)
+                else:
+                    continue
+                position, group, exclusive, label = sale['_position'], sale['_group'], sale['_exclusive'], sale['_label']
+            if amount <= 0:
+                continue
+            if exclusive:
+                if best_exclusive is None or amount > best_exclusive[0] or (amount == best_exclusive[0] and position < best_exclusive[1]):
+                    best_exclusive = (amount, position, label)
+                continue
+            current = best.get(group)
+            if current is None or amount > current[0] or (amount == current[0] and position < current[1]):
+                best[group] = (amount, position, label)
+
+        if not best and best_exclusive is None:
+            return 0.0, None
+        winners = sorted(best.values(), key=lambda winner: winner[1])
+        discount = winners[0][0] if len(winners) == 1 else sum(winner[0] for winner in winners)
+        if best_exclusive is not None and (not winners or best_exclusive[0] > discount):
+            winners = [best_exclusive]
+            discount = best_exclusive[0]
+        if discount > line_total:
+            discount = line_total
+        if len(winners) == 1:
+            return discount, f"(-${discount:.2f} {winners[0][2]})"
+        return discount, " ".join(f"(-${amount:.2f} {label})" for amount, _, label in winners)
+
+    def _apply_bundles(self, candidates, cart, prices, lines):
+        """Applies the candidate bundles in listed order; updates lines {product_id: [discount, note]} in place."""
+        remaining = {}
+        for index in sorted(candidates):
+            _, products, kind, amount, exclusive, label = self.bundles[index]
+            sets = min((remaining.get(product_id, cart.get(product_id, 0)) // count
+                        for product_id, count in products.items()), default=0)
+            if sets <= 0:
+                continue
+            set_price = sum(prices[product_id] * count for product_id, count in products.items())
+            bundle_discount = set_price * sets * amount if kind == _PERCENT else amount * sets
+            line_discounts = sum(lines[product_id][0] for product_id in products if product_id in lines)
+            bundled_total = sum(prices[product_id] * cart[product_id] for product_id in products)
+            if exclusive:
+                bundle_discount = min(bundle_discount, bundled_total)
+                if bundle_discount <= line_discounts:
+                    continue
+                for product_id in products:
+                    lines.pop(product_id, None)
+            else:
+                # Never more off than what is left of the bundled lines
+                bundle_discount = min(bundle_discount, bundled_total - line_discounts)
+                if bundle_discount <= 0:
+                    continue
+            for product_id, count in products.items():
+                remaining[product_id] = remaining.get(product_id, cart[product_id]) - count * sets
+            first = next(iter(products))
+            discount, note = lines.get(first, (0.0, None))
+            bundle_note = f"(-${bundle_discount:.2f} {label})"
+            lines[first] = [discount + bundle_discount, f"{note} {bundle_note}" if note else bundle_note]
+
+    def price_cart(self, cart, lookup, current_time):
+        """Prices a cart; returns the calculate_total() breakdown dict."""
+        price_of = getattr(lookup, 'price_of', None)
+        line_rules = self.line_rules
+        bundles_by_product = self.bundles_by_product
+        subtotal_before_discounts = 0.0
+        total_item_discount = 0.0
+        discount_details = []
+        candidates = set()
+        prices = {}
+        lines = {}  # {product_id: [discount, note]} for discounted lines
+
+        for product_id, quantity in cart.items():
+            price = price_of(product_id) if price_of else lookup[product_id]['price']
+            line_item_total = price * quantity
+            subtotal_before_discounts += line_item_total
+            if product_id in bundles_by_product:
+                candidates.update(bundles_by_product[product_id])
+            entries = line_rules.get(product_id)
+            if entries is None:
+                continue
+            discount, note = self._line_discount(entries, product_id, quantity, price, line_item_total, current_time)
+            if note is not None:
+                lines[product_id] = [discount, note]
+
+        if candidates:
+            for product_id in cart:
+                prices[product_id] = price_of(product_id) if price_of else lookup[product_id]['price']
+            self._apply_bundles(candidates, cart, prices, lines)
+
+        # Summed in cart order, like calculate_total()
+        for product_id in cart:
+            line = lines.get(product_id)
+            if line is not None:
+                total_item_discount += line[0]
+                discount_details.append({'id': product_id, 'note': line[1]})
+
+        return self.order_rules.summarize(subtotal_before_discounts, total_item_discount, discount_details)
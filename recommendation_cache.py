@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+
+
+# --- Recommendation Cache ---
+# Shoppers often check out the same small item sets, so recommendation lists
+# are memoized by (frozenset of cart product ids, num_recommendations).
+# Entries are dropped when they are least recently used (size bound), older
+# than ttl_seconds, or when the co-purchase row of any item in the key changes.
+# Row changes arrive through the observer hook of update_copurchase_history():
+# each updated pair bumps a per-product version, so only keys touching the
+# updated products go stale.
+
+
+class RecommendationCache:
+    """Size- and TTL-bounded LRU cache for recommendation lists (LeetCode: LRU Cache)."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=300.0, clock=time.monotonic):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (recommended_ids, stored_at, item_versions)
+        self._versions = {}            # {product_id: version}
+        self._epoch = 0                # Bumped by invalidate_all()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(cart, num_recommendations):
+        return (frozenset(cart), num_recommendations)
+
+    def _snapshot(self, items):
+        versions = self._versions
+        return (self._epoch,) + tuple(versions.get(item, 0) for item in sorted(items))
+
+    # --- History observer ---
+
+    def record_pair(self, product_id, neighbor_id, count):
+        """Observer hook: product_id's history row changed."""
+        self._versions[product_id] = self._versions.get(product_id, 0) + 1
+
+    def refresh(self, product_id, row):
+        """Observer hook: product_id's whole history row was replaced (e.g. pruned)."""
+        self._versions[product_id] = self._versions.get(product_id, 0) + 1
+
+    def invalidate_products(self, product_ids):
+        for product_id in product_ids:
+            self._versions[product_id] = self._versions.get(product_id, 0) + 1
+
+    def invalidate_all(self):
+        """Marks every cached entry stale (e.g. after swapping in a new history_map)."""
+        self._epoch += 1
+
+    # --- Lookups ---
+
+    def get(self, cart, num_recommendations):
+        """Returns the cached list, or None on a miss (missing, expired or stale)."""
+        key = self.make_key(cart, num_recommendations)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        recommended_ids, stored_at, item_versions = entry
+        if self.ttl_seconds is not None and self.clock() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if item_versions != self._snapshot(key[0]):
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(recommended_ids)
+
+    def put(self, cart, num_recommendations, recommended_ids):
+        key = self.make_key(cart, num_recommendations)
+        self._entries[key] = (tuple(recommended_ids), self.clock(), self._snapshot(key[0]))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, cart, num_recommendations, compute):
+        """Returns the cached list or calls compute() and caches its result."""
+        recommended_ids = self.get(cart, num_recommendations)
+        if recommended_ids is None:
+            recommended_ids = compute()
+            self.put(cart, num_recommendations, recommended_ids)
+        return recommended_ids
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
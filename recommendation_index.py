@@ -0,0 +1,91 @@
+import heapq
+
+
+# --- Top-K Neighbor Index ---
+# Keeps, for every product, only its K most co-purchased neighbors so a
+# recommendation request merges K entries per cart item instead of walking
+# full history rows. Ranking is by count (higher first), then product id
+# (lower first), which makes every list, and every tie, deterministic.
+
+
+def _rank_key(product_id, count):
+    return (-count, product_id)
+
+
+class NeighborIndex:
+    """
+    Truncated top-K neighbor lists per product.
+    Pass it to update_copurchase_history(..., observers=[index]) and it is kept
+    exact incrementally: counts only grow, so a neighbor can only enter a list
+    by beating its current worst entry. Call refresh() for a product whose
+    counts went down (e.g. after pruning).
+    """
+
+    def __init__(self, k=10):
+        if k <= 0:
+            raise ValueError("k must be positive.")
+        self.k = k
+        self._top = {}  # {product_id: {neighbor_id: count}}, at most k neighbors each
+
+    @classmethod
+    def from_history(cls, history_map, k=10):
+        """Builds an index from an existing history_map."""
+        index = cls(k)
+        for product_id in history_map:
+            index.refresh(product_id, history_map[product_id])
+        return index
+
+    def record_pair(self, product_id, neighbor_id, count):
+        """Notes that history_map[product_id][neighbor_id] is now count. O(k)."""
+        members = self._top.setdefault(product_id, {})
+        if neighbor_id in members or len(members) < self.k:
+            members[neighbor_id] = count
+            return
+        worst = max(members, key=lambda other: _rank_key(other, members[other]))
+        if _rank_key(neighbor_id, count) < _rank_key(worst, members[worst]):
+            del members[worst]
+            members[neighbor_id] = count
+
+    def refresh(self, product_id, row):
+        """Recomputes one product's list from its full history row in O(len(row) log k)."""
+        best = heapq.nsmallest(self.k, row.items(), key=lambda item: _rank_key(item[0], item[1]))
+        if best:
+            self._top[product_id] = dict(best)
+        else:
+            self._top.pop(product_id, None)
+
+    def top(self, product_id):
+        """Returns product_id's top-K list as {neighbor_id: count}, unordered (read-only)."""
+        return self._top.get(product_id, {})
+
+    def neighbors(self, product_id):
+        """Returns [(neighbor_id, count), ...] best first."""
+        members = self._top.get(product_id, {})
+        return sorted(members.items(), key=lambda item: _rank_key(item[0], item[1]))
+
+    def __contains__(self, product_id):
+        return product_id in self._top
+
+    def __len__(self):
+        return len(self._top)
+
+
+def get_top_recommendations(cart, neighbor_index, num_recommendations=3):
+    """
+    Recommends products by merging the cart items' top-K neighbor lists and
+    selecting the best num_recommendations with a heap (LeetCode: Heap / Top K).
+    Scores are sums over the truncated lists, so a product that is a weak
+    neighbor of many cart items can rank lower than with full rows.
+    """
+    if not cart or num_recommendations <= 0:
+        return []
+    items_in_cart_ids = set(cart)
+
+    scores = {}
+    for item_id in items_in_cart_ids:
+        for other_item_id, count in neighbor_index.top(item_id).items():
+            if other_item_id not in items_in_cart_ids:
+                scores[other_item_id] = scores.get(other_item_id, 0) + count
+
+    best = heapq.nsmallest(num_recommendations, scores.items(), key=lambda item: _rank_key(item[0], item[1]))
+    return [item_id for item_id, score in best]
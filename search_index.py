@@ -0,0 +1,210 @@
+import heapq
+import re
+
+
+# --- Product Search Index ---
+# search_products_by_name() lowercases and scans every product name per query.
+# This index is built once from the catalog and kept current with
+# add_product()/remove_product():
+#   * n-gram postings (every substring of length 1..3 of each lowercase name)
+#     answer substring queries: short terms are a single posting lookup, longer
+#     terms intersect their trigram postings and verify the few survivors;
+#   * a token inverted index answers whole-word queries;
+#   * a prefix trie over tokens and full names drives ranked type-ahead completion.
+# Results come back in catalog order, like the linear scan.
+
+MAX_GRAM = 3
+_TOKEN_PATTERN = re.compile(r"\w+")
+_END = ""  # Trie key holding the product ids whose term ends here (never a single character)
+
+
+def _grams(text):
+    grams = set()
+    for size in range(1, MAX_GRAM + 1):
+        for start in range(len(text) - size + 1):
+            grams.add(text[start:start + size])
+    return grams
+
+
+def _tokens(text):
+    return set(_TOKEN_PATTERN.findall(text))
+
+
+class ProductSearchIndex:
+    """Substring, word and prefix search over product names (case-insensitive)."""
+
+    def __init__(self, product_list=()):
+        self._products = {}      # {product_id: product}
+        self._order = {}         # {product_id: catalog position}
+        self._names = {}         # {product_id: lowercase name}
+        self._gram_postings = {}   # {gram: set(product_id)}
+        self._token_postings = {}  # {token: set(product_id)}
+        self._trie = {}
+        self._next_position = 0
+        for product in product_list:
+            self.add_product(product)
+
+    def __len__(self):
+        return len(self._products)
+
+    def __contains__(self, product_id):
+        return product_id in self._products
+
+    # --- Maintenance ---
+
+    def add_product(self, product):
+        """Indexes a product; re-adding an id replaces the old entry but keeps its position."""
+        product_id = product['id']
+        position = self._order.get(product_id)
+        if position is not None:
+            self._unindex(product_id)
+        else:
+            position = self._next_position
+            self._next_position += 1
+
+        name = product['name'].lower()
+        self._products[product_id] = product
+        self._order[product_id] = position
+        self._names[product_id] = name
+        for gram in _grams(name):
+            self._gram_postings.setdefault(gram, set()).add(product_id)
+        tokens = _tokens(name)
+        for token in tokens:
+            self._token_postings.setdefault(token, set()).add(product_id)
+        for term in tokens | {name}:
+            self._trie_insert(term, product_id)
+
+    def remove_product(self, product_id):
+        """Removes a product from every index. Unknown ids are ignored."""
+        if product_id in self._products:
+            self._unindex(product_id)
+            del self._order[product_id]
+
+    def _unindex(self, product_id):
+        name = self._names.pop(product_id)
+        del self._products[product_id]
+        for gram in _grams(name):
+            self._discard(self._gram_postings, gram, product_id)
+        tokens = _tokens(name)
+        for token in tokens:
+            self._discard(self._token_postings, token, product_id)
+        for term in tokens | {name}:
+            self._trie_remove(term, product_id)
+
+    @staticmethod
+    def _discard(postings, key, product_id):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(product_id)
+            if not ids:
+                del postings[key]
+
+    # --- Prefix trie (LeetCode: Trie) ---
+
+    def _trie_insert(self, term, product_id):
+        node = self._trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node.setdefault(_END, set()).add(product_id)
+
+    def _trie_remove(self, term, product_id):
+        path = []
+        node = self._trie
+        for char in term:
+            child = node.get(char)
+            if child is None:
+                return
+            path.append((node, char))
+            node = child
+        ids = node.get(_END)
+        if ids is None:
+            return
+        ids.discard(product_id)
+        if not ids:
+            del node[_END]
+        # Prune nodes that no longer lead to any term
+        for parent, char in reversed(path):
+            if parent[char]:
+                break
+            del parent[char]
+
+    def _trie_collect(self, prefix):
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        found = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for key, child in current.items():
+                if key == _END:
+                    found.update(child)
+                else:
+                    stack.append(child)
+        return found
+
+    # --- Queries ---
+
+    def _in_catalog_order(self, product_ids):
+        order = self._order
+        products = self._products
+        return [products[product_id] for product_id in sorted(product_ids, key=order.__getitem__)]
+
+    def search(self, keyword):
+        """
+        Returns products whose name contains keyword (case-insensitive), in catalog
+        order. Same results as search_products_by_name(products, keyword).
+        """
+        term = keyword.lower()
+        if not term:
+            return self._in_catalog_order(self._products)
+        if len(term) <= MAX_GRAM:
+            return self._in_catalog_order(self._gram_postings.get(term, ()))
+
+        trigrams = sorted({term[start:start + MAX_GRAM] for start in range(len(term) - MAX_GRAM + 1)},
+                          key=lambda gram: len(self._gram_postings.get(gram, ())))
+        candidates = None
+        for gram in trigrams:
+            postings = self._gram_postings.get(gram)
+            if not postings:
+                return []
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return []
+        # Trigram hits are necessary but not sufficient; confirm the full substring
+        names = self._names
+        return self._in_catalog_order(product_id for product_id in candidates if term in names[product_id])
+
+    def search_words(self, query):
+        """Returns products containing every whole word of query, in catalog order."""
+        words = _tokens(query.lower())
+        if not words:
+            return []
+        matches = None
+        for word in sorted(words, key=lambda word: len(self._token_postings.get(word, ()))):
+            postings = self._token_postings.get(word)
+            if not postings:
+                return []
+            matches = set(postings) if matches is None else matches & postings
+        return self._in_catalog_order(matches)
+
+    def complete(self, prefix, limit=5):
+        """
+        Ranked type-ahead: products with a name or word starting with prefix.
+        Names that start with the prefix rank first, then shorter names,
+        then alphabetical order, then catalog order.
+        """
+        prefix = prefix.lower()
+        if not prefix or limit <= 0:
+            return []
+        names = self._names
+        order = self._order
+
+        def rank(product_id):
+            name = names[product_id]
+            return (0 if name.startswith(prefix) else 1, len(name), name, order[product_id])
+
+        ranked = heapq.nsmallest(limit, self._trie_collect(prefix), key=rank)
+        return [self._products[product_id] for product_id in ranked]
@@ -0,0 +1,232 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# --- Sharded Recommendations (multi-process) ---
+# The co-purchase graph is partitioned by product id (owner = id % num_shards).
+# Each shard's rows are stored as CSR arrays (sorted product ids, indptr,
+# neighbour ids, counts) in one shared memory block, read by one worker
+# process. A request fans out to the shards owning the cart's items; each
+# returns, per candidate, its partial score and a first-seen key
+# (position of the cart item << _POSITION_SHIFT | offset within that item's row).
+# The parent sums the partial scores and keeps the smallest key, which is the
+# order in which get_recommendations() first inserted the candidate into its
+# score dict. Sorting by (score desc, key) therefore gives exactly the list
+# heapq.nlargest returns there, ties included.
+# Counts must be integers (so partial sums are exact) and product ids ints.
+# The shards are a snapshot: build a new ShardedRecommender after history changes.
+
+_POSITION_SHIFT = 32  # Bits for the offset within a row in a first-seen key
+_NO_KEY = np.iinfo(np.int64).max
+_EMPTY = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+
+def _shard_arrays(buffer, num_rows, num_edges):
+    """(product_ids, indptr, neighbors, counts) int64 views laid out in one buffer."""
+    arrays = []
+    offset = 0
+    for length in (num_rows, num_rows + 1, num_edges, num_edges):
+        arrays.append(np.ndarray(length, dtype=np.int64, buffer=buffer, offset=offset))
+        offset += length * 8
+    return arrays
+
+
+def _partial_scores(arrays, item_ids, positions, excluded):
+    """
+    Scores one shard's share of a cart: (candidate ids, summed counts, first-seen keys),
+    one entry per distinct candidate not in `excluded`.
+    """
+    product_ids, indptr, neighbors, counts = arrays
+    if not len(product_ids):
+        return _EMPTY
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    rows = np.minimum(np.searchsorted(product_ids, item_ids), len(product_ids) - 1)
+    found = product_ids[rows] == item_ids
+    rows = rows[found]
+    positions = np.asarray(positions, dtype=np.int64)[found]
+
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return _EMPTY
+    within_row = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    edges = np.repeat(starts, lengths) + within_row
+    candidates = neighbors[edges]
+    keep = ~np.isin(candidates, np.asarray(excluded, dtype=np.int64))
+    if not keep.any():
+        return _EMPTY
+    keys = (np.repeat(positions, lengths) << _POSITION_SHIFT) | within_row
+    return _combine(candidates[keep], counts[edges][keep], keys[keep])
+
+
+def _combine(candidates, scores, keys):
+    """Sums scores and keeps the smallest key per distinct candidate."""
+    unique, inverse = np.unique(candidates, return_inverse=True)
+    summed = np.zeros(len(unique), dtype=np.int64)
+    np.add.at(summed, inverse, scores)
+    first_keys = np.full(len(unique), _NO_KEY, dtype=np.int64)
+    np.minimum.at(first_keys, inverse, keys)
+    return unique, summed, first_keys
+
+
+def merge_partial_scores(partials, num_recommendations):
+    """Merges shard results into the top num_recommendations product ids."""
+    partials = [partial for partial in partials if len(partial[0])]
+    if not partials or num_recommendations <= 0:
+        return []
+    if len(partials) == 1:
+        candidates, scores, keys = partials[0]
+    else:
+        candidates, scores, keys = _combine(*(np.concatenate(column) for column in zip(*partials)))
+    # Primary key last: score descending, then first-seen order
+    ranked = np.lexsort((keys, -scores))[:num_recommendations]
+    return candidates[ranked].tolist()
+
+
+def _shard_worker(block_name, num_rows, num_edges, connection):
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        _serve(_shard_arrays(block.buf, num_rows, num_edges), connection)
+    finally:
+        block.close()
+
+
+def _serve(arrays, connection):
+    while True:
+        jobs = connection.recv()
+        if jobs is None:
+            break
+        try:
+            connection.send(('ok', [_partial_scores(arrays, *job) for job in jobs]))
+        except Exception as exc:
+            connection.send(('error', repr(exc)))
+
+
+class ShardedRecommender:
+    """
+    get_recommendations() served by num_shards worker processes, each owning the
+    co-purchase rows of the product ids congruent to its shard number.
+    Use as a context manager (or call close()) to stop the workers and free
+    the shared memory.
+    """
+
+    def __init__(self, history_map, num_shards=None):
+        if num_shards is None:
+            num_shards = os.cpu_count() or 1
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1.")
+        self.num_shards = num_shards
+        self._blocks = []
+        self._connections = []
+        self._processes = []
+        try:
+            self._start(history_map)
+        except BaseException:
+            self.close()
+            raise
+
+    @staticmethod
+    def _partition(history_map, num_shards):
+        shard_rows = [[] for _ in range(num_shards)]
+        for product_id in history_map:
+            if not isinstance(product_id, int):
+                raise TypeError(f"Sharded recommendations need int product ids, got {product_id!r}.")
+            shard_rows[product_id % num_shards].append((product_id, history_map[product_id]))
+        return shard_rows
+
+    def _start(self, history_map):
+        context = multiprocessing.get_context()
+        for rows in self._partition(history_map, self.num_shards):
+            rows.sort(key=lambda entry: entry[0])  # Sorted ids, looked up by searchsorted
+            neighbors = [neighbor_id for _, row in rows for neighbor_id in row]
+            counts = np.asarray([count for _, row in rows for count in row.values()])
+            if counts.size and counts.dtype.kind not in 'iu':
+                raise ValueError("Sharded recommendations need integer co-purchase counts.")
+            num_rows, num_edges = len(rows), len(neighbors)
+
+            block = shared_memory.SharedMemory(create=True, size=max(8, (2 * num_rows + 1 + 2 * num_edges) * 8))
+            self._blocks.append(block)
+            product_ids, indptr, neighbor_column, count_column = _shard_arrays(block.buf, num_rows, num_edges)
+            product_ids[:] = [product_id for product_id, _ in rows]
+            indptr[0] = 0
+            np.cumsum([len(row) for _, row in rows], out=indptr[1:])
+            neighbor_column[:] = neighbors
+            count_column[:] = counts
+            del product_ids, indptr, neighbor_column, count_column  # Views must go before close()
+
+            parent_end, worker_end = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(block.name, num_rows, num_edges, worker_end),
+                                      daemon=True)
+            process.start()
+            worker_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+    def recommend(self, cart, num_recommendations=3):
+        """Same result as get_recommendations(cart, history_map, lookup, num_recommendations)."""
+        return self.recommend_many([cart], num_recommendations)[0]
+
+    def recommend_many(self, carts, num_recommendations=3):
+        """
+        Recommendations for many carts with one round trip per shard, so the
+        shards score the whole batch in parallel. Returns one list per cart.
+        """
+        jobs = [[] for _ in range(self.num_shards)]
+        owners = [[] for _ in range(self.num_shards)]  # cart index of each job
+        for cart_index, cart in enumerate(carts):
+            if not cart:
+                continue
+            # Same iteration order as get_recommendations(); positions fix first-seen order
+            items = list(set(cart.keys()))
+            by_shard = {}
+            for position, product_id in enumerate(items):
+                shard_items = by_shard.setdefault(product_id % self.num_shards, ([], []))
+                shard_items[0].append(product_id)
+                shard_items[1].append(position)
+            for shard, (item_ids, positions) in by_shard.items():
+                jobs[shard].append((item_ids, positions, items))
+                owners[shard].append(cart_index)
+
+        for connection, shard_jobs in zip(self._connections, jobs):
+            if shard_jobs:
+                connection.send(shard_jobs)
+        partials = [[] for _ in carts]
+        errors = []
+        for connection, shard_jobs, cart_indexes in zip(self._connections, jobs, owners):
+            if not shard_jobs:
+                continue
+            status, payload = connection.recv()
+            if status != 'ok':
+                errors.append(payload)
+                continue
+            for cart_index, partial in zip(cart_indexes, payload):
+                partials[cart_index].append(partial)
+        if errors:
+            raise RuntimeError(f"Recommendation shard failed: {'; '.join(errors)}")
+        return [merge_partial_scores(cart_partials, num_recommendations) for cart_partials in partials]
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._connections, self._processes, self._blocks = [], [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
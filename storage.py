@@ -0,0 +1,449 @@
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+
+
+# --- Persistence: Memory-Mapped Snapshot + Append-Only Delta Log ---
+#
+# Snapshot file layout (little-endian, every section 8-byte aligned):
+#   header        MAGIC, format version, generation, num_products, names_size, num_rows, num_pairs
+#   product_ids   int64[num_products]      catalog order
+#   prices        float64[num_products]
+#   name_offsets  int64[num_products + 1]  offsets into the UTF-8 names blob
+#   names         bytes[names_size]
+#   sorted_ids    int64[num_products]      product ids ascending ...
+#   sorted_rows   int64[num_products]      ... and their catalog rows (for binary search)
+#   row_ids       int64[num_rows]          co-purchase rows, product id ascending
+#   row_indptr    int64[num_rows + 1]      CSR offsets into neighbor_ids/counts
+#   neighbor_ids  int64[num_pairs]         each row keeps its history_map order
+#   counts        int64[num_pairs]
+#
+# Loading maps the file and casts each section to a memoryview, so nothing is
+# parsed up front; rows and products are decoded only when they are read.
+# Checkouts made after the snapshot are appended to "<snapshot>.log" as
+# [uint32 n][int64 product_id] * n records and replayed into a small overlay
+# on open. checkpoint() folds the overlay into a new snapshot and starts a new log.
+# The log header carries the generation of the snapshot it extends, so a crash
+# between writing a snapshot and resetting the log never replays folded checkouts.
+
+MAGIC = b"SCARTDB\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIqqqq")
+_RECORD_LENGTH = struct.Struct("<I")
+LOG_MAGIC = b"SCLG"
+_LOG_HEADER = struct.Struct("<4sI")
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+def _write_section(handle, data):
+    handle.write(data)
+    padding = _align(len(data)) - len(data)
+    if padding:
+        handle.write(b"\x00" * padding)
+
+
+def _int64_bytes(values):
+    return struct.pack(f"<{len(values)}q", *values)
+
+
+def _float64_bytes(values):
+    return struct.pack(f"<{len(values)}d", *values)
+
+
+def save_snapshot(path, products, history_map, generation=0):
+    """
+    Writes the catalog and co-purchase history to path atomically:
+    the data goes to a temporary file that is fsync'ed and then renamed over path.
+    """
+    products = list(products)  # Decode a MappedProducts catalog once, not once per column
+    product_ids = [product['id'] for product in products]
+    prices = [float(product['price']) for product in products]
+    encoded_names = [product['name'].encode("utf-8") for product in products]
+    name_offsets = [0]
+    for encoded in encoded_names:
+        name_offsets.append(name_offsets[-1] + len(encoded))
+    names = b"".join(encoded_names)
+    sorted_pairs = sorted((product_id, row) for row, product_id in enumerate(product_ids))
+
+    row_ids = sorted(product_id for product_id in history_map if history_map[product_id])
+    row_indptr = [0]
+    neighbor_ids = []
+    counts = []
+    for product_id in row_ids:
+        for neighbor_id, count in history_map[product_id].items():
+            neighbor_ids.append(neighbor_id)
+            counts.append(count)
+        row_indptr.append(len(neighbor_ids))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, generation, len(product_ids), len(names), len(row_ids), len(neighbor_ids)))
+        _write_section(handle, _int64_bytes(product_ids))
+        _write_section(handle, _float64_bytes(prices))
+        _write_section(handle, _int64_bytes(name_offsets))
+        _write_section(handle, names)
+        _write_section(handle, _int64_bytes([product_id for product_id, row in sorted_pairs]))
+        _write_section(handle, _int64_bytes([row for product_id, row in sorted_pairs]))
+        _write_section(handle, _int64_bytes(row_ids))
+        _write_section(handle, _int64_bytes(row_indptr))
+        _write_section(handle, _int64_bytes(neighbor_ids))
+        _write_section(handle, _int64_bytes(counts))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, path)
+    _fsync_directory(path)
+
+
+def _fsync_directory(path):
+    """Makes the rename durable on POSIX; a no-op where directories can't be opened."""
+    try:
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory)
+    except OSError:
+        pass
+    finally:
+        os.close(directory)
+
+
+def _binary_search(sorted_values, target):
+    """Index of target in an ascending sequence, or -1 (LeetCode: Binary Search)."""
+    low, high = 0, len(sorted_values) - 1
+    while low <= high:
+        middle = (low + high) // 2
+        value = sorted_values[middle]
+        if value == target:
+            return middle
+        if value < target:
+            low = middle + 1
+        else:
+            high = middle - 1
+    return -1
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a smart cart snapshot (file too small).")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.generation, num_products, names_size, num_rows, num_pairs = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a smart cart snapshot.")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot format version {version}.")
+
+        view = memoryview(self._map)
+        offset = _HEADER.size
+
+        def section(length, item_size, code):
+            nonlocal offset
+            data = view[offset:offset + length * item_size]
+            offset += _align(length * item_size)
+            return data.cast(code) if code else data
+
+        self.product_ids = section(num_products, 8, 'q')
+        self.prices = section(num_products, 8, 'd')
+        self._name_offsets = section(num_products + 1, 8, 'q')
+        self._names = section(names_size, 1, None)
+        self._sorted_ids = section(num_products, 8, 'q')
+        self._sorted_rows = section(num_products, 8, 'q')
+        self._row_ids = section(num_rows, 8, 'q')
+        self._row_indptr = section(num_rows + 1, 8, 'q')
+        self._neighbor_ids = section(num_pairs, 8, 'q')
+        self._counts = section(num_pairs, 8, 'q')
+
+    def close(self):
+        # Views must be released before the map can close
+        for name in ('product_ids', 'prices', '_name_offsets', '_names', '_sorted_ids',
+                     '_sorted_rows', '_row_ids', '_row_indptr', '_neighbor_ids', '_counts'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+        self._file.close()
+
+    # --- Catalog ---
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def product_at(self, row):
+        """Decodes the product stored at catalog row as an {'id', 'name', 'price'} dict."""
+        start = self._name_offsets[row]
+        end = self._name_offsets[row + 1]
+        return {"id": self.product_ids[row], "name": bytes(self._names[start:end]).decode("utf-8"), "price": self.prices[row]}
+
+    def find_product(self, product_id):
+        index = _binary_search(self._sorted_ids, product_id)
+        return None if index < 0 else self.product_at(self._sorted_rows[index])
+
+    def products(self):
+        """Materializes the whole catalog as a list of product dicts."""
+        return [self.product_at(row) for row in range(len(self.product_ids))]
+
+    # --- Co-purchase rows ---
+
+    def history_row(self, product_id):
+        """Returns {neighbor_id: count} for product_id, in the saved row order."""
+        index = _binary_search(self._row_ids, product_id)
+        if index < 0:
+            return {}
+        start = self._row_indptr[index]
+        end = self._row_indptr[index + 1]
+        return dict(zip(self._neighbor_ids[start:end].tolist(), self._counts[start:end].tolist()))
+
+    def history_product_ids(self):
+        return self._row_ids.tolist()
+
+
+# MappedLookup and MappedProducts read through store.snapshot on every access
+# instead of holding a Snapshot: checkpoint() closes the old mapping and opens
+# the new file, and objects handed out earlier must follow it.
+
+class MappedLookup:
+    """product_lookup replacement backed by a CopurchaseStore's snapshot (id -> product dict, decoded on demand)."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __contains__(self, product_id):
+        return _binary_search(self._store.snapshot._sorted_ids, product_id) >= 0
+
+    def __getitem__(self, product_id):
+        product = self._store.snapshot.find_product(product_id)
+        if product is None:
+            raise KeyError(product_id)
+        return product
+
+    def get(self, product_id, default=None):
+        product = self._store.snapshot.find_product(product_id)
+        return default if product is None else product
+
+    def __len__(self):
+        return len(self._store.snapshot)
+
+
+class MappedProducts(Sequence):
+    """Read-only list of product dicts in catalog order, decoded one row at a time."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store.snapshot)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("product row out of range")
+        return self._store.snapshot.product_at(row)
+
+
+def _read_log_generation(path):
+    """Returns the generation stamped in a log header, or None if missing/invalid."""
+    try:
+        with open(path, "rb") as handle:
+            header = handle.read(_LOG_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < _LOG_HEADER.size:
+        return None
+    magic, generation = _LOG_HEADER.unpack(header)
+    return generation if magic == LOG_MAGIC else None
+
+
+class DeltaLog:
+    """Append-only log of checked-out carts since the snapshot of the given generation."""
+
+    def __init__(self, path, generation, sync=False):
+        self.path = path
+        self.sync = sync
+        if _read_log_generation(path) == generation:
+            self._handle = open(path, "ab")
+        else:
+            self._handle = open(path, "wb")
+            self._start(generation)
+
+    def _start(self, generation):
+        self._handle.write(_LOG_HEADER.pack(LOG_MAGIC, generation))
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def append(self, product_ids):
+        self.append_many([product_ids])
+
+    def append_many(self, carts):
+        """Appends one record per product id list, with a single flush (and fsync)."""
+        self._handle.write(b"".join(_RECORD_LENGTH.pack(len(product_ids)) + _int64_bytes(product_ids)
+                                    for product_ids in carts))
+        self._handle.flush()
+        if self.sync:
+            os.fsync(self._handle.fileno())
+
+    def reset(self, generation):
+        """Empties the log and stamps it for a new snapshot generation."""
+        self._handle.truncate(0)
+        self._handle.seek(0)
+        self._start(generation)
+
+    def close(self):
+        self._handle.close()
+
+    @staticmethod
+    def replay(path, generation):
+        """
+        Yields the product id lists recorded in path if it extends the given
+        snapshot generation; a torn final record is skipped.
+        """
+        if _read_log_generation(path) != generation:
+            return
+        with open(path, "rb") as handle:
+            data = handle.read()
+        offset = _LOG_HEADER.size
+        while offset + _RECORD_LENGTH.size <= len(data):
+            (count,) = _RECORD_LENGTH.unpack_from(data, offset)
+            end = offset + _RECORD_LENGTH.size + 8 * count
+            if end > len(data):
+                break
+            yield list(struct.unpack_from(f"<{count}q", data, offset + _RECORD_LENGTH.size))
+            offset = end
+
+
+def _add_pairs(overlay, product_ids, totals=None, observers=()):
+    """
+    Increments overlay counts for every pair, the same way update_copurchase_history() does.
+    totals(a, b) gives the combined count used for observer notifications.
+    """
+    for i in range(len(product_ids)):
+        for j in range(i + 1, len(product_ids)):
+            item_a_id = product_ids[i]
+            item_b_id = product_ids[j]
+            row_a = overlay.setdefault(item_a_id, {})
+            row_a[item_b_id] = row_a.get(item_b_id, 0) + 1
+            row_b = overlay.setdefault(item_b_id, {})
+            row_b[item_a_id] = row_b.get(item_a_id, 0) + 1
+            for observer in observers:
+                observer.record_pair(item_a_id, item_b_id, totals(item_a_id, item_b_id))
+                observer.record_pair(item_b_id, item_a_id, totals(item_b_id, item_a_id))
+
+
+class CopurchaseStore:
+    """
+    Persistent co-purchase history: a mapped snapshot plus an in-memory overlay
+    of checkouts replayed from (and appended to) the delta log.
+    Supports the read side of the history_map protocol for get_recommendations().
+    """
+
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.snapshot = Snapshot(path) if os.path.exists(path) else None
+        generation = self.snapshot.generation if self.snapshot else 0
+        self._overlay = {}
+        for product_ids in DeltaLog.replay(self.log_path, generation):
+            _add_pairs(self._overlay, product_ids)
+        self._log = DeltaLog(self.log_path, generation, sync=sync)
+
+    @property
+    def lookup(self):
+        """A MappedLookup over the snapshot catalog (None if no snapshot exists yet)."""
+        return MappedLookup(self) if self.snapshot else None
+
+    @property
+    def mapped_products(self):
+        """The snapshot catalog as a lazy MappedProducts sequence (None if no snapshot exists yet)."""
+        return MappedProducts(self) if self.snapshot else None
+
+    def products(self):
+        """Materializes the snapshot catalog as a list of product dicts."""
+        return self.snapshot.products() if self.snapshot else []
+
+    def _count(self, product_id, neighbor_id):
+        return self[product_id].get(neighbor_id, 0)
+
+    def record_checkout(self, cart, observers=()):
+        """Logs a checkout and applies its pairs, like update_copurchase_history()."""
+        self.record_checkouts([cart], observers)
+
+    def record_checkouts(self, carts, observers=()):
+        """Logs a batch of checkouts with one log write (one fsync with sync=True), then applies them in order."""
+        batch = [product_ids for product_ids in (list(dict.fromkeys(cart)) for cart in carts) if len(product_ids) >= 2]
+        if not batch:
+            return
+        self._log.append_many(batch)
+        for product_ids in batch:
+            _add_pairs(self._overlay, product_ids, self._count, observers)
+
+    def __contains__(self, product_id):
+        if self._overlay.get(product_id):
+            return True
+        return bool(self.snapshot and self.snapshot.history_row(product_id))
+
+    def __getitem__(self, product_id):
+        row = self.snapshot.history_row(product_id) if self.snapshot else {}
+        for neighbor_id, count in self._overlay.get(product_id, {}).items():
+            row[neighbor_id] = row.get(neighbor_id, 0) + count
+        if not row:
+            raise KeyError(product_id)
+        return row
+
+    def __iter__(self):
+        seen = set(self.snapshot.history_product_ids()) if self.snapshot else set()
+        yield from sorted(seen)
+        for product_id in self._overlay:
+            if product_id not in seen:
+                yield product_id
+
+    def to_dict(self):
+        """Materializes the full history as a dict-of-dicts."""
+        return {product_id: self[product_id] for product_id in self}
+
+    def import_history(self, history_map, products=None):
+        """
+        Adds a bulk history_map (e.g. from order_ingest.py) to the stored counts.
+        Imported counts are not written to the delta log, so this checkpoints
+        straight away.
+        """
+        for product_id, row in history_map.items():
+            target = self._overlay.setdefault(product_id, {})
+            for neighbor_id, count in row.items():
+                target[neighbor_id] = target.get(neighbor_id, 0) + count
+        self.checkpoint(products)
+
+    def checkpoint(self, products=None):
+        """
+        Writes snapshot + overlay to a new snapshot (catalog defaults to the
+        current snapshot's), then empties the delta log and remaps.
+        """
+        if products is None:
+            products = self.products()
+        generation = (self.snapshot.generation if self.snapshot else 0) + 1
+        save_snapshot(self.path, products, self.to_dict(), generation)
+        self._log.reset(generation)
+        self._overlay = {}
+        if self.snapshot:
+            self.snapshot.close()
+        self.snapshot = Snapshot(self.path)
+
+    def close(self):
+        self._log.close()
+        if self.snapshot:
+            self.snapshot.close()
+            self.snapshot = None